@@ -0,0 +1,134 @@
+import json
+import os
+import pickle
+import threading
+from collections import namedtuple
+
+ALARM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files')
+ALARM_SOURCES = {
+    'controller': 'alarm_controller.json',
+    'servo': 'alarm_servo.json',
+}
+ALARM_LANGUAGES = ('en', 'zh_TW')
+
+# 預編譯索引存放位置（與Python位元組碼相同，不納入版本控制）
+CACHE_DIR = os.path.join(ALARM_DIR, '__pycache__')
+CACHE_VERSION = 1
+
+AlarmInfo = namedtuple('AlarmInfo', ['id', 'source', 'level', 'description', 'cause', 'solution'])
+
+
+class AlarmCatalog:
+    """
+    告警目錄
+    以告警ID建立索引，每種語言只在第一次查詢時載入；
+    載入時優先讀取預編譯的 pickle 索引，JSON 檔案更新後自動重新編譯
+    """
+
+    def __init__(self, language='zh_TW', alarm_dir=ALARM_DIR, cache_dir=CACHE_DIR):
+        if language not in ALARM_LANGUAGES:
+            raise ValueError(f"不支援的語言: {language}")
+        self.language = language
+        self.alarm_dir = alarm_dir
+        self.cache_dir = cache_dir
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _source_paths(self):
+        return {source: os.path.join(self.alarm_dir, name) for source, name in ALARM_SOURCES.items()}
+
+    def _signature(self):
+        """來源JSON檔案的修改時間與大小，用來判斷預編譯索引是否過期"""
+        signature = [CACHE_VERSION]
+        for path in self._source_paths().values():
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _compile(self, language):
+        """
+        從JSON建立單一語言的索引
+        回傳 {來源: {告警ID: (level, description, cause, solution)}}，重複的ID以後出現者為準
+        """
+        index = {}
+        for source, path in self._source_paths().items():
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f)
+            table = {}
+            for entry in entries:
+                text = entry.get(language) or {}
+                table[entry['id']] = (entry.get('level', 0),
+                                      text.get('description', ''),
+                                      text.get('cause', ''),
+                                      text.get('solution', ''))
+            index[source] = table
+        return index
+
+    def _load(self, language):
+        """載入單一語言索引：讀取預編譯檔案，過期或不存在時重新編譯並寫入"""
+        signature = self._signature()
+        cache_path = os.path.join(self.cache_dir, f"alarm_{language}.pickle")
+
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_signature, index = pickle.load(f)
+            if cached_signature == signature:
+                return index
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+
+        index = self._compile(language)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = cache_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                pickle.dump((signature, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # 無法寫入時只使用記憶體中的索引
+            pass
+        return index
+
+    def _index(self, language):
+        index = self._indexes.get(language)
+        if index is None:
+            if language not in ALARM_LANGUAGES:
+                raise ValueError(f"不支援的語言: {language}")
+            with self._lock:
+                index = self._indexes.get(language)
+                if index is None:
+                    index = self._load(language)
+                    self._indexes[language] = index
+        return index
+
+    def lookup(self, alarm_id, source='controller', language=None):
+        """
+        查詢告警
+        source: 'controller' 或 'servo'
+        language: 預設使用建立目錄時指定的語言
+        找不到時回傳None
+        """
+        entry = self._index(language or self.language)[source].get(alarm_id)
+        if entry is None:
+            return None
+        return AlarmInfo(alarm_id, source, *entry)
+
+    def describe(self, alarm_id, source='controller', language=None):
+        """回傳告警的單行描述，例如 "手勢切換錯誤 - 重新選取運動點位\""""
+        info = self.lookup(alarm_id, source, language)
+        if info is None:
+            return None
+        if info.solution:
+            return f"{info.description} - {info.solution}"
+        return info.description
+
+
+_default_catalog = None
+
+
+def get_alarm_catalog():
+    """取得共用的告警目錄（只建立一次，預設語言zh_TW，查詢時可指定其他語言）"""
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = AlarmCatalog()
+    return _default_catalog
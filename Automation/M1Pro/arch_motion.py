@@ -0,0 +1,93 @@
+"""
+門型(Jump)運動規劃
+
+在本地將門型運動拆成「垂直上升 - 頂部平移 - 垂直下降」三段，
+以 CP 平滑過渡連續送入控制器隊列（不在中間點 Sync），發送前可用 preflight 檢查整個門型路徑
+
+參數（與控制器 Arch 門型參數相同的意義）:
+    start_height: 起點至少垂直抬升的高度 (mm)
+    limit_z:      門型最高點的Z座標上限 (mm，對應 LimZ)
+    end_height:   終點上方開始垂直下降的高度 (mm)
+
+用法:
+    steps = jump_steps(start_pose, target_point, ArchParams(20, 200, 20), speed=60, cp=50)
+    issues = validate_sequence(steps, start_joints=current_joints)
+"""
+from collections import namedtuple
+from kinematics import JOINT_LIMITS
+from sequence_executor import SequenceStep
+
+ArchParams = namedtuple('ArchParams', ['start_height', 'limit_z', 'end_height'],
+                        defaults=(20.0, float(JOINT_LIMITS[2][1]), 20.0))
+
+TRAVERSE_TYPES = ('MovJ', 'MovL')
+
+
+def arch_height(start_z, end_z, params):
+    """
+    門型頂部的Z座標: 起點抬升與終點下降高度取較高者，不超過 limit_z
+    limit_z 低於起點或終點時無法規劃，拋出 ValueError
+    """
+    top = max(start_z + params.start_height, end_z + params.end_height)
+    if params.limit_z < max(start_z, end_z):
+        raise ValueError(f"門型高度上限 {params.limit_z:.1f} 低於起點或終點高度")
+    return min(top, params.limit_z)
+
+
+def plan_jump(start_pose, target_pose, params=ArchParams()):
+    """
+    規劃門型路徑
+    start_pose / target_pose: [x, y, z, r]
+    回傳 [上升點, 平移終點, 目標點] 三個 [x, y, z, r]
+    """
+    sx, sy, sz, sr = start_pose[:4]
+    tx, ty, tz, tr = target_pose[:4]
+    top = arch_height(sz, tz, params)
+    return [[sx, sy, top, sr], [tx, ty, top, tr], [tx, ty, tz, tr]]
+
+
+def _waypoint(name, pose):
+    x, y, z, r = pose
+    return {'name': name, 'cartesian': {'x': float(x), 'y': float(y), 'z': float(z), 'r': float(r)}, 'joint': {}}
+
+
+def jump_steps(start_pose, target_point, params=ArchParams(), speed=50, cp=50, end_cp=0, traverse='MovJ', acc=None):
+    """
+    產生門型運動的三段 SequenceStep
+    target_point: saved_points 中的點位字典
+    cp: 上升點與平移終點的平滑過渡比例；end_cp: 目標點的過渡比例（0表示在目標點停止）
+    traverse: 頂部平移使用 MovJ（較快）或 MovL（直線）
+    """
+    if traverse not in TRAVERSE_TYPES:
+        raise ValueError(f"未知的平移運動類型: {traverse}")
+    cartesian = target_point['cartesian']
+    target_pose = [cartesian['x'], cartesian['y'], cartesian['z'], cartesian['r']]
+    lift, cross, _ = plan_jump(start_pose, target_pose, params)
+    name = target_point.get('name', '')
+    return [
+        SequenceStep(_waypoint(f"{name}_上升", lift), 'MovL', speed, cp, acc),
+        SequenceStep(_waypoint(f"{name}_平移", cross), traverse, speed, cp, acc),
+        SequenceStep(target_point, 'MovL', speed, end_cp, acc),
+    ]
+
+
+def expand_jumps(steps, start_pose, params=ArchParams(), corner_cp=50, traverse='MovJ'):
+    """
+    將序列中 motion_type 為 'Jump' 的段展開為三段門型運動
+    start_pose: 序列開始時的 [x, y, z, r]；每段 Jump 以前一段的目標點作為起點
+    corner_cp: 門型兩個轉角的過渡比例；目標點使用該段原本的 cp
+    """
+    expanded = []
+    pose = list(start_pose) if start_pose is not None else None
+    for step in steps:
+        cartesian = step.point['cartesian']
+        target = [cartesian['x'], cartesian['y'], cartesian['z'], cartesian['r']]
+        if step.motion_type == 'Jump':
+            if pose is None:
+                raise ValueError("沒有起點位置，無法規劃第一段門型運動")
+            expanded.extend(jump_steps(pose, step.point, params, step.speed, corner_cp,
+                                       end_cp=step.cp, traverse=traverse, acc=step.acc))
+        else:
+            expanded.append(step)
+        pose = target
+    return expanded
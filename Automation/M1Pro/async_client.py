@@ -0,0 +1,147 @@
+"""
+asyncio 管線化指令客戶端
+
+與 DobotApiDashboard / DobotApiMove 相同的指令介面，但每個指令立即寫出並回傳 awaitable，
+多條指令可同時在途，回覆依回傳的指令名稱與發送順序配對
+
+用法:
+    dash = AsyncDobotDashboard("192.168.1.6", 29999)
+    await dash.connect()
+    await asyncio.gather(dash.SpeedJ(50), dash.AccJ(50), dash.CP(50), dash.DO(1, 1))
+    mode = await dash.RobotMode()
+"""
+import asyncio
+import collections
+import re
+from dobot_api import DobotApiDashboard, DobotApiMove
+
+COMMAND_NAME_PATTERN = re.compile(r'\s*(\w+)\s*\(')
+
+
+def command_name(text):
+    """取出指令或回覆中的指令名稱，例如 'SpeedJ(50)' -> 'SpeedJ'"""
+    match = COMMAND_NAME_PATTERN.match(text)
+    return match.group(1) if match else ''
+
+
+def reply_command_name(reply):
+    """取出回覆 ErrorID,{values},Cmd(...); 中回傳的指令名稱"""
+    end = reply.rfind('}')
+    rest = reply[end + 1:] if end >= 0 else reply
+    return command_name(rest.lstrip(','))
+
+
+class AsyncDobotApi:
+    """
+    asyncio 連線基底
+    sendRecvMsg 寫出指令後立即回傳 Future，由讀取任務在回覆到達時完成
+    """
+
+    def __init__(self, ip, port, *args):
+        self.ip = ip
+        self.port = port
+        self.text_log = None
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._pending = collections.deque()
+
+    async def connect(self):
+        """建立連線並啟動回覆讀取任務"""
+        self._reader, self._writer = await asyncio.open_connection(self.ip, self.port)
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    @property
+    def in_flight(self):
+        """尚未收到回覆的指令數量"""
+        return len(self._pending)
+
+    def log(self, text):
+        pass
+
+    def sendRecvMsg(self, string):
+        """
+        寫出指令並回傳 Future，結果為與同步版本相同的回覆字串
+        寫入只進入傳送緩衝區，不等待回覆，因此連續呼叫會管線化送出
+        """
+        if self._writer is None or self._writer.is_closing():
+            raise ConnectionError(f"端口 {self.port} 尚未連線")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((command_name(string), future))
+        self._writer.write(string.encode('utf-8'))
+        return future
+
+    async def flush(self):
+        """等待傳送緩衝區寫出"""
+        await self._writer.drain()
+
+    async def _read_loop(self):
+        """讀取回覆並依序配對在途指令"""
+        try:
+            while True:
+                data = await self._reader.readuntil(b';')
+                self._resolve(data.decode('utf-8').strip())
+        except asyncio.IncompleteReadError:
+            error = ConnectionError(f"端口 {self.port} 連線已關閉")
+        except asyncio.CancelledError:
+            error = ConnectionError(f"端口 {self.port} 連線已關閉")
+        except Exception as e:
+            error = e
+        self._fail_pending(error)
+
+    def _resolve(self, reply):
+        """回覆依發送順序配對；名稱不符時，排在前面未回覆的指令視為遺失"""
+        name = reply_command_name(reply)
+        while self._pending:
+            expected, future = self._pending.popleft()
+            if expected == name or not name:
+                if not future.done():
+                    future.set_result(reply)
+                return
+            if not future.done():
+                future.set_exception(ConnectionError(f"指令 {expected} 未收到回覆，收到 {reply}"))
+
+    def _fail_pending(self, error):
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def aclose(self):
+        """關閉連線，未完成的指令以 ConnectionError 結束"""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+        self._writer = None
+        self._read_task = None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __del__(self):
+        pass
+
+
+class AsyncDobotDashboard(AsyncDobotApi, DobotApiDashboard):
+    """29999端口的管線化客戶端，指令與 DobotApiDashboard 相同，回傳 awaitable"""
+
+
+class AsyncDobotMove(AsyncDobotApi, DobotApiMove):
+    """30003端口的管線化客戶端，指令與 DobotApiMove 相同，回傳 awaitable"""
@@ -0,0 +1,361 @@
+"""
+性能基準測試
+
+測量項目:
+    commands  - DobotApi.sendRecvMsg 常用 Dashboard/Move 指令的往返延遲百分位數
+    stream    - 30004 實時反饋流的每秒幀數與每幀CPU時間（讀取 + decode_feedback）
+    decode    - 反饋解析路徑的最大吞吐量（本地socketpair，不受控制器推送頻率限制）
+    kinematics - kinematics.py 整批正/逆解與可達性檢查的每點耗時
+    qt_emit   - feedback_update 信號送入Qt的成本（需要PyQt5）
+
+預設會以子進程啟動 simulator.py 作為控制器，結果以JSON輸出，方便比較不同提交
+
+用法:
+    python benchmark.py --output bench.json
+    python benchmark.py --host 192.168.1.6 --skip move
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import kinematics
+from dobot_api import DobotApi, DobotApiDashboard, DobotApiMove, MyType
+from feedback import FeedbackReader, FEEDBACK_TEST_VALUE, decode_feedback
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 代表性指令: (名稱, 端口類型, 呼叫函數)
+DASHBOARD_COMMANDS = [
+    ('RobotMode', lambda dash: dash.RobotMode()),
+    ('GetPose', lambda dash: dash.GetPose()),
+    ('GetAngle', lambda dash: dash.GetAngle()),
+    ('GetErrorID', lambda dash: dash.GetErrorID()),
+    ('SpeedFactor', lambda dash: dash.SpeedFactor(50)),
+    ('SpeedJ', lambda dash: dash.SpeedJ(50)),
+    ('CP', lambda dash: dash.CP(50)),
+    ('DO', lambda dash: dash.DO(1, 0)),
+]
+
+
+def summarize(samples):
+    """計算延遲樣本（秒）的統計值，單位為毫秒"""
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def git_commit():
+    """取得目前提交編號，不在git倉庫中時回傳None"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=MODULE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_for_port(host, port, timeout=10.0):
+    """等待端口可以連線"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+@contextlib.contextmanager
+def simulator_process(rate):
+    """以子進程啟動模擬器，避免與測量共用GIL"""
+    process = subprocess.Popen([sys.executable, os.path.join(MODULE_DIR, 'simulator.py'),
+                                '--rate', str(rate)],
+                               cwd=MODULE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for port in (29999, 30003, 30004):
+            if not wait_for_port('127.0.0.1', port):
+                raise RuntimeError(f"模擬器端口 {port} 未啟動")
+        yield '127.0.0.1'
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+# ==================== 指令往返延遲 ====================
+
+def bench_commands(host, iterations, include_move=True):
+    """測量 sendRecvMsg 的往返延遲"""
+    results = {}
+    dash = DobotApiDashboard(host, 29999)
+    move = DobotApiMove(host, 30003) if include_move else None
+    try:
+        # dobot_api 每條指令都會print日誌，測量時導向devnull避免終端輸出影響結果
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            dash.EnableRobot()
+            dash.SpeedFactor(100)
+
+            for name, call in DASHBOARD_COMMANDS:
+                samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    call(dash)
+                    samples.append(time.perf_counter() - start)
+                results[f'dashboard.{name}'] = summarize(samples)
+
+            if move is not None:
+                # 以目前關節角度做原地運動，只測量指令被接受的延遲
+                reply = dash.GetAngle()
+                joints = [float(v) for v in reply.split('{')[1].split('}')[0].split(',')[:4]]
+                samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    move.JointMovJ(*joints)
+                    samples.append(time.perf_counter() - start)
+                results['move.JointMovJ'] = summarize(samples)
+
+                samples = []
+                for _ in range(max(iterations // 10, 1)):
+                    start = time.perf_counter()
+                    move.Sync()
+                    samples.append(time.perf_counter() - start)
+                results['move.Sync_idle'] = summarize(samples)
+    finally:
+        dash.close()
+        if move is not None:
+            move.close()
+    return results
+
+
+# ==================== 反饋流 ====================
+
+def bench_stream(host, duration):
+    """從30004端口讀取實時反饋，測量幀率與每幀CPU時間"""
+    client = DobotApi(host, 30004)
+    try:
+        client.socket_dobot.settimeout(2.0)
+        reader = FeedbackReader(client.socket_dobot)
+        reader.read_frame()
+
+        decode_samples = []
+        frames = 0
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            frame = reader.read_frame()
+            t0 = time.perf_counter()
+            decode_feedback(frame)
+            decode_samples.append(time.perf_counter() - t0)
+            frames += 1
+        elapsed = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start
+    finally:
+        client.close()
+
+    return {
+        'frames': frames,
+        'fps': frames / elapsed,
+        'cpu_us_per_frame': cpu / max(frames, 1) * 1e6,
+        'invalid_frames': reader.invalid_count,
+        'decode': summarize(decode_samples),
+    }
+
+
+def bench_decode(frame_count):
+    """以本地socketpair推送預先產生的幀，測量讀取 + 解析的最大吞吐量"""
+    frame = np.zeros(1, dtype=MyType)
+    frame['len'] = MyType.itemsize
+    frame['test_value'] = FEEDBACK_TEST_VALUE
+    frame['robot_mode'] = 5
+    payload = frame.tobytes() * 256
+
+    receiver, sender = socket.socketpair()
+
+    def feed():
+        remaining = frame_count
+        try:
+            while remaining > 0:
+                batch = min(remaining, 256)
+                sender.sendall(payload[:batch * MyType.itemsize])
+                remaining -= batch
+        except OSError:
+            pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        reader = FeedbackReader(receiver)
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        for _ in range(frame_count):
+            decode_feedback(reader.read_frame())
+        elapsed = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start
+    finally:
+        receiver.close()
+        sender.close()
+        feeder.join(timeout=1.0)
+
+    return {
+        'frames': frame_count,
+        'fps': frame_count / elapsed,
+        'cpu_us_per_frame': cpu / frame_count * 1e6,
+    }
+
+
+# ==================== 運動學 ====================
+
+def bench_kinematics(point_count, repeats=20):
+    """測量整批正解、逆解（左右手系）與可達性檢查的耗時"""
+    rng = np.random.default_rng(0)
+    low, high = kinematics.JOINT_LIMITS[:, 0], kinematics.JOINT_LIMITS[:, 1]
+    joints = rng.uniform(low, high, size=(point_count, 4))
+    poses = kinematics.forward_kinematics(joints)
+
+    cases = {
+        'forward': lambda: kinematics.forward_kinematics(joints),
+        'inverse_right': lambda: kinematics.inverse_kinematics(poses, kinematics.HAND_RIGHT),
+        'inverse_left': lambda: kinematics.inverse_kinematics(poses, kinematics.HAND_LEFT),
+        'reachable': lambda: kinematics.reachable(poses, kinematics.HAND_RIGHT),
+    }
+    results = {'points': point_count}
+    for name, call in cases.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - start)
+        summary = summarize(samples)
+        summary['us_per_point'] = summary['p50_ms'] * 1000.0 / point_count
+        results[name] = summary
+    return results
+
+
+# ==================== Qt信號 ====================
+
+def bench_qt_emit(iterations):
+    """測量 feedback_update 信號的直接連接與佇列連接成本"""
+    try:
+        from PyQt5.QtCore import QCoreApplication, QObject, Qt, pyqtSignal
+    except ImportError:
+        return {'skipped': 'PyQt5 未安裝'}
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+    class Emitter(QObject):
+        feedback_update = pyqtSignal(dict)
+
+    class Receiver(QObject):
+        def __init__(self):
+            super().__init__()
+            self.count = 0
+
+        def on_feedback(self, data):
+            self.count += 1
+
+    frame = np.zeros(1, dtype=MyType)
+    frame['test_value'] = FEEDBACK_TEST_VALUE
+    data = decode_feedback(frame)
+    results = {}
+
+    for label, connection in (('direct', Qt.DirectConnection), ('queued', Qt.QueuedConnection)):
+        emitter = Emitter()
+        receiver = Receiver()
+        emitter.feedback_update.connect(receiver.on_feedback, connection)
+
+        samples = []
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            emitter.feedback_update.emit(data)
+            samples.append(time.perf_counter() - t0)
+        emit_elapsed = time.perf_counter() - start
+
+        # 佇列連接的實際處理在事件循環中，另外計算派送時間
+        t0 = time.perf_counter()
+        while receiver.count < iterations:
+            app.processEvents()
+        dispatch = time.perf_counter() - t0
+        cpu = time.thread_time() - cpu_start
+
+        results[label] = {
+            'emit': summarize(samples),
+            'emit_us_per_call': emit_elapsed / iterations * 1e6,
+            'dispatch_us_per_call': dispatch / iterations * 1e6,
+            'cpu_us_per_call': cpu / iterations * 1e6,
+        }
+    return results
+
+
+def run(options):
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'controller': options.host or 'simulator',
+        },
+    }
+
+    def run_against(host):
+        if 'commands' not in options.skip:
+            results['commands'] = bench_commands(host, options.iterations, 'move' not in options.skip)
+        if 'stream' not in options.skip:
+            results['stream'] = bench_stream(host, options.duration)
+
+    if options.host:
+        run_against(options.host)
+    elif not {'commands', 'stream'} <= set(options.skip):
+        with simulator_process(options.rate) as host:
+            run_against(host)
+
+    if 'decode' not in options.skip:
+        results['decode'] = bench_decode(options.frames)
+    if 'kinematics' not in options.skip:
+        results['kinematics'] = bench_kinematics(options.frames)
+    if 'qt_emit' not in options.skip:
+        results['qt_emit'] = bench_qt_emit(options.frames)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dobot API 性能基準測試")
+    parser.add_argument('--host', help="控制器IP，未指定時自動啟動本地模擬器")
+    parser.add_argument('--rate', type=float, default=125.0, help="模擬器反饋頻率 (Hz)")
+    parser.add_argument('--iterations', type=int, default=200, help="每條指令的測量次數")
+    parser.add_argument('--duration', type=float, default=5.0, help="反饋流測量秒數")
+    parser.add_argument('--frames', type=int, default=20000, help="解析吞吐量與Qt信號測量次數")
+    parser.add_argument('--skip', nargs='*', default=[],
+                        choices=['commands', 'move', 'stream', 'decode', 'kinematics', 'qt_emit'], help="略過的項目")
+    parser.add_argument('--output', help="結果輸出檔案，未指定時輸出到標準輸出")
+    options = parser.parse_args()
+
+    results = run(options)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""
+週期時間估算與速度參數最佳化
+
+以梯形（或限制加加速度的S型）速度曲線估算點位序列的執行時間，
+速度與加速度依 SpeedFactor、SpeedJ/SpeedL、AccJ/AccL 與每段指令參數計算，並扣除CP平滑過渡節省的時間。
+運動模型的最大速度與加速度可由 FeedbackRecorder 錄製的實機反饋校正
+
+用法:
+    model = calibrate_model('recordings/feedback_20250101_120000')
+    estimate = estimate_sequence(steps, start_joints, MotionSettings(speed_factor=80), model)
+    steps, before, after = optimize_sequence(steps, start_joints, settings, model,
+                                             OptimizerLimits(tcp_speed_limit=500, max_corner_deviation=2.0))
+"""
+import json
+from collections import namedtuple
+import numpy as np
+import kinematics
+from kinematics import HAND_RIGHT
+from preflight import plan_joints
+
+# 控制器目前的全局速度設定（比例 1~100）
+MotionSettings = namedtuple('MotionSettings', ['speed_factor', 'speed_j', 'speed_l', 'acc_j', 'acc_l', 'cp'],
+                            defaults=(100, 50, 50, 50, 50, 0))
+
+# 最佳化限制: 速度/加速度/CP比例上限；tcp_speed_limit 為末端線速度上限 (mm/s，None 表示不限制)；
+# keep_stops 為True時，CP為0的段（例如夾爪動作前的停止點）保持停止；
+# max_corner_deviation 為CP過渡時離開示教點的估計距離上限 (mm，None 表示不限制)；
+# max_rounds 為座標下降搜尋的最多輪數
+OptimizerLimits = namedtuple('OptimizerLimits', ['max_speed', 'max_acc', 'max_cp', 'tcp_speed_limit', 'keep_stops',
+                                                 'max_corner_deviation', 'max_rounds'],
+                             defaults=(100, 100, 100, None, True, None, 4))
+
+# total: 總時間 (s)；durations: 每段單獨執行的時間；blend_savings: 每段與下一段過渡節省的時間
+CycleEstimate = namedtuple('CycleEstimate', ['total', 'durations', 'blend_savings'])
+
+
+class MotionModel:
+    """
+    機械臂運動模型（100%比例時的最大值）
+    joint_max_speed / joint_max_acc: J1/J2/J4 為度，J3 為mm
+    joint_max_jerk / linear_max_jerk: None 表示梯形曲線
+    blend_gain: CP=100 時節省的減速+加速時間比例
+    segment_overhead: 每段運動的固定規劃時間 (s)
+    """
+
+    FIELDS = ('joint_max_speed', 'joint_max_acc', 'joint_max_jerk', 'linear_max_speed', 'linear_max_acc',
+              'linear_max_jerk', 'rotation_max_speed', 'rotation_max_acc', 'blend_gain', 'segment_overhead')
+
+    def __init__(self, joint_max_speed=(180.0, 180.0, 1000.0, 1000.0), joint_max_acc=(720.0, 720.0, 4000.0, 4000.0),
+                 joint_max_jerk=None, linear_max_speed=1000.0, linear_max_acc=4000.0, linear_max_jerk=None,
+                 rotation_max_speed=1000.0, rotation_max_acc=4000.0, blend_gain=0.5, segment_overhead=0.0):
+        self.joint_max_speed = np.asarray(joint_max_speed, dtype=np.float64)
+        self.joint_max_acc = np.asarray(joint_max_acc, dtype=np.float64)
+        self.joint_max_jerk = None if joint_max_jerk is None else np.asarray(joint_max_jerk, dtype=np.float64)
+        self.linear_max_speed = float(linear_max_speed)
+        self.linear_max_acc = float(linear_max_acc)
+        self.linear_max_jerk = linear_max_jerk
+        self.rotation_max_speed = float(rotation_max_speed)
+        self.rotation_max_acc = float(rotation_max_acc)
+        self.blend_gain = float(blend_gain)
+        self.segment_overhead = float(segment_overhead)
+
+    def to_dict(self):
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            data[name] = value.tolist() if isinstance(value, np.ndarray) else value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+# ==================== 速度曲線 ====================
+
+def profile_time(distance, speed, acc, jerk=None):
+    """
+    起止速度為零的單軸運動時間（陣列運算）
+    jerk 為None時使用梯形曲線，否則使用限制加加速度的S型曲線
+    回傳 (總時間, 加速段時間)
+    """
+    d = np.abs(np.asarray(distance, dtype=np.float64))
+    v, a = np.broadcast_arrays(np.asarray(speed, dtype=np.float64), np.asarray(acc, dtype=np.float64))
+
+    if jerk is None:
+        # 加速到最大速度再減速所需距離 v²/a；距離不足時為三角形曲線
+        cruise = d >= v * v / a
+        peak = np.where(cruise, v, np.sqrt(d * a))
+        ramp = peak / a
+        total = np.where(cruise, d / v + v / a, 2.0 * ramp)
+        return total, ramp
+
+    j = np.broadcast_to(np.asarray(jerk, dtype=np.float64), d.shape)
+
+    def ramp_time(peak):
+        # 達到最大加速度時為 v/a + a/j，否則為 2*sqrt(v/j)
+        return np.where(peak >= a * a / j, peak / a + a / j, 2.0 * np.sqrt(peak / j))
+
+    full_ramp = ramp_time(v)
+    cruise = d >= v * full_ramp
+    # 距離不足時求解峰值速度: 先假設達到最大加速度，不成立時改用純S型
+    peak = (np.sqrt((a / j) ** 2 + 4.0 * d / a) - a / j) * a / 2.0
+    peak = np.where(peak >= a * a / j, peak, np.cbrt(d * d * j / 4.0))
+    peak = np.where(cruise, v, peak)
+    ramp = ramp_time(peak)
+    total = np.where(cruise, d / v + full_ramp, 2.0 * ramp)
+    return total, ramp
+
+
+def _ratio(*values):
+    """多個百分比相乘，例如 SpeedFactor × SpeedJ"""
+    result = 1.0
+    for value in values:
+        result = result * (np.asarray(value, dtype=np.float64) / 100.0)
+    return result
+
+
+def _step_params(steps, settings):
+    """每段實際使用的速度/加速度/CP比例（指令參數優先於全局設定）"""
+    is_linear = np.array([step.motion_type == 'MovL' for step in steps], dtype=bool)
+    speed = np.array([step.speed if step.speed is not None else
+                      (settings.speed_l if linear else settings.speed_j)
+                      for step, linear in zip(steps, is_linear)], dtype=np.float64)
+    acc = np.array([step.acc if step.acc is not None else
+                    (settings.acc_l if linear else settings.acc_j)
+                    for step, linear in zip(steps, is_linear)], dtype=np.float64)
+    cp = np.array([step.cp if step.cp is not None else settings.cp for step in steps], dtype=np.float64)
+    return is_linear, speed, acc, cp
+
+
+def _segment_times(start_joints, end_joints, start_poses, end_poses, is_linear, speed, acc, settings, model):
+    """每段運動時間與加速段時間"""
+    count = len(is_linear)
+    durations = np.zeros(count)
+    ramps = np.zeros(count)
+
+    # 關節運動: 各軸同步，由最慢的軸決定時間
+    joint = ~is_linear
+    if joint.any():
+        v = model.joint_max_speed * _ratio(settings.speed_factor, speed[joint])[:, None]
+        a = model.joint_max_acc * _ratio(settings.speed_factor, acc[joint])[:, None]
+        total, ramp = profile_time(end_joints[joint] - start_joints[joint], v, a, model.joint_max_jerk)
+        slowest = np.argmax(total, axis=1)
+        rows = np.arange(total.shape[0])
+        durations[joint] = total[rows, slowest]
+        ramps[joint] = ramp[rows, slowest]
+
+    # 直線運動: 路徑長度與R軸旋轉分別計算
+    if is_linear.any():
+        v_ratio = _ratio(settings.speed_factor, speed[is_linear])
+        a_ratio = _ratio(settings.speed_factor, acc[is_linear])
+        length = np.linalg.norm(end_poses[is_linear, :3] - start_poses[is_linear, :3], axis=1)
+        rotation = end_poses[is_linear, 3] - start_poses[is_linear, 3]
+        t_linear, r_linear = profile_time(length, model.linear_max_speed * v_ratio,
+                                          model.linear_max_acc * a_ratio, model.linear_max_jerk)
+        t_rotation, r_rotation = profile_time(rotation, model.rotation_max_speed * v_ratio,
+                                              model.rotation_max_acc * a_ratio)
+        durations[is_linear] = np.maximum(t_linear, t_rotation)
+        ramps[is_linear] = np.where(t_linear >= t_rotation, r_linear, r_rotation)
+
+    return np.nan_to_num(durations), np.nan_to_num(ramps)
+
+
+def _plan(steps, start_joints, hand):
+    """每段的起點/終點關節角度與笛卡爾座標；沒有起點時第一段視為原地運動"""
+    targets, end_joints, _ = plan_joints(steps, hand)
+    start = np.empty_like(end_joints)
+    start[0] = end_joints[0] if start_joints is None else np.asarray(start_joints, dtype=np.float64)[:4]
+    start[1:] = end_joints[:-1]
+    start_poses = kinematics.forward_kinematics(start)
+    start_poses[1:] = targets[:-1]
+    return start, end_joints, start_poses, targets
+
+
+def _evaluate(plan, is_linear, speed, acc, cp, settings, model):
+    """以已規劃的路徑估算時間，回傳 (CycleEstimate, 每段加速段時間)"""
+    start, end_joints, start_poses, targets = plan
+    durations, ramps = _segment_times(start, end_joints, start_poses, targets, is_linear, speed, acc, settings, model)
+
+    # CP過渡: 與下一段重疊部分的減速與加速時間
+    savings = np.zeros(len(is_linear))
+    savings[:-1] = cp[:-1] / 100.0 * model.blend_gain * np.minimum(ramps[:-1], ramps[1:])
+    total = durations.sum() - savings.sum() + model.segment_overhead * len(is_linear)
+    return CycleEstimate(float(total), durations, savings), ramps
+
+
+def estimate_sequence(steps, start_joints=None, settings=MotionSettings(), model=None, hand=HAND_RIGHT):
+    """
+    估算序列執行時間
+    steps: SequenceStep 列表；speed/acc/cp 為None時使用 settings 中的全局設定
+    start_joints: 序列開始時的關節角度
+    回傳 CycleEstimate
+    """
+    model = model or MotionModel()
+    if not steps:
+        return CycleEstimate(0.0, np.zeros(0), np.zeros(0))
+
+    plan = _plan(steps, start_joints, hand)
+    is_linear, speed, acc, cp = _step_params(steps, settings)
+    estimate, _ = _evaluate(plan, is_linear, speed, acc, cp, settings, model)
+    return estimate
+
+
+# ==================== 最佳化 ====================
+
+def _path_gradients(plan, is_linear, samples=32):
+    """關節運動段末端位置對路徑參數的最大導數 (mm)，直線運動段為路徑長度"""
+    start, end_joints, start_poses, targets = plan
+    gradients = np.linalg.norm(targets[:, :3] - start_poses[:, :3], axis=1)
+    s = np.linspace(0.0, 1.0, samples)[:, None, None]
+    joint = ~is_linear
+    if joint.any():
+        path = kinematics.forward_kinematics(start[joint] + (end_joints[joint] - start[joint]) * s)
+        gradients[joint] = np.linalg.norm(np.diff(path[..., :3], axis=0), axis=-1).max(axis=0) * (samples - 1)
+    return np.nan_to_num(gradients)
+
+
+def _peak_tcp_speeds(plan, gradients, is_linear, speed, acc, settings, model):
+    """每段運動過程中的最大末端線速度 (mm/s)"""
+    start, end_joints, _, _ = plan
+    peaks = np.zeros(len(is_linear))
+    joint = ~is_linear
+    if joint.any():
+        distance = np.abs(end_joints[joint] - start[joint])
+        v = model.joint_max_speed * _ratio(settings.speed_factor, speed[joint])[:, None]
+        a = model.joint_max_acc * _ratio(settings.speed_factor, acc[joint])[:, None]
+        total, _ = profile_time(distance, v, a, model.joint_max_jerk)
+        rows = np.arange(len(distance))
+        axis = np.argmax(np.nan_to_num(total), axis=1)
+        d = distance[rows, axis]
+        # 最慢軸的峰值速度換算為路徑參數速度
+        peak = np.minimum(v[rows, axis], np.sqrt(d * a[rows, axis]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peaks[joint] = np.where(d > 0, gradients[joint] * peak / d, 0.0)
+    if is_linear.any():
+        v = model.linear_max_speed * _ratio(settings.speed_factor, speed[is_linear])
+        a = model.linear_max_acc * _ratio(settings.speed_factor, acc[is_linear])
+        peaks[is_linear] = np.minimum(v, np.sqrt(gradients[is_linear] * a))
+    return np.nan_to_num(peaks)
+
+
+def corner_deviations(estimate, peaks):
+    """
+    CP過渡時離開示教點的估計距離 (mm): 過渡重疊時間內以兩段中較低的峰值速度切過轉角，
+    約為 重疊時間 × 速度 / 4；最後一段為0
+    """
+    deviations = np.zeros(len(peaks))
+    deviations[:-1] = 0.25 * estimate.blend_savings[:-1] * np.minimum(peaks[:-1], peaks[1:])
+    return deviations
+
+
+def optimize_sequence(steps, start_joints=None, settings=MotionSettings(), model=None, limits=OptimizerLimits(),
+                      hand=HAND_RIGHT):
+    """
+    搜尋每段的 Speed/Acc/CP 參數以縮短週期時間
+    從「最大可行速度、最大加速度、全部停止(CP=0)」開始做座標下降: 每輪逐段逐參數試過候選值，
+    以整個序列的估算時間比較，只接受縮短時間且符合限制的值，直到一輪內沒有改善
+    限制: 各比例上限、末端線速度上限 (tcp_speed_limit)、CP過渡的轉角偏差上限 (max_corner_deviation)，
+    keep_stops 時CP為0的段與最後一段保持停止
+    回傳 (最佳化後的 SequenceStep 列表, 原估算, 最佳化後估算)
+    """
+    model = model or MotionModel()
+    before = estimate_sequence(steps, start_joints, settings, model, hand)
+    if not steps:
+        return [], before, before
+
+    plan = _plan(steps, start_joints, hand)
+    is_linear, _, _, _ = _step_params(steps, settings)
+    gradients = _path_gradients(plan, is_linear)
+    count = len(steps)
+
+    # CP只能在可過渡的段搜尋
+    blendable = np.ones(count, dtype=bool)
+    blendable[-1] = False
+    if limits.keep_stops:
+        blendable &= np.array([step.cp is None or step.cp != 0 for step in steps], dtype=bool)
+
+    def candidates(maximum, minimum):
+        return sorted({int(round(maximum * fraction)) for fraction in (1.0, 0.75, 0.5, 0.25, 0.1)} - {0} | {minimum},
+                      reverse=True)
+
+    levels = {
+        'speed': candidates(limits.max_speed, 1),
+        'acc': candidates(limits.max_acc, 1),
+        'cp': candidates(limits.max_cp, 0),
+    }
+
+    def evaluate(values):
+        """回傳 (估算, 是否符合限制)"""
+        estimate, _ = _evaluate(plan, is_linear, values['speed'], values['acc'], values['cp'], settings, model)
+        if limits.tcp_speed_limit is None and limits.max_corner_deviation is None:
+            return estimate, True
+        peaks = _peak_tcp_speeds(plan, gradients, is_linear, values['speed'], values['acc'], settings, model)
+        if limits.tcp_speed_limit is not None and (peaks > limits.tcp_speed_limit + 1e-9).any():
+            return estimate, False
+        if limits.max_corner_deviation is not None and \
+                (corner_deviations(estimate, peaks) > limits.max_corner_deviation + 1e-9).any():
+            return estimate, False
+        return estimate, True
+
+    # 起點: 全部停止，每段取不超過末端線速度上限的最大速度比例（隨速度單調增加，二分搜尋）
+    values = {
+        'speed': np.full(count, float(limits.max_speed)),
+        'acc': np.full(count, float(limits.max_acc)),
+        'cp': np.zeros(count),
+    }
+    if limits.tcp_speed_limit is not None:
+        for index in range(count):
+            low, high = 1, int(limits.max_speed)
+            while low < high:
+                middle = (low + high + 1) // 2
+                values['speed'][index] = middle
+                peak = _peak_tcp_speeds(plan, gradients, is_linear, values['speed'], values['acc'],
+                                        settings, model)[index]
+                if peak <= limits.tcp_speed_limit:
+                    low = middle
+                else:
+                    high = middle - 1
+            values['speed'][index] = low
+    best, _ = evaluate(values)
+
+    for _ in range(limits.max_rounds):
+        improved = False
+        for index in range(count):
+            for name in ('cp', 'acc', 'speed'):
+                if name == 'cp' and not blendable[index]:
+                    continue
+                current = values[name][index]
+                for candidate in levels[name]:
+                    if candidate == current:
+                        continue
+                    values[name][index] = candidate
+                    estimate, feasible = evaluate(values)
+                    if feasible and estimate.total < best.total - 1e-9:
+                        best = estimate
+                        current = candidate
+                        improved = True
+                    values[name][index] = current
+        if not improved:
+            break
+
+    optimized = [step._replace(speed=int(speed), acc=int(acc), cp=int(cp))
+                 for step, speed, acc, cp in zip(steps, values['speed'], values['acc'], values['cp'])]
+    after = estimate_sequence(optimized, start_joints, settings, model, hand)
+    return optimized, before, after
+
+
+# ==================== 校正 ====================
+
+def calibrate_model(recording, model=None, percentile=99.0, min_samples=20, smoothing=5):
+    """
+    以錄製的反饋校正運動模型的最大速度與加速度
+    recording: FeedbackRecorder 錄製路徑，或 (frames, timestamps) 陣列
+    每幀的實際速度除以當時的速度比例（speed_scaling × velocityRatio）即為100%時的速度，
+    取運動中樣本的高百分位數作為最大值；錄製時應包含達到最高速度的長距離運動
+    樣本不足的項目保留原模型的值
+    """
+    if isinstance(recording, str):
+        from feedback import load_recording
+        frames, timestamps = load_recording(recording)
+    else:
+        frames, timestamps = recording
+    model = MotionModel.from_dict((model or MotionModel()).to_dict())
+    if len(frames) < min_samples:
+        return model
+
+    # 控制器計時器 (ms) 比接收時間穩定，不可用時改用接收時間
+    controller_time = frames['controller_timer'].astype(np.float64) / 1000.0
+    seconds = controller_time if np.all(np.diff(controller_time) > 0) else np.asarray(timestamps, dtype=np.float64)
+
+    factor = frames['speed_scaling'].astype(np.float64) / 100.0
+    joint_v_ratio = factor * frames['velocityRatio'][:, 0] / 100.0
+    joint_a_ratio = factor * frames['accelerationRatio'][:, 0] / 100.0
+    linear_v_ratio = factor * frames['xyzVelocityRatio'][:, 0] / 100.0
+    linear_a_ratio = factor * frames['xyzAccelerationRatio'][:, 0] / 100.0
+
+    def smooth(values):
+        if smoothing <= 1:
+            return values
+        kernel = np.ones(smoothing) / smoothing
+        return np.apply_along_axis(lambda column: np.convolve(column, kernel, mode='same'), 0, values)
+
+    def peak(values, ratio):
+        valid = (ratio > 0) & (values > 1e-3)
+        if valid.sum() < min_samples:
+            return None
+        return float(np.percentile(values[valid] / ratio[valid], percentile))
+
+    joint_speed = smooth(np.abs(frames['qd_actual'][:, :4]))
+    joint_acc = np.abs(np.gradient(smooth(frames['qd_actual'][:, :4]), seconds, axis=0))
+    for axis in range(4):
+        value = peak(joint_speed[:, axis], joint_v_ratio)
+        if value is not None:
+            model.joint_max_speed[axis] = value
+        value = peak(joint_acc[:, axis], joint_a_ratio)
+        if value is not None:
+            model.joint_max_acc[axis] = value
+
+    tcp_velocity = smooth(frames['TCP_speed_actual'][:, :3])
+    value = peak(np.linalg.norm(tcp_velocity, axis=1), linear_v_ratio)
+    if value is not None:
+        model.linear_max_speed = value
+    value = peak(np.linalg.norm(np.gradient(tcp_velocity, seconds, axis=0), axis=1), linear_a_ratio)
+    if value is not None:
+        model.linear_max_acc = value
+    return model
+
+
+def calibrate_overhead(model, steps, measured_time, start_joints=None, settings=MotionSettings(), hand=HAND_RIGHT):
+    """
+    以實際量測的序列總時間校正每段固定規劃時間
+    回傳新的 MotionModel
+    """
+    model = MotionModel.from_dict(model.to_dict())
+    if not steps:
+        return model
+    model.segment_overhead = 0.0
+    estimate = estimate_sequence(steps, start_joints, settings, model, hand)
+    model.segment_overhead = max((measured_time - estimate.total) / len(steps), 0.0)
+    return model
@@ -1,5 +1,7 @@
 import socket
 import threading
+import time
+import collections
 from tkinter import Text, END
 import datetime
 import numpy as np
@@ -102,12 +104,108 @@ def alarmAlarmJsonFile():
     return dataController, dataServo
 
 
+class DobotReply:
+    """
+    指令回覆解析結果
+    回覆格式: ErrorID,{values},Cmd(params);
+    """
+
+    def __init__(self, error_id, values, command, raw):
+        self.error_id = error_id    # 0 表示成功
+        self.values = values        # 大括號內的回傳值列表
+        self.command = command      # 回傳的原始指令，例如 SpeedJ(50)
+        self.raw = raw
+
+    @property
+    def ok(self):
+        return self.error_id == 0
+
+    @property
+    def name(self):
+        """指令名稱，例如 SpeedJ"""
+        return self.command.split('(', 1)[0].strip()
+
+    @property
+    def value(self):
+        """第一個回傳值，沒有回傳值時為None"""
+        return self.values[0] if self.values else None
+
+    def __repr__(self):
+        return f"DobotReply(error_id={self.error_id}, values={self.values}, command={self.command!r})"
+
+
+def _parse_reply_values(text):
+    """解析大括號內的回傳值，支援數值列表與 GetErrorID 的巢狀列表"""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        return json.loads("[" + text + "]")
+    except ValueError:
+        pass
+
+    # 非JSON格式時依逗號切分，能轉為數值的轉為數值
+    values = []
+    for token in text.split(","):
+        token = token.strip()
+        try:
+            values.append(int(token))
+        except ValueError:
+            try:
+                values.append(float(token))
+            except ValueError:
+                values.append(token)
+    return values
+
+
+def parse_reply(reply):
+    """
+    解析指令回覆字串為 DobotReply
+    reply: sendRecvMsg 回傳的字串，例如 "0,{5},RobotMode();"
+    格式錯誤或空回覆時拋出 ValueError
+    """
+    raw = reply
+    reply = reply.strip().rstrip(";").strip()
+    if not reply:
+        raise ValueError("空回覆")
+
+    error_text, _, rest = reply.partition(",")
+    try:
+        error_id = int(error_text)
+    except ValueError:
+        raise ValueError(f"回覆格式錯誤: {raw}")
+
+    start = rest.find("{")
+    end = rest.rfind("}")
+    if start == -1 or end < start:
+        return DobotReply(error_id, [], rest.strip(), raw)
+
+    values = _parse_reply_values(rest[start + 1:end])
+    command = rest[end + 1:].lstrip(",").strip()
+    return DobotReply(error_id, values, command, raw)
+
+
+def _command_name(command):
+    """指令字串的名稱，例如 SpeedJ(50) -> SpeedJ"""
+    return command.split('(', 1)[0].strip()
+
+
+def _reply_name(data):
+    """回覆中回傳的指令名稱，無法解析時回傳None（不做比對）"""
+    try:
+        name = parse_reply(str(data, encoding="utf-8")).name
+    except ValueError:
+        return None
+    return name or None
+
+
 class DobotApi:
     def __init__(self, ip, port, *args):
         self.ip = ip
         self.port = port
         self.socket_dobot = 0
         self.__globalLock = threading.Lock()
+        self._recv_buffer = bytearray()
         self.text_log: Text = None
         if args:
             self.text_log = args[0]
@@ -138,13 +236,36 @@ class DobotApi:
         except Exception as e:
             print(e)
 
-    def wait_reply(self):
+    def _read_reply(self):
+        """從緩衝區取出一則以 ';' 結尾的完整回覆，不足時繼續接收"""
+        while True:
+            end = self._recv_buffer.find(b";")
+            if end != -1:
+                data = bytes(self._recv_buffer[:end + 1])
+                del self._recv_buffer[:end + 1]
+                return data
+            chunk = self.socket_dobot.recv(1024)
+            if len(chunk) == 0:
+                raise ConnectionError(f"端口 {self.port} 連線已關閉")
+            self._recv_buffer += chunk
+
+    def wait_reply(self, command=None):
         """
         讀取回傳值
+        依協議的 ';' 結尾切分回覆，同一次接收到的多餘位元組保留給下一次呼叫；
+        command: 送出的指令字串，指定時只接受回覆中指令名稱相同的回覆，
+        名稱不同的回覆是先前逾時才到達的舊回覆，直接丟棄，避免後續指令收到錯位的回覆
         """
+        expected = _command_name(command) if command else None
         data = ""
         try:
-            data = self.socket_dobot.recv(1024)
+            while True:
+                data = self._read_reply()
+                name = _reply_name(data)
+                if expected is None or name is None or name == expected:
+                    break
+                self.log(f"丟棄過時回覆 {self.ip}:{self.port}: {str(data, encoding='utf-8')}")
+                data = ""
         except Exception as e:
             print(e)
 
@@ -169,9 +290,43 @@ class DobotApi:
         """
         with self.__globalLock:
             self.send_data(string)
-            recvData = self.wait_reply()
+            recvData = self.wait_reply(string)
             return recvData
 
+    def sendRecvReply(self, string):
+        """
+        發送-接收同步處理，回傳解析後的 DobotReply
+        """
+        return parse_reply(self.sendRecvMsg(string))
+
+    def sendRecvMany(self, strings):
+        """
+        連續發送多個指令後再讀取全部回覆，整批只需一次往返延遲
+        回覆依回傳的指令名稱對應（同一批的指令名稱不可重複），無法解析名稱的回覆依序對應
+        回傳與 strings 相同順序的回覆字串列表，未收到回覆的項目為空字串
+        """
+        replies = [""] * len(strings)
+        with self.__globalLock:
+            for string in strings:
+                self.send_data(string)
+            pending = {_command_name(string): index for index, string in enumerate(strings)}
+            try:
+                while pending:
+                    data = self._read_reply()
+                    data_str = str(data, encoding="utf-8")
+                    name = _reply_name(data)
+                    if name is None:
+                        name = next(iter(pending))
+                    index = pending.pop(name, None)
+                    if index is None:
+                        self.log(f"丟棄過時回覆 {self.ip}:{self.port}: {data_str}")
+                        continue
+                    self.log(f'接收自 {self.ip}:{self.port}: {data_str}')
+                    replies[index] = data_str
+            except Exception as e:
+                print(e)
+        return replies
+
     def __del__(self):
         self.close()
 
@@ -645,6 +800,109 @@ class DobotApiDashboard(DobotApi):
         return self.sendRecvMsg(string)
 
 
+class DobotApiEmergencyStop(DobotApi):
+    """
+    緊急停止專用通道
+    在29999端口建立獨立的預先連線，只用來發送EmergencyStop，
+    不經過全局鎖，也不會排在其他Dashboard指令或未到達的回覆後面
+    """
+
+    def __init__(self, ip, port=29999, *args):
+        super().__init__(ip, port, *args)
+        self.socket_dobot.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._ack_lock = threading.Lock()
+        # 已發送與已讀取的緊急停止次數，兩者的差為尚未讀取的回應數量
+        self._count_lock = threading.Lock()
+        self._sent = 0
+        self._acked = 0
+        self.ack_timeout = 1.0
+        self.last_latency = None
+        self.latencies = collections.deque(maxlen=100)
+
+    def _reconnect(self):
+        """重新建立通道連線"""
+        try:
+            self.socket_dobot.close()
+        except Exception:
+            pass
+        self.socket_dobot = socket.create_connection((self.ip, self.port), timeout=self.ack_timeout)
+        self.socket_dobot.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._recv_buffer = bytearray()
+        # 舊連線上未讀取的回應不會再到達
+        self._acked = self._sent
+
+    def _drain_buffered(self):
+        """丟棄緩衝區中已完整接收的舊回應（不讀取socket），計入已讀取的次數（呼叫時需持有 _ack_lock）"""
+        while True:
+            end = self._recv_buffer.find(b";")
+            if end == -1:
+                return
+            data = bytes(self._recv_buffer[:end + 1])
+            del self._recv_buffer[:end + 1]
+            if _reply_name(data) == "EmergencyStop":
+                self._acked += 1
+
+    def trigger(self):
+        """
+        立即發送緊急停止並等待控制器回應
+        回傳 (回應字串, 發送到回應的延遲秒數)；未收到回應時延遲為None
+        多個線程同時觸發時都會立即發送，只有一個線程讀取回應；
+        讀取的線程依發送次數跳過較早（其他線程或先前逾時）的回應，延遲只以本次發送的回應計算
+        """
+        command = b"EmergencyStop()"
+        owner = self._ack_lock.acquire(blocking=False)
+        try:
+            if owner:
+                self._drain_buffered()
+            with self._count_lock:
+                self._sent += 1
+                sequence = self._sent
+            try:
+                start = time.perf_counter()
+                self.socket_dobot.sendall(command)
+            except OSError:
+                # 通道中斷時重連後再發送
+                with self._count_lock:
+                    self._reconnect()
+                    self._acked = sequence - 1
+                start = time.perf_counter()
+                self.socket_dobot.sendall(command)
+
+            if not owner:
+                return "", None
+            self.socket_dobot.settimeout(self.ack_timeout)
+            reply = ""
+            while self._acked < sequence:
+                reply = self.wait_reply("EmergencyStop()")
+                if not reply:
+                    # 回應逾時：重新建立通道，避免遲到的回應被下一次觸發誤認
+                    try:
+                        with self._count_lock:
+                            self._reconnect()
+                    except OSError as e:
+                        self.log(f"緊急停止通道重連失敗: {str(e)}")
+                    break
+                self._acked += 1
+        finally:
+            if owner:
+                self._ack_lock.release()
+
+        if not reply:
+            return reply, None
+        latency = time.perf_counter() - start
+        self.last_latency = latency
+        self.latencies.append(latency)
+        self.log(f"緊急停止回應延遲: {latency * 1000:.2f}ms")
+        return reply, latency
+
+    def EmergencyStop(self):
+        """
+        緊急停止（專用通道）
+        """
+        reply, _ = self.trigger()
+        return reply
+
+
 class DobotApiMove(DobotApi):
     """
     定義dobot_api_move類別以建立與Dobot的運動控制連線
@@ -698,11 +956,22 @@ class DobotApiMove(DobotApi):
         print(string)
         return self.sendRecvMsg(string)
 
-    def Jump(self):
+    def Jump(self, x, y, z, r, *dynParams):
         """
-        門型運動（待實現）
+        門型運動介面（控制器依 Arch 選擇的門型參數與 LimZ 規劃抬升、平移、下降）
+        x: 笛卡爾座標系x座標值
+        y: 笛卡爾座標系y座標值
+        z: 笛卡爾座標系z座標值
+        r: 笛卡爾座標系R旋轉值
+        dynParams: 動態參數（SpeedJ, AccJ, CP等）
+        注意：韌體不支援時可改用 arch_motion.jump_steps 在本地規劃三段運動
         """
-        print("待實現")
+        string = "Jump({:f},{:f},{:f},{:f}".format(
+            x, y, z, r)
+        for params in dynParams:
+            string = string + "," + str(params)
+        string = string + ")"
+        return self.sendRecvMsg(string)
 
     def RelMovJ(self, x, y, z, r, *dynParams):
         """
@@ -0,0 +1,121 @@
+import threading
+import time
+from dobot_api import parse_reply
+
+# 機械臂錯誤模式
+ROBOT_MODE_ERROR = 9
+
+
+def decode_alarms(error_response):
+    """
+    解析 GetErrorID 回應為不可變的告警集合
+    回傳 tuple，第0項為控制器告警，第1~6項為各軸伺服告警，每項為排序後的告警ID tuple
+    """
+    reply = parse_reply(error_response)
+    if not reply.ok or not reply.values:
+        raise ValueError(f"GetErrorID 回應無效: {error_response}")
+    return tuple(tuple(sorted(ids)) for ids in reply.value)
+
+
+class ErrorMonitor:
+    """
+    告警監視器
+    由反饋線程每幀呼叫 update(robot_mode)，只在進入錯誤模式時查詢一次 GetErrorID，
+    錯誤持續期間以 poll_interval 低頻率重新查詢；查詢在獨立線程中執行，不會阻塞反饋線程。
+    解析後的告警集合會被快取，只有在集合改變時才呼叫 on_change
+
+    每次進入/離開錯誤模式都遞增 generation，查詢結果只在 generation 未改變時發布；
+    檢查、更新快取與 on_change 都在同一把鎖中，查詢期間離開錯誤模式時不會發布過時的告警
+    """
+
+    def __init__(self, fetch, on_change, poll_interval=1.0, on_fetch_error=None):
+        """
+        fetch: 回傳 GetErrorID 回應字串的函數，例如 client_dash.GetErrorID
+        on_change: 告警集合改變時呼叫 on_change(alarms)，alarms 為空 tuple 表示告警已清除
+        poll_interval: 錯誤持續期間重新查詢的間隔秒數
+        on_fetch_error: 查詢失敗時呼叫 on_fetch_error(exception)
+        """
+        self.fetch = fetch
+        self.on_change = on_change
+        self.on_fetch_error = on_fetch_error
+        self.poll_interval = poll_interval
+
+        self.alarms = ()
+        self.in_error = False
+        self.fetch_count = 0
+        self.generation = 0
+
+        self._last_request = 0.0
+        self._request = threading.Event()
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._request.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def update(self, robot_mode):
+        """
+        由反饋線程每幀呼叫，只做狀態比較，不進行任何通訊
+        """
+        now = time.monotonic()
+        if robot_mode == ROBOT_MODE_ERROR:
+            if not self.in_error:
+                # 進入錯誤模式：立即查詢
+                with self._lock:
+                    self.in_error = True
+                    self.generation += 1
+                self._last_request = now
+                self._request.set()
+            elif now - self._last_request >= self.poll_interval:
+                # 錯誤持續：低頻率重新查詢
+                self._last_request = now
+                self._request.set()
+        elif self.in_error:
+            # 離開錯誤模式：清除快取
+            with self._lock:
+                self.in_error = False
+                self.generation += 1
+                self._set_alarms(())
+
+    def refresh(self):
+        """要求立即重新查詢告警"""
+        self._last_request = time.monotonic()
+        self._request.set()
+
+    def _set_alarms(self, alarms):
+        """更新快取並通知（呼叫時需持有 _lock，通知順序與狀態轉換一致）"""
+        if alarms == self.alarms:
+            return
+        self.alarms = alarms
+        self.on_change(alarms)
+
+    def _worker_loop(self):
+        while self._running:
+            self._request.wait()
+            self._request.clear()
+            if not self._running:
+                break
+            generation = self.generation
+            try:
+                alarms = decode_alarms(self.fetch())
+                self.fetch_count += 1
+            except Exception as e:
+                if self.on_fetch_error:
+                    self.on_fetch_error(e)
+                continue
+            with self._lock:
+                # 查詢期間已離開（或重新進入）錯誤模式時忽略結果
+                if self.in_error and generation == self.generation:
+                    self._set_alarms(alarms)
@@ -0,0 +1,275 @@
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import numpy as np
+from dobot_api import MyType
+
+# 30004端口反饋幀大小與校驗值
+FEEDBACK_FRAME_SIZE = MyType.itemsize  # 1440
+FEEDBACK_TEST_VALUE = 0x123456789abcdef
+
+
+def decode_feedback(frame):
+    """
+    將反饋幀轉為UI使用的字典（純Python數值，不引用環形緩衝區）
+    frame: 長度為1的MyType陣列
+    """
+    record = frame[0]
+    return {
+        'speed_scaling': float(record['speed_scaling']),
+        'robot_mode': int(record['robot_mode']),
+        'digital_input_bits': int(record['digital_input_bits']),
+        'digital_outputs': int(record['digital_outputs']),
+        'q_actual': record['q_actual'][:4].tolist(),
+        'qd_actual': record['qd_actual'][:4].tolist(),
+        'tool_vector_actual': record['tool_vector_actual'][:4].tolist(),
+        'TCP_speed_actual': record['TCP_speed_actual'][:4].tolist()
+    }
+
+
+class FeedbackReader:
+    """
+    30004端口實時反饋讀取器
+    使用預分配的環形緩衝區與recv_into接收數據，每個槽位保留一個持久的MyType視圖，
+    解析一幀反饋不需要建立新的bytes物件
+
+    最新幀模式（latest_only=True）下，每次讀取都會把socket中積壓的幀全部讀完，
+    只回傳最新的一幀，並記錄被略過的幀數
+    """
+
+    def __init__(self, sock, ring_size=8, latest_only=False):
+        """
+        sock: 已連接30004端口的socket
+        ring_size: 環形緩衝區槽位數量，回傳的幀視圖在環形緩衝區繞回前保持有效
+        latest_only: 是否啟用最新幀模式
+        """
+        if ring_size < 1:
+            raise ValueError("ring_size 至少為1")
+
+        self.sock = sock
+        self.ring_size = ring_size
+        self.latest_only = latest_only
+
+        # 連續的預分配緩衝區，每個槽位對應一幀
+        self._buffer = bytearray(FEEDBACK_FRAME_SIZE * ring_size)
+        self._memory = memoryview(self._buffer)
+        self._frames = np.frombuffer(self._buffer, dtype=MyType)
+
+        # 每個槽位的持久視圖（與原本 np.frombuffer(data, dtype=MyType) 相同形狀）
+        self._slot_frames = [self._frames[i:i + 1] for i in range(ring_size)]
+        self._slot_memory = [self._memory[i * FEEDBACK_FRAME_SIZE:(i + 1) * FEEDBACK_FRAME_SIZE]
+                             for i in range(ring_size)]
+
+        # 接收狀態：逾時中斷時保留已讀取的位元組，下次呼叫繼續填滿同一槽位
+        self._slot = 0
+        self._filled = 0
+
+        # 統計數據
+        self.frame_count = 0
+        self.invalid_count = 0
+        self.skipped_count = 0
+        self.current = None
+        self.frame_time = None  # 目前幀接收完成的時間（time.monotonic）
+
+        # 反饋錄製器，設定後每個有效幀（包含最新幀模式略過的幀）都會被錄製
+        self.recorder = None
+
+    def _fill_slot(self):
+        """將目前槽位填滿一整幀，socket逾時會直接拋出並保留已讀取進度"""
+        view = self._slot_memory[self._slot]
+        while self._filled < FEEDBACK_FRAME_SIZE:
+            received = self.sock.recv_into(view[self._filled:], FEEDBACK_FRAME_SIZE - self._filled)
+            if received == 0:
+                raise ConnectionError("接收到空數據")
+            self._filled += received
+
+    def _receive(self):
+        """接收一整幀並驗證測試值，無效幀回傳None並由同一槽位覆寫"""
+        self._fill_slot()
+        self._filled = 0
+
+        frame = self._slot_frames[self._slot]
+        if frame['test_value'][0] != FEEDBACK_TEST_VALUE:
+            self.invalid_count += 1
+            return None
+
+        self._slot = (self._slot + 1) % self.ring_size
+        self.frame_count += 1
+        self.current = frame
+        self.frame_time = time.monotonic()
+
+        if self.recorder is not None:
+            self.recorder.record(frame, self.frame_time)
+        return frame
+
+    def _has_pending(self):
+        """socket中是否還有未讀取的數據"""
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        return bool(readable)
+
+    def read_frame(self):
+        """
+        讀取下一個有效反饋幀
+        回傳長度為1的MyType陣列視圖，用法與 np.frombuffer(data, dtype=MyType) 相同
+        回傳值會在 ring_size 幀之後被覆寫，需要保留請自行 copy()
+        """
+        frame = None
+        while frame is None:
+            frame = self._receive()
+
+        if self.latest_only:
+            frame = self.drain(frame)
+        return frame
+
+    def drain(self, frame=None):
+        """
+        讀完socket中積壓的幀，回傳最新的有效幀
+        frame: 目前已讀取的幀，略過的舊幀計入 skipped_count
+        積壓的最後一幀尚未完整時（socket逾時），保留已讀取進度並回傳目前最新的完整幀
+        """
+        latest = frame if frame is not None else self.current
+        while self._has_pending():
+            try:
+                received = self._receive()
+            except socket.timeout:
+                break
+            if received is None:
+                continue
+            if latest is not None:
+                self.skipped_count += 1
+            latest = received
+        return latest
+
+    def frame_age(self):
+        """目前幀自接收完成到現在經過的秒數，尚未接收任何幀時回傳None"""
+        if self.frame_time is None:
+            return None
+        return time.monotonic() - self.frame_time
+
+
+class FeedbackRecorder:
+    """
+    反饋錄製器
+    將每個有效的1440字節反饋幀原樣追加到 <path>.bin，主機單調時間戳（float64秒）追加到 <path>.ts，
+    兩個檔案的第N筆互相對應，可用 load_recording() 以 np.memmap 讀取
+    寫入由獨立線程執行，佇列已滿時直接丟棄並計數，不會阻塞反饋循環
+    """
+
+    def __init__(self, path, max_queue=4096, flush_interval=1.0):
+        """
+        path: 錄製檔案路徑（不含副檔名）
+        max_queue: 待寫入佇列的最大幀數
+        flush_interval: 寫入線程強制flush的間隔秒數
+        """
+        self.path = path
+        self.frames_file = path + ".bin"
+        self.times_file = path + ".ts"
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._running = False
+
+        # 統計數據
+        self.recorded_count = 0
+        self.dropped_count = 0
+
+    def start(self):
+        """開啟檔案並啟動寫入線程"""
+        if self._running:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """停止錄製，等待佇列中的幀寫入完成"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def record(self, frame, timestamp=None):
+        """
+        加入一幀到寫入佇列（由反饋線程呼叫）
+        frame: MyType陣列視圖，會複製一份再放入佇列
+        timestamp: 主機單調時間，預設為 time.monotonic()
+        """
+        if not self._running:
+            return False
+        if timestamp is None:
+            timestamp = time.monotonic()
+        try:
+            self._queue.put_nowait((frame.tobytes(), timestamp))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+
+    def _writer_loop(self):
+        """寫入線程：批次取出佇列中的幀寫入檔案"""
+        with open(self.frames_file, 'ab') as frames_f, open(self.times_file, 'ab') as times_f:
+            last_flush = time.monotonic()
+            stopping = False
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = ()
+
+                # 一次取出所有已排隊的幀
+                batch = []
+                while item is not None:
+                    if item:
+                        batch.append(item)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stopping = True
+
+                if batch:
+                    frames_f.write(b"".join(data for data, _ in batch))
+                    times_f.write(np.fromiter((ts for _, ts in batch), dtype=np.float64,
+                                              count=len(batch)).tobytes())
+                    self.recorded_count += len(batch)
+
+                now = time.monotonic()
+                if stopping or now - last_flush >= self.flush_interval:
+                    frames_f.flush()
+                    times_f.flush()
+                    last_flush = now
+
+
+def load_recording(path):
+    """
+    以 np.memmap 讀取錄製檔案
+    path: 錄製檔案路徑（不含副檔名）
+    回傳 (frames, timestamps)，frames 為 MyType 陣列，timestamps 為 float64 陣列
+    """
+    frames_file = path + ".bin"
+    times_file = path + ".ts"
+
+    # 錄製中斷時兩個檔案長度可能差一筆，以較短者為準
+    count = min(os.path.getsize(frames_file) // FEEDBACK_FRAME_SIZE,
+                os.path.getsize(times_file) // 8)
+    if count == 0:
+        return np.zeros(0, dtype=MyType), np.zeros(0, dtype=np.float64)
+
+    frames = np.memmap(frames_file, dtype=MyType, mode='r', shape=(count,))
+    timestamps = np.memmap(times_file, dtype=np.float64, mode='r', shape=(count,))
+    return frames, timestamps
@@ -0,0 +1,106 @@
+"""
+夾具重新定位後的點位批量轉換
+
+夾具移動後只需重新示教 2~3 個參考點，以最小平方法求出剛體轉換
+（XY 平面旋轉 + 平移、Z 偏移，R 軸加上相同的旋轉角），
+再以一次向量化運算轉換整組點位，關節角度以本地逆解重新計算（保留各點原本的手系）
+
+轉換在基座標系下計算；點位若是在 User(index) 座標系下示教，
+等同於將該使用者座標系套用相同的轉換
+
+用法:
+    transform = fit_transform(old_reference_poses, new_reference_poses)
+    preview = preview_transform(cartesian, joint, transform)
+    if not preview.issues:
+        store.update_many(indices, preview_points(points, preview))
+"""
+from collections import namedtuple
+import numpy as np
+import kinematics
+
+# theta: XY 旋轉角 (度，逆時針)；tx / ty: XY 平移 (mm)；dz: Z 偏移 (mm)；
+# residual: 參考點擬合後的最大殘差 (mm)
+FrameTransform = namedtuple('FrameTransform', ['theta', 'tx', 'ty', 'dz', 'residual'])
+
+# cartesian / joint: 轉換後的 (N, 4) 陣列；displacement: 各點位移量 (mm)；
+# issues: [(列索引, 說明), ...]，有問題的點位不可套用
+TransformPreview = namedtuple('TransformPreview', ['cartesian', 'joint', 'displacement', 'issues'])
+
+
+def fit_transform(old_poses, new_poses):
+    """
+    以參考點的舊/新位置擬合剛體轉換
+    old_poses / new_poses: (K, 3 或 4) 陣列，K >= 2
+    """
+    old = np.asarray(old_poses, dtype=np.float64)
+    new = np.asarray(new_poses, dtype=np.float64)
+    if old.shape != new.shape or len(old) < 2:
+        raise ValueError("至少需要2個參考點，且新舊參考點數量必須相同")
+
+    old_xy = old[:, :2]
+    new_xy = new[:, :2]
+    old_center = old_xy.mean(axis=0)
+    new_center = new_xy.mean(axis=0)
+    a = old_xy - old_center
+    b = new_xy - new_center
+    if np.linalg.norm(a, axis=1).max() < 1.0:
+        raise ValueError("參考點之間距離太近，無法決定旋轉角")
+
+    # 2D 最小平方旋轉（Kabsch）
+    theta = np.arctan2((a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]).sum(), (a * b).sum())
+    rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    tx, ty = new_center - rotation @ old_center
+    dz = float((new[:, 2] - old[:, 2]).mean())
+
+    transform = FrameTransform(float(np.degrees(theta)), float(tx), float(ty), dz, 0.0)
+    fitted = apply_transform(np.column_stack([old[:, :3], np.zeros(len(old))]), transform)
+    residual = float(np.linalg.norm(fitted[:, :3] - new[:, :3], axis=1).max())
+    return transform._replace(residual=residual)
+
+
+def apply_transform(cartesian, transform):
+    """轉換 (N, 4) 笛卡爾座標"""
+    cartesian = np.asarray(cartesian, dtype=np.float64).reshape(-1, 4)
+    theta = np.radians(transform.theta)
+    c, s = np.cos(theta), np.sin(theta)
+    result = cartesian.copy()
+    result[:, 0] = c * cartesian[:, 0] - s * cartesian[:, 1] + transform.tx
+    result[:, 1] = s * cartesian[:, 0] + c * cartesian[:, 1] + transform.ty
+    result[:, 2] = cartesian[:, 2] + transform.dz
+    result[:, 3] = cartesian[:, 3] + transform.theta
+    return result
+
+
+def preview_transform(cartesian, joint, transform):
+    """
+    計算轉換結果並檢查可達性，不修改任何點位
+    cartesian / joint: 原始 (N, 4) 陣列，joint 用於決定各點的手系
+    """
+    cartesian = np.asarray(cartesian, dtype=np.float64).reshape(-1, 4)
+    joint = np.asarray(joint, dtype=np.float64).reshape(-1, 4)
+    moved = apply_transform(cartesian, transform)
+    hands = kinematics.hand_of(joint)
+    new_joint = kinematics.inverse_kinematics(moved, hands)
+
+    issues = []
+    missing = np.isnan(new_joint).any(axis=1)
+    for row in np.flatnonzero(missing):
+        issues.append((int(row), "轉換後超出工作空間"))
+    violations = kinematics.limit_violations(new_joint) & ~missing[:, None]
+    for row in np.flatnonzero(violations.any(axis=1)):
+        axes = ', '.join(f"J{axis + 1}={new_joint[row, axis]:.2f}" for axis in np.flatnonzero(violations[row]))
+        issues.append((int(row), f"轉換後關節超出限位: {axes}"))
+    issues.sort()
+
+    displacement = np.linalg.norm(moved[:, :3] - cartesian[:, :3], axis=1)
+    return TransformPreview(moved, new_joint, displacement, issues)
+
+
+def preview_points(points, preview):
+    """將預覽結果套用到點位字典的副本，回傳新的點位字典列表（名稱不變）"""
+    result = []
+    for point, cartesian, joint in zip(points, preview.cartesian.tolist(), preview.joint.tolist()):
+        result.append(dict(point,
+                           cartesian=dict(zip(('x', 'y', 'z', 'r'), cartesian)),
+                           joint=dict(zip(('j1', 'j2', 'j3', 'j4'), joint))))
+    return result
@@ -0,0 +1,161 @@
+"""
+PGC夾爪 Modbus 驅動
+
+指令區塊 (520~523: 指令代碼、參數1、參數2、指令ID) 以一次 write_registers 寫入，
+取代逐一寫入四個寄存器的四次往返；寫入後輪詢狀態寄存器 (500+) 直到動作完成:
+    - 設定了 echo_register 時，狀態區回報的指令ID等於本次指令ID
+    - 夾持狀態為 到達(1) 或 夾住(2)
+輪詢間隔由 poll_interval 開始逐次加倍到 max_poll_interval，短動作可以很快確認完成，
+長動作也不會佔滿 Modbus 通訊；指定 ModbusPoller 時狀態從寄存器映像讀取，寫入經由輪詢器送出
+
+沒有指令ID回報寄存器時，以「曾觀察到運動中(0)」或「指令發出後已超過 min_motion_time」
+判斷夾持狀態已反映本次指令，避免讀到指令執行前的舊狀態
+
+用法:
+    gripper = PGCGripper(modbus_client, slave=1)
+    result = gripper.command(CMD_CLOSE, wait=True, timeout=3.0)
+    if result.done:
+        print(f"夾爪動作 {result.elapsed * 1000:.0f}ms，狀態 {HOLD_STATUS_NAMES[result.hold_status]}")
+"""
+import time
+from collections import namedtuple
+
+# 指令代碼
+CMD_INIT = 1
+CMD_STOP = 2
+CMD_POSITION = 3
+CMD_FORCE = 5
+CMD_OPEN = 7
+CMD_CLOSE = 8
+
+# 夾持狀態 (504)
+HOLD_MOVING = 0
+HOLD_ARRIVED = 1
+HOLD_GRIPPED = 2
+HOLD_DROPPED = 3
+HOLD_STATUS_NAMES = {HOLD_MOVING: "運動中", HOLD_ARRIVED: "到達", HOLD_GRIPPED: "夾住", HOLD_DROPPED: "掉落"}
+
+# 狀態區偏移 (相對於 status_base)
+STATUS_MODULE = 0
+STATUS_CONNECTION = 1
+STATUS_HOLD = 4
+STATUS_POSITION = 5
+STATUS_COUNT = 20
+
+# 只寫入、不會產生夾持動作的指令，不等待夾持狀態
+NO_MOTION_COMMANDS = (CMD_STOP, CMD_FORCE)
+
+# done: 是否完成；elapsed: 寫入指令到確認完成的時間(秒)；command_id: 指令ID；
+# hold_status / position: 最後讀到的夾持狀態與位置（未讀到為None）；message: 說明文字
+GripperResult = namedtuple('GripperResult', ['done', 'elapsed', 'command_id', 'hold_status', 'position', 'message'])
+
+
+class PGCGripper:
+    """PGC夾爪驅動，未指定輪詢器時所有 Modbus 存取都在呼叫者線程中進行"""
+
+    def __init__(self, client, slave=1, status_base=500, command_base=520, echo_register=None,
+                 poll_interval=0.005, max_poll_interval=0.05, min_motion_time=0.1, poller=None, max_age=1.0):
+        """
+        client: 已連接的 pymodbus ModbusTcpClient
+        slave: Modbus 從站號
+        poller: ModbusPoller，指定時狀態從寄存器映像讀取（不進行通訊），寫入經由輪詢器送出
+        max_age: 使用映像時，狀態超過此秒數未更新視為讀取失敗
+        status_base / command_base: 狀態區與指令區起始地址
+        echo_register: 狀態區回報指令ID的寄存器地址，None 表示模組不回報
+        poll_interval / max_poll_interval: 輪詢間隔的起始值與上限 (秒)
+        min_motion_time: 沒有指令ID回報時，指令發出後至少經過的時間才接受到達狀態 (秒)
+        """
+        self.client = client
+        self.slave = slave
+        self.status_base = status_base
+        self.command_base = command_base
+        self.echo_register = echo_register
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.min_motion_time = min_motion_time
+        self.poller = poller
+        self.max_age = max_age
+        self._last_command_id = None
+
+    def _next_command_id(self):
+        """以毫秒時間產生指令ID（1~65534），與上一個指令ID不同"""
+        command_id = int(time.time() * 1000) % 65534 + 1
+        if command_id == self._last_command_id:
+            command_id = command_id % 65534 + 1
+        self._last_command_id = command_id
+        return command_id
+
+    def read_status(self):
+        """讀取狀態區，回傳寄存器列表，失敗時回傳None"""
+        if self.poller is not None:
+            return self.poller.get(self.status_base, STATUS_COUNT, self.max_age)
+        result = self.client.read_holding_registers(address=self.status_base, count=STATUS_COUNT, slave=self.slave)
+        if result.isError():
+            return None
+        return result.registers
+
+    def status(self):
+        """回傳狀態字典，失敗時回傳None"""
+        registers = self.read_status()
+        if registers is None:
+            return None
+        return {
+            'module_status': registers[STATUS_MODULE],
+            'connection_status': registers[STATUS_CONNECTION],
+            'hold_status': registers[STATUS_HOLD],
+            'current_pos': registers[STATUS_POSITION],
+        }
+
+    def send(self, cmd, param1=0, param2=0):
+        """以一次寫入發送指令區塊，回傳指令ID；寫入失敗時拋出 IOError"""
+        command_id = self._next_command_id()
+        values = [int(cmd), int(param1), int(param2), command_id]
+        if self.poller is not None:
+            result = self.poller.write_registers(self.command_base, values)
+        else:
+            result = self.client.write_registers(address=self.command_base, values=values, slave=self.slave)
+        if result.isError():
+            raise IOError(f"寫入夾爪指令失敗: {result}")
+        return command_id
+
+    def wait(self, command_id, start, timeout=3.0):
+        """
+        輪詢狀態寄存器直到指令完成或逾時
+        start: 指令寫入前的 time.perf_counter()，用於計算動作時間
+        """
+        interval = self.poll_interval
+        deadline = start + timeout
+        seen_moving = False
+        hold = position = None
+        while True:
+            registers = self.read_status()
+            now = time.perf_counter()
+            if registers is not None:
+                hold = registers[STATUS_HOLD]
+                position = registers[STATUS_POSITION]
+                if self.echo_register is not None:
+                    current = registers[self.echo_register - self.status_base] == command_id
+                else:
+                    seen_moving = seen_moving or hold == HOLD_MOVING
+                    current = seen_moving or now - start >= self.min_motion_time
+                if current and hold in (HOLD_ARRIVED, HOLD_GRIPPED):
+                    return GripperResult(True, now - start, command_id, hold, position,
+                                         HOLD_STATUS_NAMES[hold])
+                if current and hold == HOLD_DROPPED:
+                    return GripperResult(False, now - start, command_id, hold, position, "夾持物掉落")
+            if now >= deadline:
+                message = "狀態讀取失敗" if registers is None else f"等待夾爪完成逾時 ({timeout:.1f}s)"
+                return GripperResult(False, now - start, command_id, hold, position, message)
+            time.sleep(min(interval, max(deadline - now, 0.0)))
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def command(self, cmd, param1=0, param2=0, wait=True, timeout=3.0):
+        """
+        發送指令，wait 為 True 時等待完成並回傳動作時間
+        停止與設定力道指令不產生夾持動作，寫入成功即視為完成
+        """
+        start = time.perf_counter()
+        command_id = self.send(cmd, param1, param2)
+        if not wait or cmd in NO_MOTION_COMMANDS:
+            return GripperResult(True, time.perf_counter() - start, command_id, None, None, "指令已發送")
+        return self.wait(command_id, start, timeout)
@@ -0,0 +1,95 @@
+"""
+M1 Pro SCARA 向量化正/逆運動學
+
+所有函數都接受單一點位或任意批次的 NumPy 陣列，最後一維為座標:
+    關節: [j1, j2, j3, j4]（J1/J2/J4 為度，J3 為mm），可直接傳入 q_actual 的6欄佈局
+    笛卡爾: [x, y, z, r]（mm，R 為度）
+整批計算只需一次呼叫，不需要逐點向控制器查詢 PositiveSolution / InverseSolution
+
+用法:
+    poses = forward_kinematics(joints)                   # (N, 4)
+    joints = inverse_kinematics(poses, HAND_RIGHT)       # 無解的點為 NaN
+    ok = reachable(poses, HAND_LEFT)                     # (N,) bool
+"""
+import numpy as np
+
+# M1 Pro 幾何參數 (mm)
+ARM_L1 = 200.0
+ARM_L2 = 200.0
+
+# 關節限位: J1/J2/J4 (度), J3 (mm)
+JOINT_LIMITS = np.array([(-85.0, 85.0), (-135.0, 135.0), (5.0, 245.0), (-360.0, 360.0)])
+
+# 手系，與 SetArmOrientation 參數相同
+HAND_LEFT = 0   # J2 < 0
+HAND_RIGHT = 1  # J2 > 0
+
+
+def _as_array(values):
+    """轉為float64陣列，只取最後一維的前4欄"""
+    return np.asarray(values, dtype=np.float64)[..., :4]
+
+
+def forward_kinematics(joints):
+    """
+    正解：關節角度 -> 笛卡爾座標
+    joints: (..., 4) 或 (..., 6) 陣列
+    回傳 (..., 4) 陣列 [x, y, z, r]
+    """
+    joints = _as_array(joints)
+    j1, j2, j3, j4 = np.moveaxis(joints, -1, 0)
+    a1 = np.radians(j1)
+    a12 = np.radians(j1 + j2)
+    x = ARM_L1 * np.cos(a1) + ARM_L2 * np.cos(a12)
+    y = ARM_L1 * np.sin(a1) + ARM_L2 * np.sin(a12)
+    return np.stack([x, y, j3, j1 + j2 + j4], axis=-1)
+
+
+def inverse_kinematics(poses, hand=HAND_RIGHT):
+    """
+    逆解：笛卡爾座標 -> 關節角度
+    poses: (..., 4) 陣列 [x, y, z, r]
+    hand: HAND_RIGHT / HAND_LEFT，或與 poses 批次形狀相同的手系陣列
+    回傳 (..., 4) 陣列，超出工作空間（無解）的點整列為 NaN；不檢查關節限位
+    """
+    poses = _as_array(poses)
+    x, y, z, r = np.moveaxis(poses, -1, 0)
+    c2 = (x * x + y * y - ARM_L1 * ARM_L1 - ARM_L2 * ARM_L2) / (2.0 * ARM_L1 * ARM_L2)
+    solvable = np.abs(c2) <= 1.0
+    c2 = np.clip(c2, -1.0, 1.0)
+    s2 = np.sqrt(1.0 - c2 * c2)
+    s2 = np.where(np.asarray(hand) == HAND_LEFT, -s2, s2)
+
+    j2 = np.degrees(np.arctan2(s2, c2))
+    j1 = np.degrees(np.arctan2(y, x) - np.arctan2(ARM_L2 * s2, ARM_L1 + ARM_L2 * c2))
+    # atan2 差值可能超出 ±180，折回到 J1 可能的範圍
+    j1 = (j1 + 180.0) % 360.0 - 180.0
+    joints = np.stack([j1, j2, z, r - j1 - j2], axis=-1)
+    joints[~solvable] = np.nan
+    return joints
+
+
+def limit_violations(joints):
+    """
+    逐軸檢查關節限位
+    回傳 (..., 4) bool 陣列，True 表示該軸超出限位（NaN 視為超限）
+    """
+    joints = _as_array(joints)
+    inside = (joints >= JOINT_LIMITS[:, 0]) & (joints <= JOINT_LIMITS[:, 1])
+    return ~inside
+
+
+def within_limits(joints):
+    """回傳 (...,) bool 陣列，所有關節都在限位內時為True"""
+    return ~limit_violations(joints).any(axis=-1)
+
+
+def reachable(poses, hand=HAND_RIGHT):
+    """回傳 (...,) bool 陣列，指定手系下有解且關節在限位內時為True"""
+    return within_limits(inverse_kinematics(poses, hand))
+
+
+def hand_of(joints):
+    """由關節角度判斷手系，J2 >= 0 為右手系"""
+    joints = _as_array(joints)
+    return np.where(joints[..., 1] >= 0.0, HAND_RIGHT, HAND_LEFT)
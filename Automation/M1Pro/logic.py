@@ -1,5 +1,4 @@
 import os
-import json
 import time
 import socket
 import threading
@@ -7,7 +6,27 @@ from datetime import datetime
 from threading import Thread
 import numpy as np
 from PyQt5.QtCore import QObject, pyqtSignal, Qt
-from dobot_api import DobotApiDashboard, DobotApi, DobotApiMove, MyType
+from dobot_api import DobotApiDashboard, DobotApi, DobotApiMove, DobotApiEmergencyStop, MyType, parse_reply
+from feedback import FeedbackReader, FeedbackRecorder, decode_feedback
+from error_monitor import ErrorMonitor
+from alarm_catalog import get_alarm_catalog
+from sequence_executor import SequenceExecutor, SequenceStep, normalize_motion_type
+from preflight import validate_sequence
+from arch_motion import ArchParams, expand_jumps
+from motion_wait import ArrivalWaiter, SPACE_CARTESIAN, SPACE_JOINT
+from settings_mirror import SettingsMirror, PERSISTENT_SETTINGS
+from point_store import PointStore, DuplicatePointName
+from spatial_index import TaughtPointIndex, SPACE_CARTESIAN as INDEX_CARTESIAN
+from frame_transform import fit_transform, preview_transform, preview_points
+from pallet import generate_pallet, pallet_points, pallet_steps
+from point_io import (load_table, save_table, validate_table, points_to_table, table_to_points,
+                      SEVERITY_ERROR)
+from kinematics import hand_of, HAND_RIGHT
+from point_order import optimize_order, travel_time_matrix, route_time
+from cycle_time import (MotionModel, MotionSettings, OptimizerLimits, estimate_sequence, optimize_sequence,
+                        calibrate_model)
+from gripper import PGCGripper, CMD_STOP
+from modbus_poller import ModbusPoller, DEFAULT_BLOCKS
 from pymodbus.client import ModbusTcpClient
 
 # 機械臂模式定義
@@ -34,6 +53,9 @@ class RobotController(QObject):
     error_update = pyqtSignal(str)
     connection_changed = pyqtSignal(bool)
     enable_changed = pyqtSignal(bool)
+    sequence_progress = pyqtSignal(int, int)
+    sequence_finished = pyqtSignal(bool, str)
+    modbus_changed = pyqtSignal(str, dict)
     
     def __init__(self):
         super().__init__()
@@ -48,13 +70,22 @@ class RobotController(QObject):
         self.client_dash = None
         self.client_move = None
         self.client_feed = None
+        self.client_estop = None
+        self.feedback_reader = None
+        self.feedback_recorder = None
         self.modbus_client = None
+        self.gripper = None
+        self.modbus_poller = None
         self.feedback_thread = None
+        self.error_monitor = None
+        self.sequence_executor = None
+        self.arrival_waiters = []
         
         # 反饋狀態追蹤
         self.feedback_count = 0
         self.last_feedback_time = time.time()
         self.feedback_active = False
+        self.feedback_stale_threshold = 0.1  # 反饋幀超過100ms視為過時
         
         # 性能監控
         self.performance_timer = None
@@ -66,15 +97,39 @@ class RobotController(QObject):
             'joint': {'j1': 0.0, 'j2': 0.0, 'j3': 0.0, 'j4': 0.0}
         }
         
-        # 點位數據管理
+        # 反饋錄製資料夾
+        self.recordings_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+        
+        # 點位數據管理（SQLite資料庫，舊版JSON檔只用於首次匯入）
         self.saved_points = []
         self.points_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 
                                        'saved_points', 'robot_points.json')
+        self.points_db = os.path.join(os.path.dirname(self.points_file), 'robot_points.db')
+        self.point_index = None  # 最近點位查詢索引，第一次查詢時建立
         
         # 確保資料夾存在
         os.makedirs(os.path.dirname(self.points_file), exist_ok=True)
         self.load_points()
         
+        # 週期時間估算：最近一次設定的速度參數與校正後的運動模型
+        self.motion_settings = MotionSettings()._asdict()
+        
+        # 控制器已確認的運動設定，相同的設定不重複發送
+        self.settings_mirror = SettingsMirror()
+        self.motion_model_file = os.path.join(os.path.dirname(self.points_file), 'motion_model.json')
+        self.motion_model = self.load_motion_model()
+        
+        # 門型運動參數（起點抬升高度、最大高度、終點下降高度）
+        self.arch_params = ArchParams()
+        
+        # PGC夾爪 Modbus 目標（連接前可修改）與最近一次等待完成的結果
+        self.modbus_host = '127.0.0.1'
+        self.modbus_port = 502
+        self.gripper_slave = 1
+        self.gripper_timeout = 3.0
+        self.modbus_blocks = list(DEFAULT_BLOCKS)  # 外部模組寄存器區塊與讀取週期
+        self.gripper_result = None
+        
     def emit_log(self, message):
         """發送日誌信號"""
         self.log_update.emit(message)
@@ -90,11 +145,22 @@ class RobotController(QObject):
         try:
             self.emit_log("正在連接機械臂...")
             
-            # 建立連接
+            # 建立連接（新連線的控制器設定未知）
+            self.settings_mirror.invalidate()
             self.client_dash = DobotApiDashboard(ip, dash_port)
             self.client_move = DobotApiMove(ip, move_port)
             self.client_feed = DobotApi(ip, feed_port)
             
+            # 緊急停止專用通道，與Dashboard指令互不等待
+            if self.client_estop:
+                self.client_estop.close()
+            try:
+                self.client_estop = DobotApiEmergencyStop(ip, dash_port)
+                self.emit_log("緊急停止專用通道已建立")
+            except Exception as e:
+                self.client_estop = None
+                self.emit_log(f"緊急停止專用通道建立失敗，將使用Dashboard連線: {str(e)}")
+            
             # 測試Dashboard連接
             try:
                 result = self.client_dash.RobotMode()
@@ -106,32 +172,41 @@ class RobotController(QObject):
             if not hasattr(self.client_feed, 'socket_dobot'):
                 raise Exception("反饋客戶端socket未正確建立")
             
+            # 建立反饋讀取器（預分配緩衝區，只取最新幀）
+            self.feedback_reader = FeedbackReader(self.client_feed.socket_dobot, latest_only=True)
+            
             # 測試反饋數據接收
             try:
                 self.client_feed.socket_dobot.settimeout(5.0)
-                test_data = self.client_feed.socket_dobot.recv(1440)
-                if len(test_data) == 1440:
-                    self.emit_log("反饋端口數據接收測試成功")
-                    # 解析測試數據驗證格式
-                    a = np.frombuffer(test_data, dtype=MyType)
-                    test_value = a['test_value'][0]
-                    self.emit_log(f"反饋數據格式驗證 - test_value: {hex(test_value)}")
-                else:
-                    self.emit_log(f"反饋數據長度異常: {len(test_data)}")
+                a = self.feedback_reader.read_frame()
+                self.emit_log("反饋端口數據接收測試成功")
+                # 解析測試數據驗證格式
+                test_value = a['test_value'][0]
+                self.emit_log(f"反饋數據格式驗證 - test_value: {hex(test_value)}")
             except Exception as e:
                 self.emit_log(f"反饋連接測試警告: {str(e)}")
             
             # 連接Modbus TCP用於PGC夾爪控制
             try:
-                self.modbus_client = ModbusTcpClient(host='127.0.0.1', port=502)
+                self.modbus_client = ModbusTcpClient(host=self.modbus_host, port=self.modbus_port)
+                self.gripper = PGCGripper(self.modbus_client, slave=self.gripper_slave)
                 if self.modbus_client.connect():
-                    self.emit_log("Modbus TCP連接成功")
+                    self.emit_log(f"Modbus TCP連接成功 ({self.modbus_host}:{self.modbus_port})")
                     # 測試讀取PGC狀態寄存器
-                    result = self.modbus_client.read_holding_registers(address=500, count=1, slave=1)
+                    result = self.modbus_client.read_holding_registers(address=500, count=1, slave=self.gripper_slave)
                     if not result.isError():
                         self.emit_log("PGC夾爪寄存器讀取成功")
                     else:
                         self.emit_log(f"PGC夾爪寄存器讀取失敗: {result}")
+                    
+                    # 之後所有外部模組寄存器都由輪詢器讀取，其他地方只讀映像
+                    self.modbus_poller = ModbusPoller(self.modbus_client, self.modbus_blocks,
+                                                      slave=self.gripper_slave, log=self.emit_log)
+                    self.modbus_poller.subscribe(
+                        lambda name, changes, timestamp: self.modbus_changed.emit(name, changes))
+                    self.modbus_poller.start()
+                    self.gripper = PGCGripper(self.modbus_client, slave=self.gripper_slave,
+                                              poller=self.modbus_poller)
                 else:
                     self.emit_log("Modbus TCP連接失敗")
             except Exception as e:
@@ -162,16 +237,37 @@ class RobotController(QObject):
             # 停止性能監控
             self.stop_performance_monitor()
             
-            # 等待反饋線程結束
+            # 停止反饋錄製
+            self.stop_recording()
+            
+            # 停止點位序列
+            if self.sequence_executor:
+                self.sequence_executor.stop()
+                self.sequence_executor = None
+            self.cancel_arrival_waits("連接已斷開")
+            
+            # 等待反饋線程結束（反饋線程每幀都會更新告警監視器，需先停止）
             if self.feedback_thread and self.feedback_thread.is_alive():
                 self.feedback_thread.join(timeout=2.0)
             
+            # 停止告警監視器
+            if self.error_monitor:
+                self.error_monitor.stop()
+                self.error_monitor = None
+            
             if self.client_dash:
                 self.client_dash.close()
             if self.client_move:
                 self.client_move.close()
             if self.client_feed:
                 self.client_feed.close()
+                self.feedback_reader = None
+            if self.client_estop:
+                self.client_estop.close()
+                self.client_estop = None
+            if self.modbus_poller:
+                self.modbus_poller.stop()
+                self.modbus_poller = None
             if self.modbus_client:
                 self.modbus_client.close()
                 
@@ -215,9 +311,34 @@ class RobotController(QObject):
         """緊急停止功能"""
         try:
             if self.global_state['connect'] and self.client_dash:
-                # 發送緊急停止指令到機械臂
-                result = self.client_dash.EmergencyStop()
-                self.emit_log(f"緊急停止指令已發送: {result}")
+                # 發送緊急停止指令到機械臂 - 優先使用專用通道
+                latency = None
+                if self.client_estop:
+                    try:
+                        result, latency = self.client_estop.trigger()
+                    except Exception as e:
+                        self.emit_log(f"緊急停止專用通道失敗，改用Dashboard連線: {str(e)}")
+                        # 關閉失敗的通道，下次連接時重新建立
+                        try:
+                            self.client_estop.close()
+                        except Exception:
+                            pass
+                        self.client_estop = None
+                if not self.client_estop:
+                    start = time.perf_counter()
+                    result = self.client_dash.EmergencyStop()
+                    latency = time.perf_counter() - start if result else None
+                
+                if latency is not None:
+                    self.emit_log(f"緊急停止指令已發送: {result} - 回應延遲 {latency * 1000:.2f}ms")
+                else:
+                    self.emit_log(f"緊急停止指令已發送，未收到回應: {result}")
+                
+                # 停止發送後續序列運動
+                if self.sequence_executor and self.sequence_executor.running:
+                    self.sequence_executor.stop(timeout=0)
+                self.cancel_arrival_waits("緊急停止")
+                self.settings_mirror.invalidate(keep=PERSISTENT_SETTINGS)
                 
                 # 停止所有點動操作
                 if self.client_move:
@@ -226,9 +347,7 @@ class RobotController(QObject):
                 # 發送夾爪緊急停止指令
                 if self.modbus_client and self.modbus_client.connected:
                     try:
-                        command_id = int(time.time() * 1000) % 65535
-                        self.modbus_client.write_register(address=520, value=2, slave=1)
-                        self.modbus_client.write_register(address=523, value=command_id, slave=1)
+                        self.gripper.send(CMD_STOP)
                         self.emit_log("PGC夾爪緊急停止指令已發送")
                     except Exception as e:
                         self.emit_log(f"PGC夾爪緊急停止失敗: {str(e)}")
@@ -252,6 +371,10 @@ class RobotController(QObject):
         if not self.global_state['connect']:
             return False
         try:
+            if self.sequence_executor and self.sequence_executor.running:
+                self.sequence_executor.stop()
+            self.cancel_arrival_waits("機械臂重置")
+            self.settings_mirror.invalidate(keep=PERSISTENT_SETTINGS)
             self.client_dash.ResetRobot()
             self.emit_log("機械臂重置")
             return True
@@ -271,65 +394,92 @@ class RobotController(QObject):
             self.emit_log(f"清除錯誤失敗: {str(e)}")
             return False
     
-    def set_speed_factor(self, speed):
-        """設定全局速度比例"""
+    def _set_motion_setting(self, key, value, label, unit='%'):
+        """經由設定鏡像發送單項運動設定，與控制器已確認的值相同時略過"""
         if not self.global_state['connect']:
             return False
         try:
-            self.client_dash.SpeedFactor(speed)
-            self.emit_log(f"全局速度比例設定為 {speed}%")
+            ok, sent = self.settings_mirror.set(self.client_dash, key, value)
+            if not ok:
+                self.emit_log(f"{label}設定失敗: 控制器拒絕 {value}")
+                return False
+            if key in self.motion_settings:
+                self.motion_settings[key] = value
+            self.emit_log(f"{label}設定為 {value}{unit}" + ("" if sent else "（與控制器相同，略過）"))
             return True
         except Exception as e:
-            self.emit_log(f"全局速度設定失敗: {str(e)}")
+            self.emit_log(f"{label}設定失敗: {str(e)}")
             return False
     
+    def set_speed_factor(self, speed):
+        """設定全局速度比例"""
+        return self._set_motion_setting('speed_factor', speed, "全局速度比例")
+    
     def set_speed_j(self, speed):
         """設定關節運動速度比例"""
-        if not self.global_state['connect']:
-            return False
-        try:
-            self.client_dash.SpeedJ(speed)
-            self.emit_log(f"關節運動速度比例設定為 {speed}%")
-            return True
-        except Exception as e:
-            self.emit_log(f"關節運動速度設定失敗: {str(e)}")
-            return False
+        return self._set_motion_setting('speed_j', speed, "關節運動速度比例")
     
     def set_speed_l(self, speed):
         """設定直線運動速度比例"""
-        if not self.global_state['connect']:
-            return False
-        try:
-            self.client_dash.SpeedL(speed)
-            self.emit_log(f"直線運動速度比例設定為 {speed}%")
-            return True
-        except Exception as e:
-            self.emit_log(f"直線運動速度設定失敗: {str(e)}")
-            return False
+        return self._set_motion_setting('speed_l', speed, "直線運動速度比例")
     
     def set_acc_j(self, speed):
         """設定關節運動加速度比例"""
-        if not self.global_state['connect']:
-            return False
-        try:
-            self.client_dash.AccJ(speed)
-            self.emit_log(f"關節運動加速度比例設定為 {speed}%")
-            return True
-        except Exception as e:
-            self.emit_log(f"關節運動加速度設定失敗: {str(e)}")
-            return False
+        return self._set_motion_setting('acc_j', speed, "關節運動加速度比例")
     
     def set_acc_l(self, speed):
         """設定直線運動加速度比例"""
+        return self._set_motion_setting('acc_l', speed, "直線運動加速度比例")
+    
+    def set_arm_orientation(self, hand):
+        """
+        設定手系（0: 左手系, 1: 右手系）
+        控制器確認後預檢、週期估算、點位匯入與料盤格位都以此手系逆解
+        """
+        return self._set_motion_setting('arm_orientation', hand, "手系", unit=f" ({'右' if hand == HAND_RIGHT else '左'}手系)")
+    
+    def arm_orientation(self, hand=None):
+        """
+        本地逆解使用的手系: 呼叫者指定的手系，其次為 set_arm_orientation 設定並經控制器確認的手系；
+        兩者都沒有時（連接後尚未設定）以目前姿態的J2正負推定，沒有反饋時為右手系
+        """
+        if hand is not None:
+            return int(hand)
+        confirmed = self.settings_mirror.get('arm_orientation')
+        if confirmed is not None:
+            return int(confirmed)
+        if self.global_state['connect'] and self.feedback_count > 0:
+            return int(hand_of([0.0, self.current_position['joint']['j2'], 0.0, 0.0]))
+        return HAND_RIGHT
+    
+    def apply_motion_settings(self, **values):
+        """
+        一次套用多項運動設定（speed_factor/speed_j/speed_l/acc_j/acc_l/cp/user/tool/arm_orientation）
+        只連續發送與控制器已確認值不同的項目
+        """
         if not self.global_state['connect']:
             return False
         try:
-            self.client_dash.AccL(speed)
-            self.emit_log(f"直線運動加速度比例設定為 {speed}%")
-            return True
+            ok, sent = self.settings_mirror.apply(self.client_dash, **values)
+            # 記錄控制器已確認的值（被拒絕的項目在鏡像中為未知）
+            for key, value in values.items():
+                if key in self.motion_settings and self.settings_mirror.get(key) is not None:
+                    self.motion_settings[key] = value
+            self.emit_log(f"運動設定套用: 發送 {len(sent)} 項，略過 {len(values) - len(sent)} 項未變更設定"
+                          + ("" if ok else "，部分設定被控制器拒絕"))
+            return ok
         except Exception as e:
-            self.emit_log(f"直線運動加速度設定失敗: {str(e)}")
+            self.emit_log(f"運動設定套用失敗: {str(e)}")
+            return False
+    
+    def set_arch_params(self, start_height, limit_z, end_height):
+        """設置門型運動參數: 起點抬升高度、門型最高Z座標、終點下降高度 (mm)"""
+        if start_height < 0 or end_height < 0:
+            self.emit_log("門型抬升/下降高度不可為負數")
             return False
+        self.arch_params = ArchParams(float(start_height), float(limit_z), float(end_height))
+        self.emit_log(f"門型參數設置: 起點抬升{start_height}mm, 最高Z={limit_z}mm, 終點下降{end_height}mm")
+        return True
     
     def set_do(self, index, status):
         """設定數位輸出 - 隊列指令"""
@@ -373,8 +523,8 @@ class RobotController(QObject):
             result = self.client_move.MovJ(x, y, z, r)
             self.emit_log(f"MovJ指令回應: {result}")
             
-            # 檢查回應是否包含錯誤
-            if "0," in str(result):  # 0表示成功
+            # 檢查回應的ErrorID
+            if parse_reply(result).ok:
                 self.emit_log(f"MovJ to ({x}, {y}, {z}, {r}) - 指令接受成功")
                 return True
             else:
@@ -390,15 +540,18 @@ class RobotController(QObject):
             self.emit_log("機械臂未連接或未使能")
             return False
         try:
-            # 添加CP參數幫助避免手勢切換問題
-            speed_param = f"SpeedL={speed}"
-            cp_param = "CP=50"  # 連續路徑參數，幫助平滑過渡
+            # 添加CP參數幫助避免手勢切換問題（與控制器全局設定相同的參數不必附加）
+            params = []
+            if self.settings_mirror.get('speed_l') != speed:
+                params.append(f"SpeedL={speed}")
+            if self.settings_mirror.get('cp') != 50:
+                params.append("CP=50")  # 連續路徑參數，幫助平滑過渡
             
-            result = self.client_move.MovL(x, y, z, r, speed_param, cp_param)
+            result = self.client_move.MovL(x, y, z, r, *params)
             self.emit_log(f"MovL指令回應: {result}")
             
-            # 檢查回應是否包含錯誤
-            if "0," in str(result):  # 0表示成功
+            # 檢查回應的ErrorID
+            if parse_reply(result).ok:
                 self.emit_log(f"MovL to ({x}, {y}, {z}, {r}) at {speed}% speed - 指令接受成功")
                 return True
             else:
@@ -419,8 +572,8 @@ class RobotController(QObject):
             result = self.client_move.JointMovJ(j1, j2, j3, j4)
             self.emit_log(f"JointMovJ指令回應: {result}")
             
-            # 檢查回應是否包含錯誤
-            if "0," in str(result):  # 0表示成功
+            # 檢查回應的ErrorID
+            if parse_reply(result).ok:
                 self.emit_log(f"JointMovJ to ({j1}, {j2}, {j3}, {j4}) - 指令接受成功")
                 return True
             else:
@@ -454,61 +607,56 @@ class RobotController(QObject):
     
     # ==================== 夾爪控制 ====================
     
-    def send_gripper_command(self, cmd, param1=0, param2=0):
-        """發送PGC夾爪指令"""
+    def send_gripper_command(self, cmd, param1=0, param2=0, wait=False, timeout=None):
+        """
+        發送PGC夾爪指令（指令區塊一次寫入）
+        wait: 等待夾爪完成（到達或夾住），結果與動作時間保存在 gripper_result
+        timeout: 等待逾時 (秒)，None 使用 gripper_timeout
+        """
         if not self.modbus_client or not self.modbus_client.connected:
             self.emit_log("Modbus連接未建立")
             return False
             
         try:
-            command_id = int(time.time() * 1000) % 65535
-            
-            result = self.modbus_client.write_register(address=520, value=cmd, slave=1)
-            if result.isError():
-                self.emit_log(f"寫入指令代碼失敗: {result}")
-                return False
-                
-            result = self.modbus_client.write_register(address=521, value=param1, slave=1)
-            if result.isError():
-                self.emit_log(f"寫入參數1失敗: {result}")
-                return False
-                
-            result = self.modbus_client.write_register(address=522, value=param2, slave=1)
-            if result.isError():
-                self.emit_log(f"寫入參數2失敗: {result}")
-                return False
-                
-            result = self.modbus_client.write_register(address=523, value=command_id, slave=1)
-            if result.isError():
-                self.emit_log(f"寫入指令ID失敗: {result}")
-                return False
-            
-            self.emit_log(f"PGC夾爪指令已發送: cmd={cmd}, param1={param1}, ID={command_id}")
-            return True
-            
+            result = self.gripper.command(cmd, param1, param2, wait=wait,
+                                          timeout=self.gripper_timeout if timeout is None else timeout)
         except Exception as e:
             self.emit_log(f"PGC夾爪指令發送失敗: {str(e)}")
             return False
+        
+        if not wait:
+            self.emit_log(f"PGC夾爪指令已發送: cmd={cmd}, param1={param1}, ID={result.command_id}")
+            return True
+        
+        self.gripper_result = result
+        if result.done:
+            self.emit_log(f"PGC夾爪指令完成: cmd={cmd}, param1={param1}, {result.message}, "
+                          f"位置 {result.position}, 動作時間 {result.elapsed * 1000:.0f}ms")
+        else:
+            self.emit_log(f"PGC夾爪指令未完成: cmd={cmd}, param1={param1}, {result.message}")
+        return result.done
+    
+    def get_module_registers(self, name, max_age=None):
+        """
+        從寄存器映像讀取外部模組區塊（不進行通訊）
+        name: 'CCD1' / 'VP' / 'GRIPPER' / 'CCD3'
+        回傳 (寄存器列表, 時間戳記)，尚未讀到或超過 max_age 秒未更新時回傳 (None, None)
+        """
+        if not self.modbus_poller:
+            return None, None
+        try:
+            return self.modbus_poller.block(name, max_age)
+        except KeyError as e:
+            self.emit_log(str(e))
+            return None, None
     
     def get_gripper_status(self):
-        """獲取PGC夾爪狀態"""
+        """獲取PGC夾爪狀態（連接後從寄存器映像讀取）"""
         if not self.modbus_client or not self.modbus_client.connected:
             return None
             
         try:
-            result = self.modbus_client.read_holding_registers(address=500, count=20, slave=1)
-            if result.isError():
-                return None
-                
-            registers = result.registers
-            
-            return {
-                'module_status': registers[0],
-                'connection_status': registers[1],
-                'hold_status': registers[4],
-                'current_pos': registers[5]
-            }
-            
+            return self.gripper.status()
         except Exception as e:
             return None
     
@@ -527,21 +675,25 @@ class RobotController(QObject):
             self.emit_log("尚未獲取到機械臂位置反饋")
             return False
             
+        # 檢查反饋數據是否過時
+        frame_age = self.get_feedback_age()
+        if frame_age is not None and frame_age > self.feedback_stale_threshold:
+            self.emit_log(f"警告：位置反饋已延遲 {frame_age * 1000:.0f}ms，保存的點位可能不是當前位置")
+        
         # 使用實際機械臂反饋的位置數據
         cartesian = self.current_position['cartesian'].copy()
         joint = self.current_position['joint'].copy()
         
-        point = {
-            'id': len(self.saved_points),
-            'name': name.strip(),
-            'cartesian': cartesian,
-            'joint': joint,
-            'created_time': datetime.now().isoformat(),
-            'modified_time': datetime.now().isoformat()
-        }
-        
-        self.saved_points.append(point)
-        self.save_points()
+        try:
+            point = self.saved_points.add(name, cartesian, joint)
+            if self.point_index is not None:
+                self.point_index.update(point)
+        except DuplicatePointName:
+            self.emit_log(f"點位名稱 '{name.strip()}' 已存在，請使用其他名稱")
+            return False
+        except Exception as e:
+            self.emit_log(f"保存點位失敗: {str(e)}")
+            return False
         
         # 詳細日誌信息
         self.emit_log(f"點位 '{name}' 已保存 - 位置: X:{cartesian['x']:.2f}, Y:{cartesian['y']:.2f}, Z:{cartesian['z']:.2f}, R:{cartesian['r']:.2f}")
@@ -551,22 +703,30 @@ class RobotController(QObject):
     def update_point(self, index, point_data):
         """更新點位數據"""
         if 0 <= index < len(self.saved_points):
-            point_data['modified_time'] = datetime.now().isoformat()
-            self.saved_points[index] = point_data
-            self.save_points()
-            self.emit_log(f"點位 '{point_data['name']}' 已更新")
+            try:
+                point = self.saved_points.update(index, point_data)
+                if self.point_index is not None:
+                    self.point_index.update(point)
+            except DuplicatePointName:
+                self.emit_log(f"點位名稱 '{point_data['name']}' 已存在，請使用其他名稱")
+                return False
+            except Exception as e:
+                self.emit_log(f"更新點位失敗: {str(e)}")
+                return False
+            self.emit_log(f"點位 '{point['name']}' 已更新")
             return True
         return False
     
     def delete_point(self, index):
         """刪除點位"""
         if 0 <= index < len(self.saved_points):
-            point = self.saved_points[index]
-            del self.saved_points[index]
-            # 重新分配ID
-            for i, p in enumerate(self.saved_points):
-                p['id'] = i
-            self.save_points()
+            try:
+                point = self.saved_points.delete(index)
+                if self.point_index is not None:
+                    self.point_index.remove(point['id'])
+            except Exception as e:
+                self.emit_log(f"刪除點位失敗: {str(e)}")
+                return False
             self.emit_log(f"點位 '{point['name']}' 已刪除")
             return True
         return False
@@ -605,6 +765,15 @@ class RobotController(QObject):
         if not (50 <= z <= 600):
             self.emit_log(f"Z座標可能不安全: {z}")
         
+        # 門型運動拆成三段，以序列方式連續送出
+        command = normalize_motion_type(motion_type)
+        if command == 'Jump':
+            return self.execute_point_sequence([(point_index, command, speed, 0)])
+        
+        # 本地逆解預檢，預測會觸發的運動告警
+        if command and self.preflight_point_sequence([(point_index, command, speed, 0)]):
+            return False
+        
         try:
             self.emit_log(f"準備移動到點位 '{point['name']}'")
             
@@ -647,7 +816,14 @@ class RobotController(QObject):
             if result:
                 self.emit_log(f"運動指令發送成功，結果: {result}")
                 
-                # 發送同步指令等待完成
+                # 以實時反饋等待到位，沒有反饋時退回同步指令
+                if self.feedback_active:
+                    if "JointMovJ" in motion_type:
+                        arrival = self.wait_until_reached([j1, j2, j3, j4], space=SPACE_JOINT)
+                    else:
+                        arrival = self.wait_until_reached([x, y, z, r])
+                    return bool(arrival and arrival.reached)
+                
                 try:
                     sync_result = self.client_move.Sync()
                     self.emit_log(f"同步等待指令: {sync_result}")
@@ -663,86 +839,472 @@ class RobotController(QObject):
             self.emit_log(f"移動失敗: {str(e)}")
             return False
     
-    def load_points(self):
-        """載入點位數據 - 增強版本"""
+    def wait_until_reached(self, target, space=SPACE_CARTESIAN, timeout=30.0, **kwargs):
+        """
+        以實時反饋等待機械臂到達目標並穩定 - 取代阻塞Move端口的Sync()
+        target: 笛卡爾 [x, y, z, r]，或 space='joint' 時為關節 [j1, j2, j3, j4]
+        kwargs: tolerance / angle_tolerance / joint_speed_threshold / tcp_speed_threshold / settle_time
+        回傳 ArrivalResult，反饋未運行時回傳None
+        """
+        if not self.feedback_active:
+            self.emit_log("反饋線程未運行，無法等待到位")
+            return None
+        
+        waiter = ArrivalWaiter(target, space=space, timeout=timeout, **kwargs)
+        # 以替換列表的方式增刪，反饋線程迭代時不需加鎖
+        self.arrival_waiters = self.arrival_waiters + [waiter]
         try:
-            if os.path.exists(self.points_file):
-                with open(self.points_file, 'r', encoding='utf-8') as f:
-                    loaded_points = json.load(f)
-                
-                # 驗證和修正點位數據
-                self.saved_points = []
-                for i, point in enumerate(loaded_points):
-                    # 確保基本結構完整
-                    if not isinstance(point, dict):
-                        self.emit_log(f"跳過無效點位數據: {point}")
-                        continue
-                    
-                    # 修正基本欄位
-                    if 'id' not in point:
-                        point['id'] = i
-                    if 'name' not in point:
-                        point['name'] = f"Point_{i}"
-                    if 'created_time' not in point:
-                        point['created_time'] = datetime.now().isoformat()
-                    if 'modified_time' not in point:
-                        point['modified_time'] = datetime.now().isoformat()
-                    
-                    # 修正cartesian數據
-                    if 'cartesian' not in point:
-                        point['cartesian'] = {'x': 0, 'y': 0, 'z': 0, 'r': 0}
-                    else:
-                        cartesian = point['cartesian']
-                        required_keys = ['x', 'y', 'z', 'r']
-                        for key in required_keys:
-                            if key not in cartesian:
-                                cartesian[key] = 0.0
-                            # 確保數值類型正確
-                            try:
-                                cartesian[key] = float(cartesian[key])
-                            except (ValueError, TypeError):
-                                cartesian[key] = 0.0
-                    
-                    # 修正joint數據
-                    if 'joint' not in point:
-                        point['joint'] = {'j1': 0, 'j2': 0, 'j3': 0, 'j4': 0}
-                    else:
-                        joint = point['joint']
-                        required_joint_keys = ['j1', 'j2', 'j3', 'j4']
-                        for key in required_joint_keys:
-                            if key not in joint:
-                                joint[key] = 0.0
-                            # 確保數值類型正確
-                            try:
-                                joint[key] = float(joint[key])
-                            except (ValueError, TypeError):
-                                joint[key] = 0.0
-                    
-                    self.saved_points.append(point)
-                
-                # 重新分配ID確保連續性
-                for i, point in enumerate(self.saved_points):
-                    point['id'] = i
-                
-                # 保存修正後的數據
-                self.save_points()
-                
-                self.emit_log(f"載入並修正 {len(self.saved_points)} 個點位")
-            else:
-                self.saved_points = []
-                self.emit_log("點位檔案不存在，建立新的點位列表")
-                
+            result = waiter.wait()
+        finally:
+            self.arrival_waiters = [w for w in self.arrival_waiters if w is not waiter]
+        
+        if result.reached:
+            self.emit_log(f"到位確認 - 耗時 {result.elapsed:.3f}s，穩定時間 {result.settle_time:.3f}s，誤差 {result.error:.3f}")
+        else:
+            error = f"，誤差 {result.error:.3f}" if result.error is not None else ""
+            self.emit_log(f"到位等待失敗: {result.message}{error}")
+        return result
+    
+    def cancel_arrival_waits(self, message="等待已取消"):
+        """中止所有進行中的到位等待"""
+        for waiter in self.arrival_waiters:
+            waiter.cancel(message)
+    
+    def _build_sequence(self, steps):
+        """
+        將 [(點位索引, 運動類型, 速度, CP), ...] 轉為 SequenceStep 列表，無效時回傳None
+        每項可附加第5個元素作為該段加速度比例；門型運動段展開為上升、平移、下降三段
+        """
+        sequence = []
+        for item in steps:
+            point_index, motion_type, speed, cp = item[:4]
+            acc = item[4] if len(item) > 4 else None
+            if not (0 <= point_index < len(self.saved_points)):
+                self.emit_log(f"無效的點位索引: {point_index}")
+                return None
+            command = normalize_motion_type(motion_type)
+            if command is None:
+                self.emit_log(f"未知的運動類型: {motion_type}")
+                return None
+            sequence.append(SequenceStep(self.saved_points[point_index], command, speed, cp, acc))
+        
+        if not sequence:
+            self.emit_log("點位序列為空")
+            return None
+        
+        if any(step.motion_type == 'Jump' for step in sequence):
+            start_pose = None
+            if self.global_state['connect'] and self.feedback_count > 0:
+                cartesian = self.current_position['cartesian']
+                start_pose = [cartesian['x'], cartesian['y'], cartesian['z'], cartesian['r']]
+            try:
+                sequence = expand_jumps(sequence, start_pose, self.arch_params)
+            except ValueError as e:
+                self.emit_log(f"門型運動規劃失敗: {str(e)}")
+                return None
+        return sequence
+    
+    def _sequence_start(self, hand=None):
+        """
+        序列的起點關節角度與手系（見 arm_orientation）
+        沒有反饋時無法得知起點（回傳None）
+        """
+        start_joints = None
+        if self.global_state['connect'] and self.feedback_count > 0:
+            joint = self.current_position['joint']
+            start_joints = [joint['j1'], joint['j2'], joint['j3'], joint['j4']]
+        return start_joints, self.arm_orientation(hand)
+    
+    def preflight_point_sequence(self, steps, hand=None):
+        """
+        預檢點位序列 - 以本地逆解預測告警22/23/32/33/34，不與控制器通訊
+        以當前關節角度作為起點；hand 為None時使用 arm_orientation() 的手系
+        回傳 PreflightIssue 列表，空列表表示預檢通過
+        """
+        sequence = self._build_sequence(steps)
+        if not sequence:
+            return []
+        return self._preflight_sequence(sequence, hand)
+    
+    def _preflight_sequence(self, sequence, hand=None):
+        """預檢已建立的 SequenceStep 列表"""
+        start_joints, hand = self._sequence_start(hand)
+        issues = validate_sequence(sequence, start_joints=start_joints, hand=hand)
+        for issue in issues:
+            step = sequence[issue.step_index]
+            self.emit_error(f"預檢第 {issue.step_index + 1} 段 {step.motion_type} 到 '{step.point['name']}' - "
+                            f"預測錯誤 {issue.error_id}: {issue.message}")
+        if issues:
+            self.emit_log(f"預檢發現 {len(issues)} 段運動會觸發告警，未發送任何指令")
+        return issues
+    
+    def execute_point_sequence(self, steps, lookahead=4, preflight=True, hand=None):
+        """
+        連續執行點位序列 - 預送運動到控制器隊列，以反饋追蹤進度
+        steps: [(點位索引, 運動類型, 速度, CP), ...]，CP為0時在該點停止；運動類型可為門型運動(Jump)
+        lookahead: 控制器隊列中最多預送的段數
+        preflight: 發送前先以本地逆解預檢整個序列
+        hand: 預檢使用的手系，None 時使用 arm_orientation()
+        執行進度由 sequence_progress / sequence_finished 信號通知
+        """
+        sequence = self._build_sequence(steps)
+        if not sequence:
+            return False
+        return self._start_sequence(sequence, lookahead, preflight, hand)
+    
+    def _start_sequence(self, sequence, lookahead, preflight, hand=None):
+        """檢查狀態、預檢後以序列執行器執行 SequenceStep 列表"""
+        if not self.global_state['connect']:
+            self.emit_log("機械臂未連接")
+            return False
+            
+        if not self.global_state['enable']:
+            self.emit_log("機械臂未使能")
+            return False
+        
+        if not self.feedback_active:
+            self.emit_log("反饋線程未運行，無法追蹤序列進度")
+            return False
+        
+        if self.sequence_executor and self.sequence_executor.running:
+            self.emit_log("已有點位序列正在執行")
+            return False
+        
+        if preflight and self._preflight_sequence(sequence, hand):
+            return False
+        
+        try:
+            # 確保運動隊列沒有暫停
+            self.client_dash.Continue()
+            
+            self.sequence_executor = SequenceExecutor(
+                self.client_move, sequence, lookahead=lookahead,
+                on_progress=self.sequence_progress.emit,
+                on_finished=self.sequence_finished.emit,
+                log=self.emit_log)
+            # 以展開後的段數（門型運動為三段）通知初始進度
+            self.sequence_progress.emit(0, len(sequence))
+            self.sequence_executor.start()
+            self.emit_log(f"開始連續執行 {len(sequence)} 段運動 (預送 {lookahead} 段)")
+            return True
         except Exception as e:
-            self.emit_log(f"載入點位失敗: {str(e)}")
-            self.saved_points = []
+            self.emit_log(f"點位序列啟動失敗: {str(e)}")
+            return False
     
-    def save_points(self):
-        """保存點位數據"""
+    def estimate_point_sequence(self, steps, hand=None):
+        """
+        估算點位序列的週期時間（使用最近一次設定的速度參數與校正後的運動模型）
+        hand: 逆解手系，None 時使用 arm_orientation()
+        回傳 CycleEstimate，無效序列回傳None
+        """
+        sequence = self._build_sequence(steps)
+        if not sequence:
+            return None
+        start_joints, hand = self._sequence_start(hand)
+        estimate = estimate_sequence(sequence, start_joints, MotionSettings(**self.motion_settings),
+                                     self.motion_model, hand)
+        self.emit_log(f"預估週期時間 {estimate.total:.2f}s ({len(sequence)} 段，CP過渡節省 {estimate.blend_savings.sum():.2f}s)")
+        return estimate
+    
+    def optimize_point_sequence(self, steps, limits=None, hand=None):
+        """
+        以週期時間估算座標下降搜尋每段速度/加速度/CP參數
+        limits: OptimizerLimits，預設為各比例100%且保留CP為0的停止點；
+        可限制末端線速度 (tcp_speed_limit) 與CP過渡的轉角偏差 (max_corner_deviation)
+        回傳可直接傳給 execute_point_sequence 的 [(點位索引, 運動類型, 速度, CP, 加速度), ...]
+        """
+        if any(normalize_motion_type(item[1]) == 'Jump' for item in steps):
+            self.emit_log("門型運動段不支援速度參數最佳化")
+            return None
+        sequence = self._build_sequence(steps)
+        if not sequence:
+            return None
+        start_joints, hand = self._sequence_start(hand)
+        optimized, before, after = optimize_sequence(sequence, start_joints, MotionSettings(**self.motion_settings),
+                                                     self.motion_model, limits or OptimizerLimits(), hand)
+        self.emit_log(f"速度參數最佳化: 預估週期時間 {before.total:.2f}s -> {after.total:.2f}s")
+        return [(item[0], step.motion_type, step.speed, step.cp, step.acc) for item, step in zip(steps, optimized)]
+    
+    def load_motion_model(self):
+        """載入校正後的運動模型，不存在時使用預設值"""
         try:
-            with open(self.points_file, 'w', encoding='utf-8') as f:
-                json.dump(self.saved_points, f, ensure_ascii=False, indent=2)
+            if os.path.exists(self.motion_model_file):
+                return MotionModel.load(self.motion_model_file)
         except Exception as e:
-            self.emit_log(f"保存點位失敗: {str(e)}")
+            self.emit_log(f"載入運動模型失敗，使用預設值: {str(e)}")
+        return MotionModel()
+    
+    def calibrate_motion_model(self, recording_path):
+        """以錄製的反饋校正運動模型並保存"""
+        try:
+            self.motion_model = calibrate_model(recording_path, self.motion_model)
+            self.motion_model.save(self.motion_model_file)
+            speeds = ', '.join(f"{v:.0f}" for v in self.motion_model.joint_max_speed)
+            self.emit_log(f"運動模型已校正 - 關節最大速度: {speeds}, 直線最大速度: {self.motion_model.linear_max_speed:.0f}mm/s")
+            return True
+        except Exception as e:
+            self.emit_log(f"運動模型校正失敗: {str(e)}")
+            return False
+    
+    def stop_point_sequence(self):
+        """停止點位序列，並以ResetRobot清除控制器隊列中已預送的運動"""
+        if not self.sequence_executor or not self.sequence_executor.running:
+            return False
+        self.sequence_executor.stop()
+        try:
+            self.client_dash.ResetRobot()
+        except Exception as e:
+            self.emit_log(f"清除運動隊列失敗: {str(e)}")
+        return True
+    
+    def optimize_point_order(self, indices=None, fixed_start=None, fixed_end=None, from_current=True):
+        """
+        最佳化點位拜訪順序（以關節運動時間為成本）
+        indices: 要排序的點位索引，None 表示全部點位
+        fixed_start / fixed_end: 固定為第一個 / 最後一個的點位索引
+        from_current: 以機械臂目前位置作為出發點
+        回傳排序後的點位索引列表
+        """
+        if indices is None:
+            indices = list(range(len(self.saved_points)))
+        indices = [i for i in indices if 0 <= i < len(self.saved_points)]
+        if not indices:
+            self.emit_log("沒有可排序的點位")
+            return []
+        
+        joints = [[p['joint'].get(key, 0.0) for key in ('j1', 'j2', 'j3', 'j4')]
+                  for p in (self.saved_points[i] for i in indices)]
+        start_joints = None
+        if from_current and self.global_state['connect'] and self.feedback_count > 0:
+            joint = self.current_position['joint']
+            start_joints = [joint['j1'], joint['j2'], joint['j3'], joint['j4']]
+        
+        start = indices.index(fixed_start) if fixed_start in indices else None
+        end = indices.index(fixed_end) if fixed_end in indices else None
+        settings = MotionSettings(**self.motion_settings)
+        
+        t0 = time.perf_counter()
+        order, seconds = optimize_order(joints, start=start, end=end, start_joints=start_joints,
+                                        model=self.motion_model, settings=settings)
+        elapsed = time.perf_counter() - t0
+        
+        # 原列表順序的移動時間，作為比較
+        nodes = joints + ([start_joints] if start_joints is not None else [])
+        original = route_time(([len(joints)] if start_joints is not None else []) + list(range(len(joints))),
+                              travel_time_matrix(nodes, self.motion_model, settings))
+        self.emit_log(f"點位順序最佳化完成 - {len(indices)} 個點位，預估移動時間 {original:.2f}s -> {seconds:.2f}s，"
+                      f"計算 {elapsed * 1000:.0f}ms")
+        return [indices[i] for i in order]
+    
+    def reorder_points(self, order):
+        """依指定的索引順序重新排列並保存點位"""
+        try:
+            self.saved_points.reorder(order)
+        except ValueError as e:
+            self.emit_log(str(e))
+            return False
+        except Exception as e:
+            self.emit_log(f"點位重新排序失敗: {str(e)}")
+            return False
+        self.emit_log(f"點位已重新排序，共 {len(order)} 個")
+        return True
+    
+    def nearest_points(self, k=1, position=None, space=INDEX_CARTESIAN, radius=None):
+        """
+        查詢最近的示教點位
+        position: 笛卡爾 [x, y, z(, r)] 或關節 [j1, j2, j3, j4]，None 時使用機械臂目前位置
+        space: 'cartesian' 或 'joint'
+        radius: 指定時回傳半徑內的全部點位（忽略k）
+        回傳 [(列表索引, 點位字典, 距離), ...]，依距離排序
+        """
+        if position is None:
+            current = self.current_position[space]
+            keys = ('x', 'y', 'z', 'r') if space == INDEX_CARTESIAN else ('j1', 'j2', 'j3', 'j4')
+            position = [current[key] for key in keys]
+        
+        if self.point_index is None:
+            self.point_index = TaughtPointIndex(self.saved_points)
+        if radius is None:
+            matches = self.point_index.nearest(position, k, space)
+        else:
+            matches = self.point_index.within(position, radius, space)
+        return [(self.saved_points.index_of(point['name']), point, distance) for point, distance in matches]
+    
+    def import_points(self, path, hand=None, max_issue_logs=20):
+        """
+        從 .npz 或 .csv 批量匯入點位 - 整批驗證後在同一個交易中寫入
+        hand: 只有笛卡爾座標的列以此手系逆解，None 時使用 arm_orientation()
+        有任何錯誤時不匯入，回傳 (匯入數量, ImportIssue 列表)
+        """
+        hand = self.arm_orientation(hand)
+        try:
+            t0 = time.perf_counter()
+            table = load_table(path, hand)
+            issues = validate_table(table, existing_names=[point['name'] for point in self.saved_points])
+            elapsed = time.perf_counter() - t0
+        except Exception as e:
+            self.emit_log(f"讀取點位檔案失敗: {str(e)}")
+            return 0, []
+        
+        errors = [issue for issue in issues if issue.severity == SEVERITY_ERROR]
+        for issue in issues[:max_issue_logs]:
+            label = "錯誤" if issue.severity == SEVERITY_ERROR else "警告"
+            self.emit_log(f"第 {issue.row + 1} 列 '{table.names[issue.row]}' {label}: {issue.message}")
+        if len(issues) > max_issue_logs:
+            self.emit_log(f"... 另有 {len(issues) - max_issue_logs} 項問題未顯示")
+        if errors:
+            self.emit_log(f"點位檔案驗證失敗: {len(errors)} 項錯誤，未匯入任何點位")
+            return 0, issues
+        
+        try:
+            added = self.saved_points.add_many(table_to_points(table))
+        except Exception as e:
+            self.emit_log(f"匯入點位失敗: {str(e)}")
+            return 0, issues
+        if self.point_index is not None:
+            for point in added:
+                self.point_index.update(point)
+        self.emit_log(f"已匯入 {len(added)} 個點位 (讀取與驗證 {elapsed * 1000:.0f}ms，{len(issues)} 項警告)")
+        return len(added), issues
+    
+    def export_points(self, path, indices=None):
+        """將點位匯出為 .npz 或 .csv，indices 為None時匯出全部"""
+        points = list(self.saved_points) if indices is None else [self.saved_points[i] for i in indices]
+        try:
+            save_table(path, points_to_table(points))
+            self.emit_log(f"已匯出 {len(points)} 個點位到 {os.path.basename(path)}")
+            return True
+        except Exception as e:
+            self.emit_log(f"匯出點位失敗: {str(e)}")
+            return False
+    
+    def preview_frame_transform(self, reference_indices, new_reference_poses, indices=None):
+        """
+        夾具重新定位 - 以重新示教的參考點求出轉換並預覽整組點位，不修改點位
+        reference_indices: 參考點的點位索引（2~3個，保存的是舊位置）
+        new_reference_poses: 參考點重新示教後的 [x, y, z, r] 列表，順序與 reference_indices 相同
+        indices: 要轉換的點位索引，None 表示全部點位
+        回傳 (FrameTransform, TransformPreview)，失敗時回傳 (None, None)
+        """
+        if indices is None:
+            indices = list(range(len(self.saved_points)))
+        try:
+            old = [[self.saved_points[i]['cartesian'][key] for key in ('x', 'y', 'z', 'r')] for i in reference_indices]
+            transform = fit_transform(old, new_reference_poses)
+        except (ValueError, IndexError) as e:
+            self.emit_log(f"夾具轉換計算失敗: {str(e)}")
+            return None, None
+        
+        points = [self.saved_points[i] for i in indices]
+        cartesian = [[p['cartesian'][key] for key in ('x', 'y', 'z', 'r')] for p in points]
+        joint = [[p['joint'][key] for key in ('j1', 'j2', 'j3', 'j4')] for p in points]
+        preview = preview_transform(cartesian, joint, transform)
+        
+        self.emit_log(f"夾具轉換: 旋轉 {transform.theta:.3f}°，平移 ({transform.tx:.2f}, {transform.ty:.2f})，"
+                      f"Z偏移 {transform.dz:.2f}mm，參考點殘差 {transform.residual:.3f}mm")
+        if len(points):
+            self.emit_log(f"預覽 {len(points)} 個點位，最大位移 {preview.displacement.max():.2f}mm")
+        for row, message in preview.issues:
+            self.emit_log(f"點位 '{points[row]['name']}' {message}")
+        return transform, preview
+    
+    def apply_frame_transform(self, preview, indices=None):
+        """
+        在同一個交易中套用 preview_frame_transform 的預覽結果
+        indices 必須與預覽時相同；有任何點位無法到達時不套用
+        """
+        if indices is None:
+            indices = list(range(len(self.saved_points)))
+        if preview is None or len(indices) != len(preview.cartesian):
+            self.emit_log("夾具轉換預覽與點位不一致，請重新預覽")
+            return False
+        if preview.issues:
+            self.emit_log(f"有 {len(preview.issues)} 個點位轉換後無法到達，未套用轉換")
+            return False
+        try:
+            updated = self.saved_points.update_many(indices, preview_points([self.saved_points[i] for i in indices], preview))
+        except Exception as e:
+            self.emit_log(f"套用夾具轉換失敗: {str(e)}")
+            return False
+        if self.point_index is not None:
+            for point in updated:
+                self.point_index.update(point)
+        self.emit_log(f"已套用夾具轉換到 {len(updated)} 個點位")
+        return True
+    
+    def generate_pallet(self, corner_indices, rows, columns, layers=1, layer_pitch=0.0, approach=30.0,
+                        retreat=None, column_pitch=None, row_pitch=None, top_down=False, hand=None):
+        """
+        由三個示教角點產生料盤格位（不修改點位）
+        corner_indices: (第一格, 第一行最後一列, 最後一行第一列) 的點位索引
+        rows / columns / layers: 行數、列數、層數；layer_pitch: 層間距 (mm，沿 +Z)
+        approach / retreat: 接近點/離開點在格位上方的高度 (mm)
+        column_pitch / row_pitch: 列/行間距 (mm)，None 時由角點距離平均分配
+        top_down: 從最上層開始（卸料）
+        hand: 逆解手系，None 時使用 arm_orientation()
+        回傳 PalletPlan，失敗時回傳None；plan.issues 非空時表示有格位無法到達
+        """
+        try:
+            corners = [self.saved_points[i] for i in corner_indices]
+            if len(corners) != 3:
+                raise ValueError("需要3個角點")
+            poses = [[point['cartesian'][key] for key in ('x', 'y', 'z', 'r')] for point in corners]
+            hand = self.arm_orientation(hand)
+            plan = generate_pallet(poses[0], poses[1], poses[2], rows, columns, layers,
+                                   column_pitch=column_pitch, row_pitch=row_pitch, layer_pitch=layer_pitch,
+                                   approach=approach, retreat=retreat, hand=hand, top_down=top_down)
+        except (ValueError, IndexError, KeyError) as e:
+            self.emit_log(f"料盤格位產生失敗: {str(e)}")
+            return None
+        
+        self.emit_log(f"料盤格位: {layers}層 x {rows}行 x {columns}列，共 {len(plan.slots)} 格")
+        for index, message in plan.issues:
+            self.emit_log(f"格位 {index + 1}: {message}")
+        if plan.issues:
+            self.emit_log(f"有 {len(plan.issues)} 個格位無法到達")
+        return plan
+    
+    def execute_pallet(self, plan, speed=50, cp=50, lookahead=4, indices=None, preflight=True,
+                       approach_type='MovJ'):
+        """
+        以序列執行器依序執行料盤格位: 每格 接近點 -> 格位(停止) -> 離開點
+        indices: 只執行指定的格位，None 表示全部
+        approach_type: 接近點的運動類型 ('MovJ' / 'JointMovJ')
+        """
+        if plan is None or plan.issues:
+            self.emit_log("料盤格位有無法到達的位置，未執行")
+            return False
+        sequence = pallet_steps(plan, speed=speed, cp=cp, approach_type=approach_type, indices=indices)
+        if not sequence:
+            self.emit_log("點位序列為空")
+            return False
+        return self._start_sequence(sequence, lookahead, preflight)
+    
+    def save_pallet_points(self, plan, prefix='Slot'):
+        """在同一個交易中將料盤格位保存為點位，名稱為 {prefix}_L層_R行_C列"""
+        if plan is None or plan.issues:
+            self.emit_log("料盤格位有無法到達的位置，未保存")
+            return False
+        try:
+            added = self.saved_points.add_many(pallet_points(plan, prefix))
+        except DuplicatePointName as e:
+            self.emit_log(f"保存料盤格位失敗: {str(e)}")
+            return False
+        if self.point_index is not None:
+            for point in added:
+                self.point_index.update(point)
+        self.emit_log(f"已保存 {len(added)} 個料盤格位")
+        return True
+    
+    def load_points(self):
+        """開啟點位資料庫（點位在第一次存取時才載入），資料庫為空時匯入舊版JSON檔"""
+        try:
+            self.saved_points = PointStore(self.points_db, legacy_json=self.points_file, log=self.emit_log)
+            self.point_index = None
+            self.emit_log(f"點位資料庫已開啟，共 {len(self.saved_points)} 個點位")
+        except Exception as e:
+            self.emit_log(f"開啟點位資料庫失敗: {str(e)}")
+            self.saved_points = []
     
     # ==================== 狀態反饋 ====================
     
@@ -756,17 +1318,21 @@ class RobotController(QObject):
         self.feedback_count = 0
         self.feedback_active = True
         
+        # 告警監視器：只在進入錯誤模式時查詢GetErrorID，錯誤持續期間每秒查詢一次
+        self.error_monitor = ErrorMonitor(self.client_dash.GetErrorID, self.on_alarms_changed,
+                                          poll_interval=1.0, on_fetch_error=self.on_alarm_fetch_error)
+        self.error_monitor.start()
+        
         # 設置線程為高優先級
         self.feedback_thread = Thread(target=self.feedback_loop, daemon=True)
         self.feedback_thread.start()
-        self.emit_log("高頻率狀態反饋線程已啟動 (200Hz目標頻率)")
+        self.emit_log("高頻率狀態反饋線程已啟動 (125Hz目標頻率)")
         
         # 啟動性能監控定時器
         self.start_performance_monitor()
     
     def feedback_loop(self):
         """反饋循環 - 高頻率版本"""
-        hasRead = 0
         error_count = 0
         max_errors = 10
         log_interval = 1000  # 每1000次循環才輸出一次日誌
@@ -776,11 +1342,8 @@ class RobotController(QObject):
         
         while self.global_state['connect'] and self.feedback_active:
             try:
-                data = bytes()
-                hasRead = 0
-                
                 # 檢查客戶端是否有效 - 減少日誌輸出
-                if not self.client_feed or not hasattr(self.client_feed, 'socket_dobot'):
+                if not self.client_feed or not self.feedback_reader:
                     if self.feedback_count % 100 == 0:  # 只每100次輸出一次警告
                         self.emit_log("警告：反饋客戶端無效")
                     time.sleep(0.1)
@@ -794,51 +1357,17 @@ class RobotController(QObject):
                         self.emit_log("Socket超時設置失敗")
                     break
                 
-                # 讀取1440字節的反饋數據
-                while hasRead < 1440:
-                    try:
-                        remaining = 1440 - hasRead
-                        temp = self.client_feed.socket_dobot.recv(remaining)
-                        
-                        if len(temp) == 0:
-                            raise ConnectionError("接收到空數據")
-                            
-                        hasRead += len(temp)
-                        data += temp
-                        
-                    except socket.timeout:
-                        raise
-                    except Exception as e:
-                        raise
-                
-                # 驗證數據完整性 - 移除日誌輸出
-                if len(data) != 1440:
-                    continue
+                # 讀取1440字節的反饋數據（測試值已驗證，直接寫入預分配緩衝區）
+                a = self.feedback_reader.read_frame()
                 
                 # 解析反饋數據
                 try:
-                    a = np.frombuffer(data, dtype=MyType)
-                    
-                    # 驗證測試值 - 移除日誌輸出
-                    test_value = a['test_value'][0]
-                    expected_test = 0x123456789abcdef
-                    
-                    if test_value != expected_test:
-                        continue
-                    
                     self.feedback_count += 1
                     self.last_feedback_time = time.time()
                     error_count = 0
                     
                     # 準備反饋數據
-                    feedback_data = {
-                        'speed_scaling': float(a["speed_scaling"][0]),
-                        'robot_mode': int(a["robot_mode"][0]),
-                        'digital_input_bits': int(a["digital_input_bits"][0]),
-                        'digital_outputs': int(a["digital_outputs"][0]),
-                        'q_actual': [float(x) for x in a["q_actual"][0][:4]],
-                        'tool_vector_actual': [float(x) for x in a["tool_vector_actual"][0][:4]]
-                    }
+                    feedback_data = decode_feedback(a)
                     
                     # 更新當前位置數據
                     self.update_current_position(feedback_data)
@@ -846,9 +1375,19 @@ class RobotController(QObject):
                     # 發送信號更新UI
                     self.feedback_update.emit(feedback_data)
                     
-                    # 檢查錯誤狀態
-                    if a["robot_mode"][0] == 9:
-                        self.handle_robot_error()
+                    # 檢查錯誤狀態（邊緣觸發，查詢在監視器線程中執行）
+                    monitor = self.error_monitor
+                    if monitor is not None:
+                        monitor.update(feedback_data['robot_mode'])
+                    
+                    # 推進點位序列進度
+                    executor = self.sequence_executor
+                    if executor is not None and executor.running:
+                        executor.update(feedback_data)
+                    
+                    # 推進到位等待
+                    for waiter in self.arrival_waiters:
+                        waiter.update(feedback_data)
                     
                     # 大幅減少日誌輸出頻率
                     if self.feedback_count % log_interval == 0:
@@ -860,8 +1399,7 @@ class RobotController(QObject):
                         self.emit_log(f"數據解析錯誤: {str(e)}")
                     continue
                     
-                # 高頻率循環，最小延遲
-                time.sleep(0.005)  # 5ms週期，提高到200Hz
+                # 不再固定延遲：read_frame會阻塞到下一幀，並讀完積壓的舊幀
                 
             except Exception as e:
                 error_count += 1
@@ -879,6 +1417,56 @@ class RobotController(QObject):
         self.emit_log("狀態反饋線程已停止")
         self.feedback_active = False
     
+    def get_feedback_age(self):
+        """獲取當前反饋幀的延遲秒數，尚無反饋時回傳None"""
+        if not self.feedback_reader:
+            return None
+        return self.feedback_reader.frame_age()
+    
+    def get_feedback_skipped(self):
+        """獲取因讀取最新幀而略過的反饋幀數量"""
+        if not self.feedback_reader:
+            return 0
+        return self.feedback_reader.skipped_count
+    
+    def start_recording(self, name=None):
+        """開始錄製完整反饋幀（獨立寫入線程，不影響反饋循環）"""
+        if not self.feedback_reader:
+            self.emit_log("反饋讀取器未建立，無法開始錄製")
+            return False
+        
+        if self.feedback_recorder and self.feedback_recorder.running:
+            self.emit_log("反饋錄製已在進行中")
+            return False
+        
+        if not name:
+            name = f"feedback_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        try:
+            recorder = FeedbackRecorder(os.path.join(self.recordings_dir, name))
+            recorder.start()
+            self.feedback_recorder = recorder
+            self.feedback_reader.recorder = recorder
+            self.emit_log(f"開始錄製反饋數據: {recorder.frames_file}")
+            return True
+        except Exception as e:
+            self.emit_log(f"開始錄製失敗: {str(e)}")
+            return False
+    
+    def stop_recording(self):
+        """停止錄製反饋幀"""
+        if not self.feedback_recorder:
+            return False
+        
+        if self.feedback_reader:
+            self.feedback_reader.recorder = None
+        
+        recorder = self.feedback_recorder
+        self.feedback_recorder = None
+        recorder.stop()
+        self.emit_log(f"反饋錄製已停止 - 已寫入: {recorder.recorded_count}, 丟棄: {recorder.dropped_count}")
+        return True
+    
     def update_current_position(self, feedback_data):
         """更新當前位置數據"""
         pos = feedback_data.get('tool_vector_actual', [0, 0, 0, 0])
@@ -911,31 +1499,50 @@ class RobotController(QObject):
     def parse_and_display_error(self, error_response):
         """解析並顯示錯誤信息"""
         try:
-            if "{" in error_response:
-                error_data = error_response.split("{")[1].split("}")[0]
-                error_list = json.loads("{" + error_data + "}")
-                
-                error_messages = {
-                    22: "手勢切換錯誤 - 請嘗試使用關節運動(JointMovJ)或調整目標點位",
-                    23: "直線運動過程中規劃點超出工作空間 - 重新選取運動點位",
-                    24: "圓弧運動過程中規劃點超出工作空間 - 重新選取運動點位",
-                    32: "運動過程逆解算奇異 - 重新選取運動點位",
-                    33: "運動過程逆解算無解 - 重新選取運動點位",
-                    34: "運動過程逆解算限位 - 重新選取運動點位"
-                }
-                
-                if len(error_list) > 0 and error_list[0]:
-                    for error_id in error_list[0]:
-                        if error_id in error_messages:
-                            self.emit_error(f"錯誤 {error_id}: {error_messages[error_id]}")
-                        else:
-                            self.emit_error(f"未知錯誤 {error_id}")
+            reply = parse_reply(error_response)
+            if reply.values:
+                # 回傳值為 [[控制器告警], [伺服1告警], ...]
+                self.display_alarms(reply.value)
             else:
                 self.emit_error(f"機械臂錯誤: {error_response}")
                 
         except Exception as e:
             self.emit_error(f"錯誤解析失敗: {str(e)}")
             self.emit_error(f"原始錯誤: {error_response}")
+    
+    def display_alarms(self, error_list):
+        """顯示告警列表 [[控制器告警], [伺服1告警], ...]"""
+        catalog = get_alarm_catalog()
+        
+        if len(error_list) > 0 and error_list[0]:
+            for error_id in error_list[0]:
+                message = catalog.describe(error_id, 'controller')
+                if message:
+                    self.emit_error(f"錯誤 {error_id}: {message}")
+                else:
+                    self.emit_error(f"未知錯誤 {error_id}")
+        
+        # 伺服告警，第1~6項對應各軸
+        for axis, servo_errors in enumerate(error_list[1:], start=1):
+            for error_id in servo_errors:
+                message = catalog.describe(error_id, 'servo')
+                if message:
+                    self.emit_error(f"J{axis} 伺服錯誤 {error_id}: {message}")
+                else:
+                    self.emit_error(f"J{axis} 未知伺服錯誤 {error_id}")
+    
+    def on_alarms_changed(self, alarms):
+        """告警監視器回調：告警集合改變時顯示"""
+        if any(alarms):
+            # 錯誤狀態下控制器設定可能被重置
+            self.settings_mirror.invalidate(keep=PERSISTENT_SETTINGS)
+            self.display_alarms(alarms)
+        elif not alarms:
+            self.emit_log("機械臂告警已清除")
+    
+    def on_alarm_fetch_error(self, error):
+        """告警監視器回調：查詢GetErrorID失敗"""
+        self.emit_error(f"獲取錯誤信息失敗: {str(error)}")
 
     def diagnose_feedback_issue(self):
         """診斷反饋問題"""
@@ -1028,9 +1635,9 @@ class RobotController(QObject):
             
             # 從回應中提取模式值
             try:
-                if "{" in robot_mode_result and "}" in robot_mode_result:
-                    mode_str = robot_mode_result.split("{")[1].split("}")[0]
-                    mode = int(mode_str)
+                reply = parse_reply(robot_mode_result)
+                if reply.values:
+                    mode = int(reply.value)
                     
                     mode_descriptions = {
                         1: "初始化中",
@@ -1082,10 +1689,11 @@ class RobotController(QObject):
                 actual_freq = count_diff / 5.0  # 每5秒監控一次
                 
                 # 只在頻率異常時輸出日誌
+                skipped = self.get_feedback_skipped()
                 if actual_freq < 50:  # 低於50Hz時警告
-                    self.emit_log(f"反饋頻率較低: {actual_freq:.1f}Hz (目標200Hz)")
+                    self.emit_log(f"反饋頻率較低: {actual_freq:.1f}Hz (目標125Hz), 略過舊幀: {skipped}")
                 elif self.feedback_count % 5000 == 0:  # 每5000次輸出一次正常狀態
-                    self.emit_log(f"反饋頻率: {actual_freq:.1f}Hz, 總計: {current_count}")
+                    self.emit_log(f"反饋頻率: {actual_freq:.1f}Hz, 總計: {current_count}, 略過舊幀: {skipped}")
                 
                 self.last_feedback_count = current_count
                 
@@ -151,6 +151,9 @@ class RobotUI(QMainWindow):
         self.robot_controller.error_update.connect(self.append_error, Qt.QueuedConnection)
         self.robot_controller.connection_changed.connect(self.on_connection_changed, Qt.QueuedConnection)
         self.robot_controller.enable_changed.connect(self.on_enable_changed, Qt.QueuedConnection)
+        self.robot_controller.sequence_progress.connect(self.on_sequence_progress, Qt.QueuedConnection)
+        self.robot_controller.sequence_finished.connect(self.on_sequence_finished, Qt.QueuedConnection)
+        self.robot_controller.modbus_changed.connect(self.on_modbus_changed, Qt.QueuedConnection)
         
     def setupUI(self):
         """建立UI界面"""
@@ -753,6 +756,21 @@ class RobotUI(QMainWindow):
         delete_btn.clicked.connect(self.delete_selected_point)
         btn_layout.addWidget(delete_btn)
         
+        import_btn = QPushButton("匯入點位")
+        import_btn.clicked.connect(self.import_points)
+        import_btn.setToolTip("從 .npz 或 .csv 批量匯入點位 (欄位: name,x,y,z,r,j1,j2,j3,j4)")
+        btn_layout.addWidget(import_btn)
+        
+        export_btn = QPushButton("匯出點位")
+        export_btn.clicked.connect(self.export_points)
+        btn_layout.addWidget(export_btn)
+        
+        self.nearest_point_btn = QPushButton("選取最近點位")
+        self.nearest_point_btn.clicked.connect(self.select_nearest_point)
+        self.nearest_point_btn.setEnabled(False)
+        self.nearest_point_btn.setToolTip("在列表中選取離機械臂目前位置最近的點位")
+        btn_layout.addWidget(self.nearest_point_btn)
+        
         layout.addLayout(btn_layout)
         
         # 點位列表
@@ -772,7 +790,8 @@ class RobotUI(QMainWindow):
         self.motion_type_combo.addItems([
             "直線運動(MovL) - 可能遇到手勢切換問題",
             "關節運動(MovJ) - 避免手勢切換問題", 
-            "關節座標運動(JointMovJ) - 使用儲存關節角度"
+            "關節座標運動(JointMovJ) - 使用儲存關節角度",
+            "門型運動(Jump) - 抬升、平移、下降"
         ])
         self.motion_type_combo.setCurrentIndex(1)
         motion_type_layout.addWidget(self.motion_type_combo)
@@ -810,11 +829,45 @@ class RobotUI(QMainWindow):
         
         move_control_layout.addLayout(move_btn_layout)
         
+        # 連續序列按鈕
+        sequence_btn_layout = QHBoxLayout()
+        
+        self.run_sequence_btn = QPushButton("連續執行全部點位")
+        self.run_sequence_btn.clicked.connect(lambda: self.run_point_sequence())
+        self.run_sequence_btn.setEnabled(False)
+        self.run_sequence_btn.setToolTip("依列表順序預送運動，中間點以CP平滑過渡，不在每點停止")
+        sequence_btn_layout.addWidget(self.run_sequence_btn)
+        
+        self.optimize_sequence_btn = QPushButton("估算/最佳化週期")
+        self.optimize_sequence_btn.clicked.connect(self.optimize_point_sequence)
+        self.optimize_sequence_btn.setEnabled(False)
+        self.optimize_sequence_btn.setToolTip("估算全部點位的週期時間，並搜尋每段速度/加速度/CP參數")
+        sequence_btn_layout.addWidget(self.optimize_sequence_btn)
+        
+        self.order_points_btn = QPushButton("最佳化點位順序")
+        self.order_points_btn.clicked.connect(self.optimize_point_order)
+        self.order_points_btn.setEnabled(False)
+        self.order_points_btn.setToolTip("以關節運動時間重新排列點位列表，從機械臂目前位置出發")
+        sequence_btn_layout.addWidget(self.order_points_btn)
+        
+        self.stop_sequence_btn = QPushButton("停止序列")
+        self.stop_sequence_btn.clicked.connect(self.robot_controller.stop_point_sequence)
+        self.stop_sequence_btn.setEnabled(False)
+        sequence_btn_layout.addWidget(self.stop_sequence_btn)
+        
+        self.sequence_progress_label = QLabel("")
+        sequence_btn_layout.addWidget(self.sequence_progress_label)
+        
+        move_control_layout.addLayout(sequence_btn_layout)
+        
         move_control_group.setLayout(move_control_layout)
         layout.addWidget(move_control_group)
         
         # 保存點位按鈕引用
-        self.point_buttons = [self.save_point_btn, self.sync_btn, self.move_to_point_btn, self.quick_move_btn]
+        self.point_buttons = [self.save_point_btn, self.sync_btn, self.nearest_point_btn,
+                              self.move_to_point_btn, self.quick_move_btn,
+                              self.run_sequence_btn, self.optimize_sequence_btn, self.order_points_btn,
+                              self.stop_sequence_btn]
         
         group.setLayout(layout)
         return group
@@ -917,6 +970,8 @@ class RobotUI(QMainWindow):
             self.connect_btn.setText("斷開")
         else:
             self.connect_btn.setText("連接")
+            self.gripper_status_label.setText("未連接")
+            self.gripper_status_label.setStyleSheet("color: red")
             
         # 啟用/禁用控制按鈕 (包含新的速度控制按鈕)
         self.enable_btn.setEnabled(connected)
@@ -932,6 +987,24 @@ class RobotUI(QMainWindow):
         else:
             self.enable_btn.setText("使能")
     
+    @pyqtSlot(int, int)
+    def on_sequence_progress(self, completed, total):
+        """點位序列進度更新"""
+        self.sequence_progress_label.setText(f"{completed}/{total}")
+    
+    @pyqtSlot(bool, str)
+    def on_sequence_finished(self, success, message):
+        """點位序列結束"""
+        self.run_sequence_btn.setEnabled(self.is_connected)
+        if not success:
+            self.append_error(message)
+    
+    @pyqtSlot(str, dict)
+    def on_modbus_changed(self, name, changes):
+        """外部模組寄存器改變 - 夾爪狀態只在寄存器改變時更新顯示"""
+        if name == 'GRIPPER':
+            self.update_gripper_display()
+    
     @pyqtSlot(dict)
     def update_feedback_display(self, data):
         """更新反饋顯示 - 高頻版本，只緩存數據"""
@@ -940,16 +1013,7 @@ class RobotUI(QMainWindow):
             self.latest_feedback_data = data
             
             # 更新控制器內部位置數據 (這個需要高頻更新)
-            # 其他UI更新由定時器處理
-            
-            # 夾爪狀態更新 (低頻)
-            if hasattr(self, 'gripper_update_counter'):
-                self.gripper_update_counter += 1
-            else:
-                self.gripper_update_counter = 0
-                
-            if self.gripper_update_counter % 20 == 0:  # 每20次更新一次夾爪狀態
-                self.update_gripper_display()
+            # 其他UI更新由定時器處理，夾爪狀態由寄存器改變事件更新
             
         except Exception as e:
             pass  # 靜默處理錯誤，避免日誌洪水
@@ -1119,13 +1183,9 @@ class RobotUI(QMainWindow):
         self.joint_acc_spin.setValue(speed)
         self.linear_acc_spin.setValue(speed)
         
-        # 套用到機械臂
-        success = True
-        success &= self.robot_controller.set_speed_factor(speed)
-        success &= self.robot_controller.set_speed_j(speed)
-        success &= self.robot_controller.set_speed_l(speed)
-        success &= self.robot_controller.set_acc_j(speed)
-        success &= self.robot_controller.set_acc_l(speed)
+        # 套用到機械臂（未變更的參數不重複發送）
+        success = self.robot_controller.apply_motion_settings(
+            speed_factor=speed, speed_j=speed, speed_l=speed, acc_j=speed, acc_l=speed)
         
         if success:
             QMessageBox.information(self, "設定成功", f"已套用 {preset_text} 到所有運動參數")
@@ -1260,8 +1320,6 @@ class RobotUI(QMainWindow):
         point = self.robot_controller.saved_points[current_row]
         
         # 確保點位數據完整性
-        if 'id' not in point:
-            point['id'] = current_row
         if 'name' not in point:
             point['name'] = f"Point_{current_row}"
         if 'cartesian' not in point:
@@ -1292,6 +1350,34 @@ class RobotUI(QMainWindow):
             else:
                 QMessageBox.warning(self, "錯誤", "點位更新失敗")
     
+    def import_points(self):
+        """從檔案批量匯入點位"""
+        path, _ = QFileDialog.getOpenFileName(self, "匯入點位", "", "點位檔案 (*.csv *.npz)")
+        if not path:
+            return
+        count, issues = self.robot_controller.import_points(path)
+        if count:
+            self.refresh_points_list()
+            QMessageBox.information(self, "匯入完成", f"已匯入 {count} 個點位")
+        elif issues:
+            QMessageBox.warning(self, "匯入失敗", f"點位檔案有 {len(issues)} 項問題，詳見日誌")
+    
+    def export_points(self):
+        """將全部點位匯出到檔案"""
+        path, _ = QFileDialog.getSaveFileName(self, "匯出點位", "robot_points.csv", "CSV (*.csv);;NumPy (*.npz)")
+        if path:
+            self.robot_controller.export_points(path)
+    
+    def select_nearest_point(self):
+        """選取離機械臂目前位置最近的點位"""
+        matches = self.robot_controller.nearest_points(k=1)
+        if not matches:
+            QMessageBox.warning(self, "警告", "沒有已保存的點位")
+            return
+        index, point, distance = matches[0]
+        self.points_list.setCurrentRow(index)
+        self.append_log(f"最近點位: '{point['name']}'，距離 {distance:.2f}mm")
+    
     def delete_selected_point(self):
         """刪除選中的點位"""
         current_row = self.points_list.currentRow()
@@ -1319,7 +1405,8 @@ class RobotUI(QMainWindow):
             [
                 "直線運動(MovL) - 可能遇到手勢切換問題",
                 "關節運動(MovJ) - 避免手勢切換問題", 
-                "關節座標運動(JointMovJ) - 使用儲存關節角度"
+                "關節座標運動(JointMovJ) - 使用儲存關節角度",
+                "門型運動(Jump) - 抬升、平移、下降"
             ], 
             1, False)
         
@@ -1359,7 +1446,8 @@ class RobotUI(QMainWindow):
                 [
                     "直線運動(MovL) - 可能遇到手勢切換問題",
                     "關節運動(MovJ) - 避免手勢切換問題", 
-                    "關節座標運動(JointMovJ) - 使用儲存關節角度"
+                    "關節座標運動(JointMovJ) - 使用儲存關節角度",
+                    "門型運動(Jump) - 抬升、平移、下降"
                 ], 
                 1, False)
             
@@ -1379,45 +1467,76 @@ class RobotUI(QMainWindow):
         else:
             self.append_log("點位移動指令執行完成")
     
+    def build_point_sequence_steps(self):
+        """以列表順序、預設運動類型與速度建立全部點位的序列，中間點平滑過渡，最後一點停止"""
+        points = self.robot_controller.saved_points
+        motion_type = self.motion_type_combo.currentText()
+        speed = self.point_speed_slider.value()
+        return [(i, motion_type, speed, 50 if i < len(points) - 1 else 0) for i in range(len(points))]
+    
+    def run_point_sequence(self, steps=None):
+        """依列表順序連續執行全部點位，使用預設運動類型與速度"""
+        if not self.robot_controller.saved_points:
+            QMessageBox.warning(self, "警告", "沒有已保存的點位")
+            return
+            
+        if not self.is_connected or not self.is_enabled:
+            QMessageBox.warning(self, "警告", "請先連接並使能機械臂")
+            return
+        
+        if not steps:
+            steps = self.build_point_sequence_steps()
+        
+        self.append_log(f"開始連續執行 {len(steps)} 個點位")
+        if self.robot_controller.execute_point_sequence(steps):
+            # 進度標籤由 sequence_progress 信號以實際執行段數更新
+            self.run_sequence_btn.setEnabled(False)
+    
+    def optimize_point_sequence(self):
+        """估算全部點位的週期時間，並詢問是否以最佳化參數執行"""
+        if not self.robot_controller.saved_points:
+            QMessageBox.warning(self, "警告", "沒有已保存的點位")
+            return
+        
+        steps = self.build_point_sequence_steps()
+        estimate = self.robot_controller.estimate_point_sequence(steps)
+        optimized = self.robot_controller.optimize_point_sequence(steps)
+        if estimate is None or optimized is None:
+            return
+        after = self.robot_controller.estimate_point_sequence(optimized)
+        
+        reply = QMessageBox.question(self, "週期時間",
+            f"目前參數預估週期時間: {estimate.total:.2f}s\n"
+            f"最佳化參數預估週期時間: {after.total:.2f}s\n\n"
+            "是否以最佳化參數連續執行全部點位？",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.run_point_sequence(optimized)
+    
+    def optimize_point_order(self):
+        """最佳化全部點位的執行順序，確認後重新排列點位列表"""
+        if len(self.robot_controller.saved_points) < 3:
+            QMessageBox.warning(self, "警告", "至少需要3個點位才需要排序")
+            return
+        
+        order = self.robot_controller.optimize_point_order()
+        if not order:
+            return
+        
+        names = " -> ".join(self.robot_controller.saved_points[i]['name'] for i in order[:10])
+        if len(order) > 10:
+            names += " -> ..."
+        reply = QMessageBox.question(self, "點位順序",
+            f"最佳化後的順序:\n{names}\n\n是否套用並保存到點位列表？",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.robot_controller.reorder_points(order)
+            self.refresh_points_list()
+    
     def refresh_points_list(self):
         """刷新點位列表顯示 - 修正版本"""
         self.points_list.clear()
         
-        # 修正所有點位數據的完整性
-        for i, point in enumerate(self.robot_controller.saved_points):
-            # 檢查並修正缺少的id欄位
-            if 'id' not in point:
-                point['id'] = i
-            
-            # 檢查並修正缺少的name欄位
-            if 'name' not in point:
-                point['name'] = f"Point_{i}"
-            
-            # 檢查cartesian數據
-            if 'cartesian' not in point:
-                point['cartesian'] = {'x': 0, 'y': 0, 'z': 0, 'r': 0}
-            
-            # 確保cartesian字典包含所有必要的鍵
-            cartesian = point['cartesian']
-            required_keys = ['x', 'y', 'z', 'r']
-            for key in required_keys:
-                if key not in cartesian:
-                    cartesian[key] = 0.0
-            
-            # 檢查joint數據
-            if 'joint' not in point:
-                point['joint'] = {'j1': 0, 'j2': 0, 'j3': 0, 'j4': 0}
-            
-            # 確保joint字典包含所有必要的鍵
-            joint = point['joint']
-            required_joint_keys = ['j1', 'j2', 'j3', 'j4']
-            for key in required_joint_keys:
-                if key not in joint:
-                    joint[key] = 0.0
-        
-        # 保存修正後的數據
-        self.robot_controller.save_points()
-        
         # 重新生成列表項目
         for i, point in enumerate(self.robot_controller.saved_points):
             cartesian = point['cartesian']
@@ -0,0 +1,257 @@
+"""
+Modbus 寄存器映像輪詢器
+
+由單一線程擁有 ModbusTcpClient，依各外部模組寄存器區塊各自的週期讀取，
+同一輪到期的相鄰區塊合併為盡量少的 read_holding_registers 請求
+（間隔不超過 max_gap、合併後不超過 Modbus 單次上限 125 個寄存器）；
+超過上限的單一區塊分成多次讀取
+
+預設的寄存器表 (DEFAULT_BLOCKS) 無法合併: 相鄰區塊合併後都超過 125 個寄存器
+（CCD1+VP 為 200~329 共 130 個，其餘間隔在 170 以上），每個區塊各自一次讀取；
+合併只在自訂的區塊表中地址相近的小區塊才會發生
+
+讀取結果寫入執行緒安全、附時間戳記的寄存器映像；UI、流程與交握程式都從映像讀取，
+不進行任何通訊，也不互相爭用連線。寄存器值改變時呼叫訂閱的回調（在輪詢線程中）
+
+寫入同樣經由輪詢器送出（與讀取共用同一把通訊鎖），寫入後涵蓋該地址的區塊立即重新讀取
+
+用法:
+    poller = ModbusPoller(client, DEFAULT_BLOCKS, slave=1)
+    poller.subscribe(lambda name, changes, timestamp: print(name, changes))
+    poller.start()
+    hold_status = poller.get(504)[0]
+    poller.write_registers(520, [8, 0, 0, command_id])
+"""
+import threading
+import time
+from collections import namedtuple
+
+# Modbus 單次讀取寄存器數量上限
+MAX_READ_COUNT = 125
+
+# name: 模組名稱；address / count: 起始地址與寄存器數量；interval: 讀取週期 (秒)
+RegisterBlock = namedtuple('RegisterBlock', ['name', 'address', 'count', 'interval'])
+
+# 外部模組寄存器區塊 (Doc/Dobot_main.架構.md)
+DEFAULT_BLOCKS = (
+    RegisterBlock('CCD1', 200, 60, 0.1),       # 200~259: 控制/狀態、檢測數量與座標結果 (240+)
+    RegisterBlock('VP', 300, 30, 0.1),         # 300~329: 狀態、控制 (320+)
+    RegisterBlock('GRIPPER', 500, 30, 0.02),   # 500~529: 狀態 (500+)、指令區塊 (520~523)
+    RegisterBlock('CCD3', 800, 50, 0.1),       # 800~849: 控制/狀態、角度結果 (840+)
+)
+
+
+def merge_blocks(blocks, max_gap=16, max_count=MAX_READ_COUNT):
+    """
+    將區塊依地址排序後合併為讀取範圍
+    回傳 [(起始地址, 數量, [區塊, ...]), ...]；區塊間隔不超過 max_gap 且總數量不超過 max_count 才合併
+    超過 max_count 的區塊先分段，每段各自參與合併（同一區塊可出現在多個範圍中）
+    """
+    segments = []
+    for block in sorted(blocks, key=lambda b: b.address):
+        for offset in range(0, block.count, max_count):
+            segments.append((block.address + offset, min(max_count, block.count - offset), block))
+
+    ranges = []
+    for address, size, block in segments:
+        end = address + size
+        if ranges:
+            start, count, members = ranges[-1]
+            merged = max(start + count, end) - start
+            if address - (start + count) <= max_gap and merged <= max_count:
+                ranges[-1] = (start, merged, members if block in members else members + [block])
+                continue
+        ranges.append((address, size, [block]))
+    return ranges
+
+
+class RegisterImage:
+    """執行緒安全的寄存器映像，每個寄存器保存最後讀到的值與時間戳記 (time.monotonic)"""
+
+    def __init__(self):
+        self._values = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    def update(self, address, values, timestamp):
+        """寫入連續寄存器，回傳改變的 {地址: (舊值, 新值)}（第一次讀到的舊值為None）"""
+        changes = {}
+        with self._lock:
+            for offset, value in enumerate(values):
+                key = address + offset
+                old = self._values.get(key)
+                if old != value:
+                    changes[key] = (old, value)
+                    self._values[key] = value
+                self._stamps[key] = timestamp
+        return changes
+
+    def get(self, address, count=1, max_age=None):
+        """
+        讀取連續寄存器的副本，任一寄存器尚未讀到時回傳None
+        max_age: 最舊的寄存器超過此秒數時回傳None
+        """
+        with self._lock:
+            try:
+                values = [self._values[key] for key in range(address, address + count)]
+                oldest = min(self._stamps[key] for key in range(address, address + count))
+            except KeyError:
+                return None
+        if max_age is not None and time.monotonic() - oldest > max_age:
+            return None
+        return values
+
+    def timestamp(self, address, count=1):
+        """連續寄存器中最舊的時間戳記，尚未讀到時回傳None"""
+        with self._lock:
+            stamps = [self._stamps.get(key) for key in range(address, address + count)]
+        return None if None in stamps else min(stamps)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._stamps.clear()
+
+
+class ModbusPoller:
+    """
+    外部模組寄存器輪詢器
+    輪詢線程是唯一呼叫 read_holding_registers 的地方；write_register(s) 可由任何線程呼叫
+    """
+
+    def __init__(self, client, blocks=DEFAULT_BLOCKS, slave=1, max_gap=16, max_count=MAX_READ_COUNT, log=None):
+        """
+        client: pymodbus ModbusTcpClient（連線由呼叫者建立與關閉）
+        blocks: RegisterBlock 列表
+        slave: Modbus 從站號
+        max_gap / max_count: 合併讀取的最大間隔與數量
+        log: 日誌函數
+        """
+        self.client = client
+        self.blocks = list(blocks)
+        self.slave = slave
+        self.max_gap = max_gap
+        self.max_count = max_count
+        self.log = log or (lambda message: None)
+        self.image = RegisterImage()
+
+        self.read_count = 0
+        self.error_count = 0
+
+        self._subscribers = []
+        self._next_due = {block.name: 0.0 for block in self.blocks}
+        self._failing = set()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def subscribe(self, callback):
+        """訂閱寄存器改變事件: callback(區塊名稱, {地址: (舊值, 新值)}, 時間戳記)"""
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        self._subscribers = [cb for cb in self._subscribers if cb != callback]
+
+    # ==================== 讀取（映像，無通訊） ====================
+
+    def get(self, address, count=1, max_age=None):
+        return self.image.get(address, count, max_age)
+
+    def block(self, name, max_age=None):
+        """讀取整個區塊，回傳 (寄存器列表, 時間戳記)，尚未讀到時回傳 (None, None)"""
+        for block in self.blocks:
+            if block.name == name:
+                values = self.image.get(block.address, block.count, max_age)
+                if values is None:
+                    return None, None
+                return values, self.image.timestamp(block.address, block.count)
+        raise KeyError(f"未知的寄存器區塊: {name}")
+
+    def refresh(self, address=None, count=1):
+        """要求涵蓋指定地址的區塊（None 表示全部區塊）在下一輪立即讀取"""
+        for block in self.blocks:
+            if address is None or (block.address < address + count and address < block.address + block.count):
+                self._next_due[block.name] = 0.0
+        self._wake.set()
+
+    # ==================== 寫入 ====================
+
+    def write_registers(self, address, values):
+        """寫入連續寄存器，回傳 pymodbus 回應，之後立即重新讀取涵蓋的區塊"""
+        with self._io_lock:
+            result = self.client.write_registers(address=address, values=list(values), slave=self.slave)
+        self.refresh(address, len(values))
+        return result
+
+    def write_register(self, address, value):
+        return self.write_registers(address, [value])
+
+    # ==================== 輪詢線程 ====================
+
+    def _poll_loop(self):
+        while self._running:
+            now = time.monotonic()
+            due = [block for block in self.blocks if self._next_due[block.name] <= now]
+            for block in due:
+                self._next_due[block.name] = now + block.interval
+            for address, count, members in merge_blocks(due, self.max_gap, self.max_count):
+                if not self._running:
+                    break
+                self._read_range(address, count, members)
+
+            wait = min(self._next_due.values()) - time.monotonic() if self._next_due else 1.0
+            if wait > 0:
+                self._wake.wait(wait)
+            self._wake.clear()
+
+    def _read_range(self, address, count, members):
+        try:
+            with self._io_lock:
+                result = self.client.read_holding_registers(address=address, count=count, slave=self.slave)
+            if result.isError():
+                raise IOError(str(result))
+        except Exception as e:
+            self.error_count += 1
+            names = ', '.join(block.name for block in members)
+            # 同一範圍持續失敗時只記錄一次
+            if address not in self._failing:
+                self._failing.add(address)
+                self.log(f"Modbus讀取失敗 ({names} {address}~{address + count - 1}): {str(e)}")
+            return
+
+        if address in self._failing:
+            self._failing.discard(address)
+            self.log(f"Modbus讀取已恢復 ({address}~{address + count - 1})")
+        self.read_count += 1
+        timestamp = time.monotonic()
+        registers = result.registers
+        for block in members:
+            # 分段讀取的區塊只更新本範圍涵蓋的部分
+            first = max(block.address, address)
+            last = min(block.address + block.count, address + count)
+            changes = self.image.update(first, registers[first - address:last - address], timestamp)
+            if changes:
+                for callback in self._subscribers:
+                    try:
+                        callback(block.name, changes, timestamp)
+                    except Exception as e:
+                        self.log(f"寄存器改變事件處理失敗: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+反饋到位等待
+
+以30004實時反饋判斷運動是否到位，取代阻塞整個 Move 端口直到隊列清空的 Sync():
+位置進入容差範圍、且關節速度 (qd_actual) 與TCP速度 (TCP_speed_actual) 都低於門檻，
+並持續 settle_time 秒後視為到位，回傳等待時間與從進入容差到穩定所需的時間
+
+可逐段使用，到位後立即執行IO或夾爪動作，不必等待整個隊列同步
+
+用法:
+    waiter = ArrivalWaiter([x, y, z, r], tolerance=0.5, timeout=10.0)
+    # 反饋線程每幀呼叫 waiter.update(feedback_data)
+    result = waiter.wait()
+    if result.reached:
+        print(f"到位 {result.elapsed:.3f}s，穩定時間 {result.settle_time:.3f}s")
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from error_monitor import ROBOT_MODE_ERROR
+
+SPACE_CARTESIAN = 'cartesian'
+SPACE_JOINT = 'joint'
+
+# reached: 是否到位；elapsed: 開始等待到確認到位的時間(秒)；
+# settle_time: 首次進入容差到確認穩定的時間(秒，未進入容差為None)；
+# error: 最後一幀的位置誤差 (mm或度，沒有反饋為None)；message: 說明文字
+ArrivalResult = namedtuple('ArrivalResult', ['reached', 'elapsed', 'settle_time', 'error', 'message'])
+
+
+class ArrivalWaiter:
+    """
+    單一目標的到位等待器
+    update() 由反饋線程呼叫，只做數值比較；wait() 在呼叫者線程阻塞直到到位、錯誤或逾時
+    """
+
+    def __init__(self, target, space=SPACE_CARTESIAN, tolerance=0.5, angle_tolerance=0.5,
+                 joint_speed_threshold=1.0, tcp_speed_threshold=2.0, settle_time=0.05, timeout=10.0):
+        """
+        target: 笛卡爾目標 [x, y, z, r] 或關節目標 [j1, j2, j3, j4]
+        space: 'cartesian' 比較 tool_vector_actual，'joint' 比較 q_actual
+        tolerance: 位置容差 (mm，關節模式用於J3)
+        angle_tolerance: 角度容差 (度，R軸或J1/J2/J4)
+        joint_speed_threshold: 各關節速度上限 (度/s 或 mm/s)
+        tcp_speed_threshold: TCP線速度上限 (mm/s)
+        settle_time: 條件需持續成立的時間 (秒)
+        timeout: 等待逾時 (秒)
+        """
+        if space not in (SPACE_CARTESIAN, SPACE_JOINT):
+            raise ValueError(f"未知的比較空間: {space}")
+        self.target = [float(v) for v in target[:4]]
+        self.space = space
+        self.tolerance = tolerance
+        self.angle_tolerance = angle_tolerance
+        self.joint_speed_threshold = joint_speed_threshold
+        self.tcp_speed_threshold = tcp_speed_threshold
+        self.settle_time = settle_time
+        self.timeout = timeout
+
+        self.result = None
+        self.error = None
+        self._start = time.monotonic()
+        self._entered = None     # 首次進入容差的時間
+        self._stable_since = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _position_error(self, feedback_data):
+        """回傳 (位置誤差, 角度誤差)"""
+        if self.space == SPACE_CARTESIAN:
+            pose = feedback_data['tool_vector_actual']
+            return math.dist(pose[:3], self.target[:3]), abs(pose[3] - self.target[3])
+        joints = feedback_data['q_actual']
+        angle = max(abs(joints[i] - self.target[i]) for i in (0, 1, 3))
+        return abs(joints[2] - self.target[2]), angle
+
+    def _settled(self, feedback_data):
+        joint_speed = feedback_data.get('qd_actual')
+        tcp_speed = feedback_data.get('TCP_speed_actual')
+        if joint_speed is not None and max(abs(v) for v in joint_speed[:4]) > self.joint_speed_threshold:
+            return False
+        if tcp_speed is not None and math.hypot(*tcp_speed[:3]) > self.tcp_speed_threshold:
+            return False
+        return True
+
+    def update(self, feedback_data):
+        """由反饋線程每幀呼叫"""
+        if self._done.is_set():
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._done.is_set():
+                return
+            if feedback_data['robot_mode'] == ROBOT_MODE_ERROR:
+                self._finish(False, now, "機械臂進入錯誤模式")
+                return
+
+            distance, angle = self._position_error(feedback_data)
+            self.error = max(distance, angle)
+            inside = distance <= self.tolerance and angle <= self.angle_tolerance
+            if inside and self._entered is None:
+                self._entered = now
+
+            if inside and self._settled(feedback_data):
+                if self._stable_since is None:
+                    self._stable_since = now
+                if now - self._stable_since >= self.settle_time:
+                    self._finish(True, now, "已到位")
+            else:
+                self._stable_since = None
+
+    def cancel(self, message="等待已取消"):
+        """從其他線程中止等待"""
+        with self._lock:
+            if not self._done.is_set():
+                self._finish(False, time.monotonic(), message)
+
+    def wait(self):
+        """阻塞直到到位、錯誤、取消或逾時，回傳 ArrivalResult"""
+        if not self._done.wait(max(self.timeout - (time.monotonic() - self._start), 0.0)):
+            with self._lock:
+                if not self._done.is_set():
+                    self._finish(False, time.monotonic(), f"超過 {self.timeout:.1f}s 未到位")
+        return self.result
+
+    def _finish(self, reached, now, message):
+        """設定結果（呼叫時需持有 _lock）"""
+        settle = None if self._entered is None else now - self._entered
+        self.result = ArrivalResult(reached, now - self._start, settle, self.error, message)
+        self._done.set()
@@ -0,0 +1,139 @@
+"""
+料盤/網格點位產生器
+
+以三個示教角點決定料盤的行列方向，一次產生全部格位的座標陣列:
+    corner_origin: 第一格 (第0行, 第0列)
+    corner_column: 第0行最後一列的格位（決定列方向）
+    corner_row:    最後一行第0列的格位（決定行方向）
+不等於角點距離平均分配時可另外指定行/列間距；多層料盤沿 +Z 以 layer_pitch 堆疊
+
+每個格位另外產生上方的接近點與離開點，以批次逆解檢查全部位置的可達性，
+依蛇形順序排列（相鄰格位距離最短），可直接轉為 SequenceStep 送入序列執行器
+
+用法:
+    plan = generate_pallet(origin, column_end, row_end, rows=4, columns=6, approach=30.0)
+    if not plan.issues:
+        steps = pallet_steps(plan, speed=60, cp=50)
+"""
+from collections import namedtuple
+import numpy as np
+import kinematics
+from kinematics import HAND_RIGHT
+from sequence_executor import SequenceStep
+
+# slots / approach / retreat: (N, 4) 座標陣列；grid: (N, 3) [層, 行, 列]；
+# joints / approach_joints / retreat_joints: (N, 4) 對應的關節角度（無解為NaN）；issues: [(格位索引, 說明), ...]
+PalletPlan = namedtuple('PalletPlan', ['slots', 'approach', 'retreat', 'grid', 'joints', 'approach_joints',
+                                       'retreat_joints', 'issues'])
+
+
+def _axis(start, end, count, pitch):
+    """回傳單位間距向量: 由角點方向與格數（或指定的間距）決定"""
+    delta = np.asarray(end, dtype=np.float64)[:3] - np.asarray(start, dtype=np.float64)[:3]
+    if count <= 1:
+        return np.zeros(3)
+    if pitch is None:
+        return delta / (count - 1)
+    length = np.linalg.norm(delta)
+    if length < 1e-6:
+        raise ValueError("角點重合，無法決定方向")
+    return delta / length * pitch
+
+
+def slot_grid(rows, columns, layers=1, serpentine=True, top_down=False):
+    """
+    回傳 (N, 3) [層, 行, 列] 的拜訪順序
+    serpentine: 每行交替方向（蛇形），相鄰格位只移動一個間距
+    top_down: 從最上層開始（卸料），否則從最下層開始（堆疊）
+    """
+    layer_order = range(layers - 1, -1, -1) if top_down else range(layers)
+    grid = []
+    for step, layer in enumerate(layer_order):
+        for row in range(rows):
+            # 每層接續上一層結束的位置，避免每層回到起點
+            reverse_rows = serpentine and step % 2 == 1
+            actual_row = rows - 1 - row if reverse_rows else row
+            reverse = serpentine and (step * rows + row) % 2 == 1
+            cols = range(columns - 1, -1, -1) if reverse else range(columns)
+            grid.extend((layer, actual_row, col) for col in cols)
+    return np.array(grid, dtype=np.int64).reshape(-1, 3)
+
+
+def generate_pallet(corner_origin, corner_column, corner_row, rows, columns, layers=1,
+                    column_pitch=None, row_pitch=None, layer_pitch=0.0, approach=30.0, retreat=None,
+                    hand=HAND_RIGHT, serpentine=True, top_down=False):
+    """
+    產生料盤格位
+    corner_*: [x, y, z, r] 角點
+    rows / columns / layers: 行數、列數、層數
+    column_pitch / row_pitch: 列/行間距 (mm)，None 時由角點距離平均分配
+    layer_pitch: 層間距 (mm，沿 +Z)
+    approach / retreat: 接近點/離開點在格位上方的高度 (mm)，retreat 為None時與 approach 相同
+    hand: 逆解手系
+    """
+    if rows < 1 or columns < 1 or layers < 1:
+        raise ValueError("行數、列數、層數至少為1")
+    origin = np.asarray(corner_origin, dtype=np.float64)[:4]
+    column_step = _axis(origin, corner_column, columns, column_pitch)
+    row_step = _axis(origin, corner_row, rows, row_pitch)
+    # R 角在三個角點之間線性內插
+    r_column = (corner_column[3] - origin[3]) / (columns - 1) if columns > 1 else 0.0
+    r_row = (corner_row[3] - origin[3]) / (rows - 1) if rows > 1 else 0.0
+
+    grid = slot_grid(rows, columns, layers, serpentine, top_down)
+    layer, row, col = grid[:, 0:1], grid[:, 1:2], grid[:, 2:3]
+    slots = np.empty((len(grid), 4))
+    slots[:, :3] = origin[:3] + col * column_step + row * row_step
+    slots[:, 2] += layer[:, 0] * layer_pitch
+    slots[:, 3] = origin[3] + col[:, 0] * r_column + row[:, 0] * r_row
+
+    lift = np.array([0.0, 0.0, 1.0, 0.0])
+    approach_poses = slots + lift * approach
+    retreat_poses = slots + lift * (approach if retreat is None else retreat)
+
+    # 格位、接近點、離開點合併成一批逆解
+    joints = kinematics.inverse_kinematics(np.concatenate([slots, approach_poses, retreat_poses]), hand)
+    ok = kinematics.within_limits(joints).reshape(3, -1)
+    issues = []
+    labels = ("格位", "接近點", "離開點")
+    for index in np.flatnonzero(~ok.all(axis=0)):
+        layer_index, row_index, col_index = grid[index]
+        bad = ', '.join(label for label, valid in zip(labels, ok[:, index]) if not valid)
+        issues.append((int(index), f"第{layer_index + 1}層 第{row_index + 1}行 第{col_index + 1}列 {bad}無法到達"))
+
+    slot_joints, approach_joints, retreat_joints = np.split(joints, 3)
+    return PalletPlan(slots, approach_poses, retreat_poses, grid, slot_joints, approach_joints, retreat_joints, issues)
+
+
+def _pose_point(name, pose, joint):
+    x, y, z, r = (float(v) for v in pose)
+    return {'name': name, 'cartesian': {'x': x, 'y': y, 'z': z, 'r': r},
+            'joint': dict(zip(('j1', 'j2', 'j3', 'j4'), (float(v) for v in joint)))}
+
+
+def pallet_points(plan, prefix='Slot'):
+    """格位轉為點位字典（可用 PointStore.add_many 保存），名稱為 {prefix}_L層_R行_C列"""
+    points = []
+    for (layer, row, col), pose, joint in zip(plan.grid.tolist(), plan.slots, plan.joints):
+        points.append(_pose_point(f"{prefix}_L{layer + 1}_R{row + 1}_C{col + 1}", pose, joint))
+    return points
+
+
+def pallet_steps(plan, speed=50, cp=50, approach_type='MovJ', prefix='Slot', indices=None):
+    """
+    轉為序列執行器的 SequenceStep 列表: 每格 接近點(CP過渡) -> 格位(停止) -> 離開點(CP過渡)
+    approach_type: 接近點的運動類型，'JointMovJ' 使用 generate_pallet 逆解得到的關節角度
+    indices: 只產生指定的格位（依 plan 的順序索引），None 表示全部
+    """
+    if indices is None:
+        indices = range(len(plan.slots))
+    points = pallet_points(plan, prefix)
+    steps = []
+    for index in indices:
+        name = points[index]['name']
+        approach = _pose_point(f"{name}_接近", plan.approach[index], plan.approach_joints[index])
+        retreat = _pose_point(f"{name}_離開", plan.retreat[index], plan.retreat_joints[index])
+        steps.append(SequenceStep(approach, approach_type, speed, cp))
+        steps.append(SequenceStep(points[index], 'MovL', speed, 0))
+        steps.append(SequenceStep(retreat, 'MovL', speed, cp))
+    return steps
@@ -0,0 +1,216 @@
+"""
+點位批量匯入/匯出
+
+以欄式資料 (PointTable: 名稱陣列 + (N, 4) 笛卡爾 + (N, 4) 關節) 讀寫 NumPy .npz 與 CSV，
+所有列以一次向量化運算檢查，不再逐點修正字典:
+    - 名稱空白、檔案內重複、與現有點位重複
+    - 數值缺失（笛卡爾或關節只缺一組時以正/逆解補齊）
+    - 關節限位、笛卡爾安全範圍、關節角度與笛卡爾座標不一致
+
+CSV 欄位: name,x,y,z,r,j1,j2,j3,j4（關節或笛卡爾欄位可留空）
+
+用法:
+    table = load_table('pallet.csv', hand=HAND_RIGHT)
+    issues = validate_table(table, existing_names=[p['name'] for p in store])
+    if not any(issue.severity == SEVERITY_ERROR for issue in issues):
+        store.add_many(table_to_points(table))
+"""
+import os
+import csv
+from collections import namedtuple
+import numpy as np
+import kinematics
+from kinematics import HAND_RIGHT, JOINT_LIMITS
+
+CARTESIAN_KEYS = ('x', 'y', 'z', 'r')
+JOINT_KEYS = ('j1', 'j2', 'j3', 'j4')
+CSV_HEADER = ('name',) + CARTESIAN_KEYS + JOINT_KEYS
+
+# 與 PointDataValidator.validate_cartesian_range 相同的安全範圍 (最小, 最大)
+CARTESIAN_RANGE = np.array([[-800.0, 800.0], [-800.0, 800.0], [50.0, 600.0], [-180.0, 180.0]])
+
+SEVERITY_ERROR = 'error'
+SEVERITY_WARNING = 'warning'
+
+# names: (N,) 字串陣列；cartesian / joint: (N, 4) 浮點陣列（缺失為NaN）
+PointTable = namedtuple('PointTable', ['names', 'cartesian', 'joint'])
+
+# row: 列索引；severity: 'error' 阻止匯入、'warning' 僅提示；message: 說明文字
+ImportIssue = namedtuple('ImportIssue', ['row', 'severity', 'message'])
+
+
+def points_to_table(points):
+    """點位字典列表 -> PointTable"""
+    points = list(points)
+    names = np.array([point['name'] for point in points], dtype=str)
+    cartesian = np.array([[point['cartesian'].get(key, np.nan) for key in CARTESIAN_KEYS] for point in points],
+                         dtype=np.float64).reshape(-1, 4)
+    joint = np.array([[point['joint'].get(key, np.nan) for key in JOINT_KEYS] for point in points],
+                     dtype=np.float64).reshape(-1, 4)
+    return PointTable(names, cartesian, joint)
+
+
+def table_to_points(table):
+    """PointTable -> 可傳給 PointStore.add_many 的點位字典列表"""
+    cartesian = table.cartesian.tolist()
+    joint = table.joint.tolist()
+    return [{'name': str(name), 'cartesian': dict(zip(CARTESIAN_KEYS, c)), 'joint': dict(zip(JOINT_KEYS, j))}
+            for name, c, j in zip(table.names, cartesian, joint)]
+
+
+# ==================== 讀寫 ====================
+
+def save_npz(path, table):
+    np.savez_compressed(path, names=table.names, cartesian=table.cartesian, joint=table.joint)
+
+
+def load_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        count = len(data['names'])
+        cartesian = data['cartesian'] if 'cartesian' in data else np.full((count, 4), np.nan)
+        joint = data['joint'] if 'joint' in data else np.full((count, 4), np.nan)
+        return PointTable(np.char.strip(data['names'].astype(str)), cartesian.astype(np.float64),
+                          joint.astype(np.float64))
+
+
+def save_csv(path, table):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        values = np.hstack([table.cartesian, table.joint])
+        for name, row in zip(table.names, values.tolist()):
+            writer.writerow([name] + ['' if np.isnan(v) else repr(v) for v in row])
+
+
+def load_csv(path):
+    """讀取CSV，欄位順序依標題列，空白或無法解析的數值為NaN"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return PointTable(np.array([], dtype=str), np.empty((0, 4)), np.empty((0, 4)))
+
+    header = [column.strip().lower() for column in rows[0]]
+    if 'name' not in header:
+        raise ValueError("CSV缺少 name 欄位")
+    body = [row + [''] * (len(header) - len(row)) for row in rows[1:] if any(cell.strip() for cell in row)]
+    columns = list(zip(*body)) if body else [()] * len(header)
+
+    def numeric(key):
+        if key not in header:
+            return np.full(len(body), np.nan)
+        text = np.array(columns[header.index(key)], dtype=object)
+        text[np.array([not str(cell).strip() for cell in text], dtype=bool)] = 'nan'
+        try:
+            return text.astype(np.float64)
+        except ValueError:
+            return np.array([_to_float(cell) for cell in text])
+
+    names = np.array([str(name).strip() for name in columns[header.index('name')]], dtype=str)
+    cartesian = np.column_stack([numeric(key) for key in CARTESIAN_KEYS]).reshape(-1, 4)
+    joint = np.column_stack([numeric(key) for key in JOINT_KEYS]).reshape(-1, 4)
+    return PointTable(names, cartesian, joint)
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def load_table(path, hand=HAND_RIGHT):
+    """依副檔名讀取 .npz 或 .csv，並以正/逆解補齊只缺一組的座標"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npz':
+        table = load_npz(path)
+    elif extension == '.csv':
+        table = load_csv(path)
+    else:
+        raise ValueError(f"不支援的檔案格式: {extension}")
+    return complete_table(table, hand)
+
+
+def save_table(path, table):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npz':
+        save_npz(path, table)
+    elif extension == '.csv':
+        save_csv(path, table)
+    else:
+        raise ValueError(f"不支援的檔案格式: {extension}")
+
+
+def complete_table(table, hand=HAND_RIGHT):
+    """
+    只有關節角度的列以正解補上笛卡爾座標，只有笛卡爾座標的列以逆解補上關節角度
+    名稱去除前後空白（與 PointStore 寫入時相同），驗證的名稱即為實際寫入的名稱
+    """
+    cartesian = table.cartesian.copy()
+    joint = table.joint.copy()
+    has_cartesian = ~np.isnan(cartesian).any(axis=1)
+    has_joint = ~np.isnan(joint).any(axis=1)
+
+    need_cartesian = has_joint & ~has_cartesian
+    cartesian[need_cartesian] = kinematics.forward_kinematics(joint[need_cartesian])
+    need_joint = has_cartesian & ~has_joint
+    joint[need_joint] = kinematics.inverse_kinematics(cartesian[need_joint], hand)
+    return PointTable(np.char.strip(np.asarray(table.names, dtype=str)), cartesian, joint)
+
+
+# ==================== 驗證 ====================
+
+def validate_table(table, existing_names=(), consistency_tolerance=1.0):
+    """
+    一次檢查全部列
+    existing_names: 已存在的點位名稱（匯入時不可重複）
+    consistency_tolerance: 關節正解與笛卡爾座標允許的差距 (mm)
+    回傳 ImportIssue 列表，依列索引排序
+    """
+    names = table.names
+    cartesian = table.cartesian
+    joint = table.joint
+    issues = []
+
+    def report(mask, severity, message):
+        for row in np.flatnonzero(mask):
+            issues.append(ImportIssue(int(row), severity, message(int(row))))
+
+    # 名稱
+    report(np.char.str_len(np.char.strip(names)) == 0 if len(names) else np.zeros(0, dtype=bool),
+           SEVERITY_ERROR, lambda row: "名稱空白")
+    unique, first, counts = np.unique(names, return_index=True, return_counts=True)
+    duplicated = np.isin(names, unique[counts > 1])
+    duplicated[first[counts > 1]] = False
+    report(duplicated, SEVERITY_ERROR, lambda row: f"名稱 '{names[row]}' 在檔案中重複")
+    if len(existing_names):
+        report(np.isin(names, np.array(list(existing_names), dtype=str)), SEVERITY_ERROR,
+               lambda row: f"名稱 '{names[row]}' 與現有點位重複")
+
+    # 缺失與限位
+    missing_cartesian = np.isnan(cartesian).any(axis=1)
+    missing_joint = np.isnan(joint).any(axis=1)
+    report(missing_cartesian & missing_joint, SEVERITY_ERROR, lambda row: "缺少座標數據")
+    report(missing_joint & ~missing_cartesian, SEVERITY_ERROR, lambda row: "笛卡爾座標逆解無解（超出工作空間）")
+
+    valid_joint = ~missing_joint
+    violations = np.zeros_like(joint, dtype=bool)
+    violations[valid_joint] = kinematics.limit_violations(joint[valid_joint])
+    report(violations.any(axis=1), SEVERITY_ERROR, lambda row: "關節超出限位: " + ', '.join(
+        f"J{axis + 1}={joint[row, axis]:.2f} ({JOINT_LIMITS[axis, 0]:.0f}~{JOINT_LIMITS[axis, 1]:.0f})"
+        for axis in np.flatnonzero(violations[row])))
+
+    # 笛卡爾安全範圍（與逐點驗證相同，只提示）
+    out_of_range = ~missing_cartesian[:, None] & ((cartesian < CARTESIAN_RANGE[:, 0]) | (cartesian > CARTESIAN_RANGE[:, 1]))
+    report(out_of_range.any(axis=1), SEVERITY_WARNING, lambda row: "座標超出建議範圍: " + ', '.join(
+        f"{CARTESIAN_KEYS[axis].upper()}={cartesian[row, axis]:.2f}" for axis in np.flatnonzero(out_of_range[row])))
+
+    # 關節與笛卡爾一致性
+    both = ~missing_cartesian & ~missing_joint
+    mismatch = np.zeros(len(names), dtype=bool)
+    if both.any():
+        computed = kinematics.forward_kinematics(joint[both])
+        mismatch[both] = np.linalg.norm(computed[:, :3] - cartesian[both, :3], axis=1) > consistency_tolerance
+    report(mismatch, SEVERITY_WARNING, lambda row: "關節角度與笛卡爾座標不一致，執行MovJ/MovL與JointMovJ會到達不同位置")
+
+    issues.sort(key=lambda issue: issue.row)
+    return issues
@@ -0,0 +1,186 @@
+"""
+點位執行順序最佳化
+
+以關節空間的運動時間（各軸同步，最慢軸決定時間）作為兩點之間的成本，
+先以最近鄰建立初始路線，再以 2-opt 與 Or-opt 反覆改善，可固定起點與終點；
+所有移動的改善量以 NumPy 整列計算，數百個點位可在一秒內完成
+
+用法:
+    order, seconds = optimize_order(joints, start_joints=current_joints, end=0)
+"""
+import time
+import numpy as np
+from cycle_time import MotionModel, MotionSettings, profile_time, _ratio
+
+
+def travel_time_matrix(joints, model=None, settings=MotionSettings(), speed=None):
+    """
+    兩兩點位之間的關節運動時間矩陣
+    joints: (N, 4) 關節角度
+    speed: 關節速度比例，None 時使用 settings.speed_j
+    回傳 (N, N) 陣列（秒）
+    """
+    model = model or MotionModel()
+    joints = np.asarray(joints, dtype=np.float64)[:, :4]
+    speed = settings.speed_j if speed is None else speed
+    v = model.joint_max_speed * _ratio(settings.speed_factor, speed)
+    a = model.joint_max_acc * _ratio(settings.speed_factor, settings.acc_j)
+    distance = joints[:, None, :] - joints[None, :, :]
+    total, _ = profile_time(distance, v, a, model.joint_max_jerk)
+    return total.max(axis=2)
+
+
+def route_time(order, matrix):
+    """路線總時間"""
+    order = np.asarray(order)
+    if order.size < 2:
+        return 0.0
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def _nearest_neighbour(matrix, start, end, nodes):
+    """從起點開始每次走向最近的未拜訪點，固定終點留到最後"""
+    route = [start]
+    remaining = np.ones(len(matrix), dtype=bool)
+    remaining[start] = False
+    if end is not None:
+        remaining[end] = False
+    remaining &= nodes
+    while remaining.any():
+        candidates = np.flatnonzero(remaining)
+        current = candidates[np.argmin(matrix[route[-1], candidates])]
+        route.append(int(current))
+        remaining[current] = False
+    if end is not None and end != start:
+        route.append(end)
+    return np.array(route)
+
+
+def _two_opt(route, matrix, open_end, deadline):
+    """2-opt: 反轉 route[i..j]，首點固定；open_end 為True時末點可以移動"""
+    n = len(route)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            last = n if open_end else n - 1
+            j = np.arange(i + 1, last)
+            if j.size == 0:
+                continue
+            c = route[j]
+            delta = matrix[a, c] - matrix[a, b]
+            # 反轉到末尾時沒有後續邊
+            has_next = j + 1 < n
+            e = route[np.minimum(j + 1, n - 1)]
+            delta = delta + np.where(has_next, matrix[b, e] - matrix[c, e], 0.0)
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                route[i:j[best] + 1] = route[i:j[best] + 1][::-1].copy()
+                improved = True
+    return route
+
+
+def _or_opt(route, matrix, open_end, deadline, max_length=3):
+    """Or-opt: 將長度1~3的連續片段移到其他位置（可反向插入），首點固定"""
+    n = len(route)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for length in range(1, max_length + 1):
+            last = n if open_end else n - 1
+            for i in range(1, last - length + 1):
+                segment = route[i:i + length]
+                prev, first, tail = route[i - 1], segment[0], segment[-1]
+                after = route[i + length] if i + length < n else None
+
+                # 移除片段節省的時間
+                removed = matrix[prev, first]
+                if after is not None:
+                    removed += matrix[tail, after] - matrix[prev, after]
+
+                rest = np.concatenate([route[:i], route[i + length:]])
+                # 插入到 rest[k] 與 rest[k+1] 之間（k+1 == len(rest) 表示接在末尾）
+                k = np.arange(0, len(rest) if open_end else len(rest) - 1)
+                left = rest[k]
+                has_right = k + 1 < len(rest)
+                right = rest[np.minimum(k + 1, len(rest) - 1)]
+                base = np.where(has_right, matrix[left, right], 0.0)
+                forward = matrix[left, first] + np.where(has_right, matrix[tail, right], 0.0) - base
+                backward = matrix[left, tail] + np.where(has_right, matrix[first, right], 0.0) - base
+                cost = np.minimum(forward, backward)
+                # 插回原位置不算改善
+                cost[k == i - 1] = np.inf
+
+                best = int(np.argmin(cost))
+                if cost[best] - removed < -1e-9:
+                    piece = segment if forward[best] <= backward[best] else segment[::-1]
+                    route = np.concatenate([rest[:best + 1], piece, rest[best + 1:]])
+                    improved = True
+                    break
+            if improved:
+                break
+    return route
+
+
+def optimize_order(joints, start=None, end=None, start_joints=None, model=None, settings=MotionSettings(),
+                   time_limit=0.5):
+    """
+    最佳化點位拜訪順序
+    joints: (N, 4) 各點位的關節角度
+    start / end: 固定為第一個 / 最後一個拜訪的點位索引，None 表示不固定
+    start_joints: 機械臂目前的關節角度；提供時路線由目前位置出發（不包含在回傳的順序中）
+    time_limit: 改善階段的時間上限（秒）
+    回傳 (點位索引順序, 預估總移動時間)
+    """
+    joints = np.asarray(joints, dtype=np.float64)[:, :4]
+    count = len(joints)
+    if count == 0:
+        return [], 0.0
+
+    # 以虛擬節點表示目前位置，作為固定起點
+    virtual = start_joints is not None
+    if virtual:
+        nodes = np.vstack([joints, np.asarray(start_joints, dtype=np.float64)[:4]])
+    else:
+        nodes = joints
+    matrix = travel_time_matrix(nodes, model, settings)
+
+    origin = count if virtual else start
+    if virtual and start is not None:
+        # 目前位置之後必須先到固定起點：以固定起點作為路線首點
+        origin = start
+    members = np.ones(len(nodes), dtype=bool)
+    if virtual:
+        members[count] = False
+
+    # 只固定終點時，2-opt/Or-opt 固定首點會使起點無法改善；
+    # 時間矩陣對稱，改以終點為首點求開放終點的路線，最後再反向
+    reverse = origin is None and end is not None
+    if reverse:
+        origin, end = end, None
+
+    if origin is None:
+        # 不固定起點時，從最偏遠的幾個點出發各建立一次最近鄰路線，取最短者
+        remote = np.argsort(-matrix.sum(axis=1))
+        starts = [int(s) for s in remote[:8]]
+        route = min((_nearest_neighbour(matrix, s, None, members) for s in starts),
+                    key=lambda r: route_time(r, matrix))
+    else:
+        route = _nearest_neighbour(matrix, origin, end, members)
+
+    deadline = time.monotonic() + time_limit
+    open_end = end is None
+    # 不固定起點時，以反向路線再改善一次讓起點也能變動
+    for _ in range(2):
+        route = _two_opt(route, matrix, open_end, deadline)
+        route = _or_opt(route, matrix, open_end, deadline)
+        if origin is not None:
+            break
+        route = route[::-1].copy()
+    if reverse:
+        route = route[::-1]
+
+    order = [int(node) for node in route if node < count]
+    full = ([count] if virtual else []) + order
+    return order, route_time(full, matrix)
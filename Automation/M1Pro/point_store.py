@@ -0,0 +1,270 @@
+"""
+SQLite 點位資料庫
+
+取代每次修改都整個重寫 robot_points.json 的方式:
+    - 每個點位有穩定的主鍵 id，刪除或重新排序時不會重新編號
+    - 名稱唯一索引，依名稱查詢不需掃描全部點位
+    - (x, y) 索引，可快速查詢矩形範圍內的點位
+    - 新增/修改/刪除只寫入相關的列，每次修改都在交易中完成（WAL 模式，斷電不會損毀檔案）
+    - 第一次存取點位時才從資料庫載入
+
+PointStore 可當作唯讀列表使用（len、索引、迭代），列表順序為 position 欄位；
+position 只表示先後、可以不連續（刪除不重新編號），列表索引為依 position 排序的名次，只有 reorder 會重新編號；
+資料庫不存在而舊的 JSON 檔存在時，建立資料庫後自動匯入舊的點位，匯入後 JSON 檔更名為
+robot_points.json.migrated（保留內容），之後即使刪除全部點位也不會再次匯入
+
+用法:
+    store = PointStore('saved_points/robot_points.db', legacy_json='saved_points/robot_points.json')
+    point = store.add('Pick', {'x': 300, 'y': 0, 'z': 100, 'r': 0}, {'j1': 0, 'j2': 30, 'j3': 100, 'j4': 0})
+    index = store.index_of('Pick')
+    store.delete(index)
+"""
+import os
+import json
+import sqlite3
+import threading
+from collections.abc import Sequence
+from datetime import datetime
+
+CARTESIAN_KEYS = ('x', 'y', 'z', 'r')
+JOINT_KEYS = ('j1', 'j2', 'j3', 'j4')
+COLUMNS = ('id', 'name', 'position') + CARTESIAN_KEYS + JOINT_KEYS + ('created_time', 'modified_time')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    x REAL NOT NULL, y REAL NOT NULL, z REAL NOT NULL, r REAL NOT NULL,
+    j1 REAL NOT NULL, j2 REAL NOT NULL, j3 REAL NOT NULL, j4 REAL NOT NULL,
+    created_time TEXT NOT NULL,
+    modified_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_points_position ON points(position);
+CREATE INDEX IF NOT EXISTS idx_points_xy ON points(x, y);
+"""
+
+
+class DuplicatePointName(ValueError):
+    """點位名稱已存在"""
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _row_to_point(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'cartesian': {key: row[3 + i] for i, key in enumerate(CARTESIAN_KEYS)},
+        'joint': {key: row[7 + i] for i, key in enumerate(JOINT_KEYS)},
+        'created_time': row[11],
+        'modified_time': row[12],
+    }
+
+
+def _point_values(point):
+    """點位字典 -> (x, y, z, r, j1, j2, j3, j4)，缺少或無效的數值視為0"""
+    cartesian = point.get('cartesian') or {}
+    joint = point.get('joint') or {}
+    return tuple(_float(cartesian.get(key, 0.0)) for key in CARTESIAN_KEYS) + \
+        tuple(_float(joint.get(key, 0.0)) for key in JOINT_KEYS)
+
+
+class PointStore(Sequence):
+    """以 SQLite 保存的點位列表"""
+
+    def __init__(self, db_path, legacy_json=None, log=None):
+        """
+        db_path: 資料庫檔案路徑
+        legacy_json: 舊版 robot_points.json，只在資料庫檔案新建立時匯入
+        log: 日誌函數
+        """
+        self.db_path = db_path
+        self.log = log or (lambda message: None)
+        self._points = None
+        self._lock = threading.RLock()
+
+        created = not os.path.exists(db_path)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        if created and legacy_json and os.path.exists(legacy_json):
+            self._import_json(legacy_json)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ==================== 唯讀列表介面 ====================
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def _loaded(self):
+        """第一次存取時才從資料庫載入全部點位"""
+        with self._lock:
+            if self._points is None:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM points ORDER BY position, id").fetchall()
+                self._points = [_row_to_point(row) for row in rows]
+            return self._points
+
+    def __len__(self):
+        with self._lock:
+            if self._points is None:
+                return self._count()
+            return len(self._points)
+
+    def __getitem__(self, index):
+        return self._loaded()[index]
+
+    def __iter__(self):
+        return iter(list(self._loaded()))
+
+    def reload(self):
+        """捨棄快取，下次存取時重新載入"""
+        with self._lock:
+            self._points = None
+
+    # ==================== 查詢 ====================
+
+    def index_of(self, name):
+        """依名稱查詢列表索引（使用名稱唯一索引），不存在時回傳None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM points AS q WHERE q.position < p.position) "
+                "FROM points AS p WHERE p.name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def indices_in_box(self, x_min, x_max, y_min, y_max):
+        """查詢XY矩形範圍內的點位索引（使用 (x, y) 索引）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM points AS q WHERE q.position < p.position) "
+                "FROM points AS p WHERE p.x BETWEEN ? AND ? AND p.y BETWEEN ? AND ? ORDER BY p.position",
+                (x_min, x_max, y_min, y_max)).fetchall()
+        return [row[0] for row in rows]
+
+    # ==================== 修改（每次一個交易） ====================
+
+    def add(self, name, cartesian, joint):
+        """新增點位到列表末尾，名稱重複時拋出 DuplicatePointName，回傳新點位字典"""
+        return self.add_many([{'name': name, 'cartesian': cartesian, 'joint': joint}])[0]
+
+    def add_many(self, points):
+        """在同一個交易中新增多個點位到列表末尾，任一名稱重複時全部不寫入"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            start = self._conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM points").fetchone()[0]
+            rows = []
+            for offset, point in enumerate(points):
+                rows.append((point['name'].strip(), start + offset) + _point_values(point) +
+                            (point.get('created_time') or now, point.get('modified_time') or now))
+            try:
+                with self._conn:
+                    ids = [self._conn.execute(
+                        f"INSERT INTO points ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})",
+                        row).lastrowid for row in rows]
+            except sqlite3.IntegrityError as e:
+                raise DuplicatePointName(f"點位名稱已存在: {e}") from e
+            added = [_row_to_point((point_id,) + row) for point_id, row in zip(ids, rows)]
+            # 尚未載入時不需要更新快取
+            if self._points is not None:
+                self._points.extend(added)
+            return added
+
+    def update(self, index, point_data):
+        """更新單一點位（依索引），回傳更新後的點位字典"""
+        return self.update_many([index], [point_data])[0]
+
+    def update_many(self, indices, points_data):
+        """在同一個交易中更新多個點位（依索引），任一失敗時全部不寫入，回傳更新後的點位字典列表"""
+        with self._lock:
+            points_cache = self._loaded()
+            modified = datetime.now().isoformat()
+            updated = []
+            for index, point_data in zip(indices, points_data):
+                current = points_cache[index]
+                values = _point_values(point_data)
+                updated.append({
+                    'id': current['id'],
+                    'name': point_data.get('name', current['name']).strip(),
+                    'cartesian': dict(zip(CARTESIAN_KEYS, values[:4])),
+                    'joint': dict(zip(JOINT_KEYS, values[4:])),
+                    'created_time': current['created_time'],
+                    'modified_time': modified,
+                })
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE points SET name = ?, x = ?, y = ?, z = ?, r = ?, j1 = ?, j2 = ?, j3 = ?, j4 = ?, "
+                        "modified_time = ? WHERE id = ?",
+                        [(point['name'],) + _point_values(point) + (modified, point['id']) for point in updated])
+            except sqlite3.IntegrityError as e:
+                raise DuplicatePointName(f"點位名稱已存在: {e}") from e
+            for index, point in zip(indices, updated):
+                points_cache[index] = point
+            return updated
+
+    def delete(self, index):
+        """刪除單一點位（只刪除該列，其他點位的 id 與 position 不變），回傳被刪除的點位字典"""
+        with self._lock:
+            points_cache = self._loaded()
+            point = points_cache[index]
+            with self._conn:
+                self._conn.execute("DELETE FROM points WHERE id = ?", (point['id'],))
+            del points_cache[index]
+            return point
+
+    def reorder(self, order):
+        """依索引順序重新排列（只更新 position，id 不變）"""
+        with self._lock:
+            points_cache = self._loaded()
+            if sorted(order) != list(range(len(points_cache))):
+                raise ValueError("點位順序無效，必須包含所有點位")
+            reordered = [points_cache[i] for i in order]
+            with self._conn:
+                self._conn.executemany("UPDATE points SET position = ? WHERE id = ?",
+                                       [(position, point['id']) for position, point in enumerate(reordered)])
+            self._points = reordered
+
+    # ==================== 舊版 JSON 匯入 ====================
+
+    def _import_json(self, path):
+        """匯入舊版 robot_points.json，修正缺少的欄位，重複名稱加上編號"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except Exception as e:
+            self.log(f"讀取舊版點位檔案失敗: {str(e)}")
+            return
+
+        points = []
+        names = set()
+        for i, point in enumerate(loaded):
+            if not isinstance(point, dict):
+                self.log(f"跳過無效點位數據: {point}")
+                continue
+            name = str(point.get('name') or f"Point_{i}").strip()
+            unique = name
+            suffix = 2
+            while unique in names:
+                unique = f"{name}_{suffix}"
+                suffix += 1
+            names.add(unique)
+            points.append(dict(point, name=unique))
+
+        self.add_many(points)
+        self.log(f"已從 {os.path.basename(path)} 匯入 {len(points)} 個點位到資料庫")
+        # 標記為已匯入，避免其他程式誤以為仍是目前的點位檔
+        try:
+            os.replace(path, path + '.migrated')
+        except OSError as e:
+            self.log(f"舊版點位檔案更名失敗: {str(e)}")
@@ -0,0 +1,169 @@
+"""
+運動序列預檢
+
+在發送到30003端口之前，以本地整批逆解預測控制器會回報的運動告警:
+    22 - 直線運動起點的手系與目前手系設定不同（需要手勢切換）
+    23 - 直線運動路徑上的取樣點超出工作空間
+    32 - 路徑或目標點接近奇異位置（J2 接近 0，手臂完全伸直）
+    33 - 關節運動目標點逆解無解
+    34 - 目標點或路徑上的取樣點超出關節限位
+所有直線路徑的取樣點合併成一批計算，整個程式只需一次逆解呼叫
+
+用法:
+    issues = validate_sequence(steps, start_joints=current_joints, hand=HAND_RIGHT)
+    for issue in issues:
+        print(issue.step_index, issue.error_id, issue.message)
+"""
+from collections import namedtuple
+import numpy as np
+import kinematics
+from kinematics import HAND_RIGHT
+from alarm_catalog import get_alarm_catalog
+
+ERROR_HAND_SWITCH = 22
+ERROR_LINEAR_WORKSPACE = 23
+ERROR_SINGULARITY = 32
+ERROR_IK_NO_SOLUTION = 33
+ERROR_IK_LIMIT = 34
+
+JOINT_NAMES = ('J1', 'J2', 'J3', 'J4')
+
+# step_index: 序列中的段索引；error_id: 預測的控制器告警代碼；
+# position: 出錯位置 [x, y, z, r]（可能為None）；message: 說明文字
+PreflightIssue = namedtuple('PreflightIssue', ['step_index', 'error_id', 'position', 'message'])
+
+
+def _step_target(step):
+    cartesian = step.point['cartesian']
+    return [cartesian['x'], cartesian['y'], cartesian['z'], cartesian['r']]
+
+
+def _step_joints(step):
+    joint = step.point.get('joint') or {}
+    return [joint.get(key, np.nan) for key in ('j1', 'j2', 'j3', 'j4')]
+
+
+def _describe(error_id, detail):
+    """告警說明加上預檢細節"""
+    text = get_alarm_catalog().describe(error_id, 'controller') or f"錯誤 {error_id}"
+    return f"{text}（{detail}）"
+
+
+def _violated_axes(joints):
+    """回傳超出限位的關節名稱，例如 'J1, J4'"""
+    mask = kinematics.limit_violations(joints)
+    return ', '.join(name for name, bad in zip(JOINT_NAMES, mask) if bad)
+
+
+def plan_joints(steps, hand=HAND_RIGHT):
+    """
+    計算序列每段的目標笛卡爾座標與終點關節角度
+    JointMovJ 使用保存的關節角度，其餘以手系設定逆解（無解為NaN）
+    回傳 (targets, end_joints, is_joint)，皆為以段為列的陣列
+    """
+    kinds = [step.motion_type for step in steps]
+    targets = np.array([_step_target(step) for step in steps], dtype=np.float64).reshape(-1, 4)
+    saved_joints = np.array([_step_joints(step) for step in steps], dtype=np.float64).reshape(-1, 4)
+    is_joint = np.array([kind == 'JointMovJ' for kind in kinds], dtype=bool)
+
+    end_joints = kinematics.inverse_kinematics(targets, hand)
+    end_joints[is_joint] = saved_joints[is_joint]
+    targets[is_joint] = kinematics.forward_kinematics(saved_joints[is_joint])
+    return targets, end_joints, is_joint
+
+
+def validate_sequence(steps, start_joints=None, hand=HAND_RIGHT, sample_step=2.0, singular_margin=2.0):
+    """
+    預檢運動序列
+    steps: SequenceStep 列表（只使用 point 與 motion_type）
+    start_joints: 序列開始時的關節角度；為None時第一段直線運動只檢查目標點
+    hand: 控制器的手系設定（SetArmOrientation），MovJ/MovL 以此手系求解
+    sample_step: 直線路徑取樣間距 (mm)
+    singular_margin: |J2| 小於此角度 (度) 視為接近奇異
+    回傳 PreflightIssue 列表，依段索引排序；空列表表示預期不會產生運動告警
+    """
+    count = len(steps)
+    if count == 0:
+        return []
+
+    kinds = [step.motion_type for step in steps]
+    targets, end_joints, is_joint = plan_joints(steps, hand)
+
+    # 每段的起點關節為上一段終點
+    start = np.full((count, 4), np.nan)
+    if start_joints is not None:
+        start[0] = np.asarray(start_joints, dtype=np.float64)[:4]
+    start[1:] = end_joints[:-1]
+
+    issues = {}
+
+    def report(index, error_id, position, detail):
+        if index not in issues:
+            position = None if position is None else [float(v) for v in position]
+            issues[index] = PreflightIssue(index, error_id, position, _describe(error_id, detail))
+
+    # ---------- 目標點檢查（只對有問題的段逐一產生說明） ----------
+    violations = kinematics.limit_violations(end_joints)
+    missing = np.isnan(end_joints).any(axis=1)
+    singular = ~is_joint & (np.abs(end_joints[:, 1]) < singular_margin)
+    for index in np.flatnonzero(violations.any(axis=1) | singular):
+        index = int(index)
+        kind = kinds[index]
+        if missing[index]:
+            if kind == 'JointMovJ':
+                report(index, ERROR_IK_LIMIT, None, "點位缺少關節數據")
+            elif kind == 'MovJ':
+                report(index, ERROR_IK_NO_SOLUTION, targets[index], "目標點超出工作空間")
+            else:
+                report(index, ERROR_LINEAR_WORKSPACE, targets[index], "目標點超出工作空間")
+        elif violations[index].any():
+            detail = f"目標點 {_violated_axes(end_joints[index])} 超出限位"
+            if kind != 'JointMovJ':
+                other = kinematics.inverse_kinematics(targets[index], 1 - hand)
+                if kinematics.within_limits(other):
+                    detail += "，另一手系可到達，請改用JointMovJ"
+            report(index, ERROR_IK_LIMIT, targets[index], detail)
+        elif singular[index]:
+            report(index, ERROR_SINGULARITY, targets[index], f"目標點J2={end_joints[index, 1]:.2f}°，手臂接近完全伸直")
+
+    # ---------- 直線路徑檢查 ----------
+    is_linear = np.array([kind == 'MovL' for kind in kinds]) & ~np.isnan(start).any(axis=1)
+    is_linear[list(issues)] = False
+
+    switch = is_linear & (kinematics.hand_of(start) != hand) & (np.abs(start[:, 1]) >= singular_margin)
+    for index in np.flatnonzero(switch):
+        report(int(index), ERROR_HAND_SWITCH, kinematics.forward_kinematics(start[index]),
+               "起點手系與目前手系設定不同，直線運動需要切換手系，請改用MovJ或JointMovJ")
+    linear = np.flatnonzero(is_linear & ~switch)
+
+    if linear.size:
+        start_poses = kinematics.forward_kinematics(start[linear])
+        end_poses = targets[linear]
+        distances = np.linalg.norm(end_poses[:, :3] - start_poses[:, :3], axis=1)
+        sample_counts = np.maximum(np.ceil(distances / sample_step).astype(int), 1)
+
+        # 所有路徑的取樣點合併成一批: 每段取 (0, 1] 區間內的 n 個點
+        segment = np.repeat(np.arange(len(linear)), sample_counts)
+        offsets = np.arange(segment.size) - np.repeat(np.cumsum(sample_counts) - sample_counts, sample_counts)
+        fraction = (offsets + 1) / sample_counts[segment]
+        samples = start_poses[segment] + (end_poses[segment] - start_poses[segment]) * fraction[:, None]
+
+        joints = kinematics.inverse_kinematics(samples, hand)
+        no_solution = np.isnan(joints[:, 0])
+        near_singular = ~no_solution & (np.abs(joints[:, 1]) < singular_margin)
+        out_of_limit = ~no_solution & ~kinematics.within_limits(joints)
+        bad = no_solution | near_singular | out_of_limit
+
+        for sample in np.flatnonzero(bad):
+            index = int(linear[segment[sample]])
+            if index in issues:
+                continue
+            detail = f"路徑 {fraction[sample] * 100:.0f}% 處"
+            if no_solution[sample]:
+                report(index, ERROR_LINEAR_WORKSPACE, samples[sample], detail + "超出工作空間")
+            elif near_singular[sample]:
+                report(index, ERROR_SINGULARITY, samples[sample], detail + f"J2={joints[sample, 1]:.2f}°，接近奇異位置")
+            else:
+                report(index, ERROR_IK_LIMIT, samples[sample], detail + f"{_violated_axes(joints[sample])} 超出限位")
+
+    return [issues[index] for index in sorted(issues)]
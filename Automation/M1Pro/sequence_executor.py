@@ -0,0 +1,272 @@
+"""
+連續點位序列執行器
+
+將多段運動提前送入控制器運動隊列（有界預送數量），配合CP平滑過渡，
+由實時反饋判斷每段的完成進度，不再於每個點位之間呼叫阻塞的 Sync()
+
+用法:
+    steps = [SequenceStep(points[0], 'MovJ', 50, 0),
+             SequenceStep(points[1], 'MovL', 30, 50),
+             SequenceStep(points[2], 'MovL', 30, 0)]
+    executor = SequenceExecutor(client_move, steps, lookahead=4)
+    executor.start()
+    # 反饋線程每幀呼叫 executor.update(feedback_data)
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from dobot_api import parse_reply
+from error_monitor import ROBOT_MODE_ERROR
+
+ROBOT_MODE_ENABLE = 5
+ROBOT_MODE_RUNNING = 7
+ROBOT_MODE_PAUSE = 10
+
+MOTION_TYPES = ('MovJ', 'MovL', 'JointMovJ')
+
+# point: saved_points 中的點位字典；motion_type: 'MovJ'/'MovL'/'JointMovJ'；
+# speed: 該段速度比例(1~100)；cp: 平滑過渡比例(0~100)，0表示在該點停止；
+# acc: 該段加速度比例(1~100)，None表示使用全局 AccJ/AccL 設定
+SequenceStep = namedtuple('SequenceStep', ['point', 'motion_type', 'speed', 'cp', 'acc'], defaults=(None,))
+
+
+def normalize_motion_type(text):
+    """
+    將介面上的運動類型文字轉為指令名稱，例如 '直線運動(MovL) - ...' -> 'MovL'
+    'Jump' 需先以 arch_motion.expand_jumps 展開才能送入執行器
+    """
+    if 'Jump' in text:
+        return 'Jump'
+    if 'JointMovJ' in text:
+        return 'JointMovJ'
+    if 'MovL' in text:
+        return 'MovL'
+    if 'MovJ' in text:
+        return 'MovJ'
+    return None
+
+
+class SequenceExecutor:
+    """
+    序列執行器
+    發送線程保持最多 lookahead 段「已發送但未完成」的運動在控制器隊列中；
+    反饋線程呼叫 update() 以實際位置推進完成進度:
+        - 進入目標點 tolerance 範圍內視為完成
+        - 有CP過渡的中間點，進入 blend_tolerance 範圍後距離開始增加即視為已通過
+        - 機械臂由運行狀態回到使能狀態時，表示隊列已執行完畢:
+          只有觀察到運行狀態當時已發送的段視為完成，之後才發送的段要等下一次運行狀態
+    """
+
+    def __init__(self, client_move, steps, lookahead=4, tolerance=1.0, blend_tolerance=20.0,
+                 stall_timeout=30.0, on_progress=None, on_finished=None, log=None):
+        """
+        client_move: DobotApiMove 連線
+        steps: SequenceStep 列表
+        lookahead: 控制器隊列中最多預送的段數
+        tolerance: 到位判定距離 (mm，R軸為度)
+        blend_tolerance: CP過渡點的通過判定距離 (mm)
+        stall_timeout: 超過此秒數沒有任何進度時中止（暫停狀態不計）
+        on_progress: 每完成一段呼叫 on_progress(completed, total)
+        on_finished: 結束時呼叫 on_finished(success, message)
+        log: 日誌函數
+        """
+        for step in steps:
+            if step.motion_type not in MOTION_TYPES:
+                raise ValueError(f"未知的運動類型: {step.motion_type}")
+        self.client_move = client_move
+        self.steps = list(steps)
+        self.lookahead = max(int(lookahead), 1)
+        self.tolerance = tolerance
+        self.blend_tolerance = blend_tolerance
+        self.stall_timeout = stall_timeout
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.log = log or (lambda message: None)
+
+        self.sent = 0
+        self.completed = 0
+        self.state = 'idle'
+        self.message = ''
+
+        self._targets = [self._target(step.point) for step in self.steps]
+        self._min_distance = math.inf
+        # 最近一次觀察到運行狀態時確認已送入隊列的段數；反饋可能比發送回應延遲，
+        # 運行狀態只確認前一幀處理時已發送的段
+        self._running_sent = 0
+        self._frame_sent = 0
+        self._last_progress = time.monotonic()
+        self._cond = threading.Condition()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def total(self):
+        return len(self.steps)
+
+    @property
+    def running(self):
+        return self.state == 'running'
+
+    @staticmethod
+    def _target(point):
+        cartesian = point['cartesian']
+        return (cartesian['x'], cartesian['y'], cartesian['z'], cartesian['r'])
+
+    def start(self):
+        if self.state != 'idle':
+            return
+        if not self.steps:
+            self.state = 'finished'
+            self._done.set()
+            return
+        self.state = 'running'
+        self._last_progress = time.monotonic()
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """停止發送後續運動（已送入控制器隊列的運動需另外以 ResetRobot 清除）"""
+        with self._cond:
+            if self.state == 'running':
+                self._set_result('stopped', "序列已停止")
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def wait(self, timeout=None):
+        """等待序列結束，成功完成時回傳True"""
+        self._done.wait(timeout)
+        return self.state == 'finished'
+
+    # ==================== 進度判斷（反饋線程） ====================
+
+    def update(self, feedback_data):
+        """由反饋線程每幀呼叫，只做位置比較，不進行任何通訊"""
+        mode = feedback_data['robot_mode']
+        pose = feedback_data['tool_vector_actual']
+        finished = None
+
+        with self._cond:
+            if self.state != 'running':
+                return
+            previous = self.completed
+
+            if mode == ROBOT_MODE_ERROR:
+                self._set_result('error', f"第 {self.completed + 1} 段運動時機械臂進入錯誤模式，序列中止")
+                finished = self.state
+            else:
+                if mode == ROBOT_MODE_RUNNING:
+                    self._running_sent = self._frame_sent
+                self._frame_sent = self.sent
+                self._advance(pose, mode)
+
+                # 運行中回到使能狀態：控制器隊列已清空，但只能確認運行狀態出現之前已發送的段；
+                # 剛發送、控制器尚未開始執行的段不因較早的運行狀態而被誤判完成
+                if mode == ROBOT_MODE_ENABLE and self.completed < self._running_sent:
+                    self.completed = self._running_sent
+                    self._min_distance = math.inf
+
+                if self.completed != previous or mode == ROBOT_MODE_PAUSE:
+                    self._last_progress = time.monotonic()
+                if self.completed == self.total:
+                    self._set_result('finished', f"序列執行完成，共 {self.total} 段")
+                    finished = self.state
+                if self.completed != previous or finished:
+                    self._cond.notify_all()
+
+            completed = self.completed
+
+        if completed != previous and self.on_progress:
+            self.on_progress(completed, self.total)
+        if finished:
+            self._notify_finished()
+
+    def _advance(self, pose, mode):
+        """依目前位置依序推進已發送段的完成進度"""
+        while self.completed < self.sent:
+            index = self.completed
+            target = self._targets[index]
+            distance = math.dist(pose[:3], target[:3])
+            last = index == self.total - 1
+
+            reached = distance <= self.tolerance and abs(pose[3] - target[3]) <= self.tolerance
+            if reached and last and mode == ROBOT_MODE_RUNNING:
+                # 最後一段需等待運動完全停止
+                return
+            if not reached and self.steps[index].cp > 0 and not last and distance <= self.blend_tolerance:
+                # 過渡點不會精確到位：距離經過最小值後開始增加即視為已通過
+                if distance > self._min_distance + self.tolerance:
+                    reached = True
+                else:
+                    self._min_distance = min(self._min_distance, distance)
+            if not reached:
+                return
+
+            self.completed += 1
+            self._min_distance = math.inf
+
+    # ==================== 發送線程 ====================
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while (self.state == 'running' and
+                       (self.sent >= self.total or self.sent - self.completed >= self.lookahead)):
+                    self._cond.wait(0.1)
+                    if (self.state == 'running' and self.stall_timeout and
+                            time.monotonic() - self._last_progress > self.stall_timeout):
+                        self._set_result('error', f"第 {self.completed + 1} 段運動超過 {self.stall_timeout:.0f}s 沒有進度，序列中止")
+                if self.state != 'running':
+                    break
+                index = self.sent
+
+            step = self.steps[index]
+            try:
+                result = self._send(step)
+                ok = parse_reply(result).ok
+            except Exception as e:
+                result = str(e)
+                ok = False
+
+            with self._cond:
+                if self.state != 'running':
+                    break
+                if not ok:
+                    self._set_result('error', f"第 {index + 1} 段 {step.motion_type} 到 '{step.point.get('name', index)}' 發送失敗: {result}")
+                    break
+                self.sent += 1
+
+        self._notify_finished()
+
+    def _send(self, step):
+        """將一段運動送入控制器隊列，回傳控制器回應"""
+        point = step.point
+        suffix = 'L' if step.motion_type == 'MovL' else 'J'
+        params = [f"Speed{suffix}={int(step.speed)}"]
+        if step.acc is not None:
+            params.append(f"Acc{suffix}={int(step.acc)}")
+        params.append(f"CP={int(step.cp)}")
+        if step.motion_type == 'JointMovJ':
+            joint = point['joint']
+            return self.client_move.JointMovJ(joint['j1'], joint['j2'], joint['j3'], joint['j4'], *params)
+        x, y, z, r = self._target(point)
+        if step.motion_type == 'MovL':
+            return self.client_move.MovL(x, y, z, r, *params)
+        return self.client_move.MovJ(x, y, z, r, *params)
+
+    def _set_result(self, state, message):
+        """設定結束狀態（呼叫時需持有 _cond）"""
+        self.state = state
+        self.message = message
+
+    def _notify_finished(self):
+        """只通知一次結束結果"""
+        with self._cond:
+            if self.state == 'running' or self._done.is_set():
+                return
+            self._done.set()
+            self._cond.notify_all()
+        self.log(self.message)
+        if self.on_finished:
+            self.on_finished(self.state == 'finished', self.message)
@@ -0,0 +1,138 @@
+"""
+控制器運動設定鏡像
+
+在本地記錄控制器已確認（回應ErrorID為0）的運動設定，
+設定值與鏡像相同時直接略過，不再發送阻塞的 Dashboard 往返指令；
+多項設定合併成一批: 先連續發送全部有變化的指令再讀取回覆（DobotApi.sendRecvMany），
+整批只需一次往返延遲，且同一項只發送最後的值
+
+重新連接、ResetRobot 或機械臂進入錯誤狀態後控制器設定可能已改變，需呼叫 invalidate()
+
+用法:
+    mirror = SettingsMirror()
+    mirror.apply(client_dash, speed_factor=50, speed_j=50, cp=0)
+    with mirror.batch(client_dash) as batch:
+        batch.set('speed_l', 80)
+        batch.set('acc_l', 60)
+"""
+import threading
+from contextlib import contextmanager
+from dobot_api import parse_reply
+
+# 設定名稱 -> Dashboard 方法名稱
+SETTING_COMMANDS = {
+    'speed_factor': 'SpeedFactor',
+    'speed_j': 'SpeedJ',
+    'speed_l': 'SpeedL',
+    'acc_j': 'AccJ',
+    'acc_l': 'AccL',
+    'cp': 'CP',
+    'user': 'User',
+    'tool': 'Tool',
+    'arm_orientation': 'SetArmOrientation',
+}
+
+# 告警、緊急停止或 ResetRobot 不會改變的設定（只有重新連接時失效）
+PERSISTENT_SETTINGS = ('arm_orientation',)
+
+
+class SettingsBatch:
+    """batch() 中收集的待發送設定，同一項後設定的值覆蓋先前的值；發送後 result 為 apply() 的回傳值"""
+
+    def __init__(self):
+        self.values = {}
+        self.result = (True, [])
+
+    def set(self, key, value):
+        if key not in SETTING_COMMANDS:
+            raise KeyError(f"未知的運動設定: {key}")
+        self.values[key] = int(value)
+
+
+class SettingsMirror:
+    """
+    已確認設定的鏡像
+    值為None表示未知（尚未設定或已失效），下次設定一定會發送
+    """
+
+    def __init__(self):
+        self._values = dict.fromkeys(SETTING_COMMANDS)
+        self._lock = threading.RLock()
+        self.sent = 0
+        self.skipped = 0
+
+    def get(self, key):
+        """已確認的設定值，未知時回傳None"""
+        return self._values[key]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def invalidate(self, key=None, keep=()):
+        """
+        使鏡像失效（key為None時全部失效）
+        keep: 全部失效時保留的設定，例如告警或 ResetRobot 不會改變的手系
+        """
+        with self._lock:
+            if key is None:
+                self._values = {name: self._values[name] if name in keep else None for name in SETTING_COMMANDS}
+            else:
+                self._values[key] = None
+
+    def pending(self, **values):
+        """回傳與鏡像不同、需要發送的設定"""
+        with self._lock:
+            return {key: int(value) for key, value in values.items() if self._values[key] != int(value)}
+
+    def set(self, client_dash, key, value):
+        """發送單項設定，與鏡像相同時略過；回傳 (成功, 是否實際發送)"""
+        ok, sent = self.apply(client_dash, **{key: value})
+        return ok, bool(sent)
+
+    def apply(self, client_dash, **values):
+        """
+        先連續發送所有有變化的設定，再依序讀取回覆並逐項更新鏡像（持有鎖，不與其他設定交錯）
+        回傳 (全部成功, 實際發送的設定名稱列表)
+        控制器回應錯誤的項目標記為未知並回傳False；未收到回覆的項目標記為未知後拋出 ConnectionError
+        """
+        for key in values:
+            if key not in SETTING_COMMANDS:
+                raise KeyError(f"未知的運動設定: {key}")
+        with self._lock:
+            changes = self.pending(**values)
+            self.skipped += len(values) - len(changes)
+            if not changes:
+                return True, []
+            sent = list(changes)
+            try:
+                replies = client_dash.sendRecvMany(
+                    [f"{SETTING_COMMANDS[key]}({changes[key]:d})" for key in sent])
+            except Exception:
+                for key in sent:
+                    self._values[key] = None
+                raise
+            self.sent += len(sent)
+
+            ok = True
+            missing = []
+            for key, reply in zip(sent, replies):
+                if not reply:
+                    self._values[key] = None
+                    missing.append(key)
+                elif parse_reply(reply).ok:
+                    self._values[key] = changes[key]
+                else:
+                    self._values[key] = None
+                    ok = False
+            if missing:
+                raise ConnectionError(f"未收到設定回覆: {', '.join(SETTING_COMMANDS[key] for key in missing)}")
+            return ok, sent
+
+    @contextmanager
+    def batch(self, client_dash):
+        """收集多項設定，離開 with 區塊時合併發送"""
+        batch = SettingsBatch()
+        yield batch
+        if batch.values:
+            batch.result = self.apply(client_dash, **batch.values)
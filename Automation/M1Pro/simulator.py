@@ -0,0 +1,613 @@
+"""
+Dobot M1 Pro 本地控制器模擬器
+
+模擬 29999 (Dashboard)、30003 (Move)、30004 (實時反饋) 三個端口，
+使用與 dobot_api.py 相同的文字協議 (ErrorID,{values},Cmd();) 回覆指令，
+並以設定頻率推送 MyType 反饋幀，可在沒有實機的環境下測試與評估性能
+
+用法:
+    python simulator.py --host 127.0.0.1 --rate 125
+"""
+import argparse
+import math
+import re
+import socket
+import threading
+import time
+import numpy as np
+import kinematics
+from arch_motion import ArchParams, plan_jump
+from dobot_api import MyType
+
+# 100% 速度時的最大關節速度 (度/s 或 mm/s) 與笛卡爾速度
+JOINT_MAX_SPEED = [180.0, 180.0, 1000.0, 1000.0]
+LINEAR_MAX_SPEED = 1000.0
+ROTATION_MAX_SPEED = 1000.0
+
+FEEDBACK_TEST_VALUE = 0x123456789abcdef
+
+# 錯誤代碼
+ERROR_LINEAR_WORKSPACE = 23
+ERROR_IK_NO_SOLUTION = 33
+ERROR_IK_LIMIT = 34
+
+# 點動軸方向
+JOG_AXES = {
+    'J1': ('joint', 0), 'J2': ('joint', 1), 'J3': ('joint', 2), 'J4': ('joint', 3),
+    'X': ('cartesian', 0), 'Y': ('cartesian', 1), 'Z': ('cartesian', 2), 'R': ('cartesian', 3),
+}
+
+COMMAND_PATTERN = re.compile(r'^\s*(\w+)\s*\((.*)\)\s*$', re.S)
+
+
+def forward_kinematics(joints):
+    """關節角度 [j1, j2, j3, j4] 轉笛卡爾座標 [x, y, z, r]"""
+    return kinematics.forward_kinematics(joints).tolist()
+
+
+def inverse_kinematics(pose, hand):
+    """
+    笛卡爾座標 [x, y, z, r] 轉關節角度
+    hand: 1 為右手系 (J2 > 0)，0 為左手系 (J2 < 0)
+    無解時回傳 None
+    """
+    joints = kinematics.inverse_kinematics(pose, hand)
+    if np.isnan(joints[0]):
+        return None
+    return joints.tolist()
+
+
+def within_limits(joints):
+    """檢查關節是否在限位內"""
+    return bool(kinematics.within_limits(joints))
+
+
+def split_args(text):
+    """依最外層逗號切分參數字串，保留括號內的內容"""
+    args = []
+    depth = 0
+    current = ''
+    for ch in text:
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            args.append(current.strip())
+            current = ''
+        else:
+            current += ch
+    if current.strip():
+        args.append(current.strip())
+    return args
+
+
+def parse_number(text):
+    """將參數轉為數值，無法轉換時回傳原字串"""
+    try:
+        return float(text)
+    except ValueError:
+        return text.strip('"\'')
+
+
+class Motion:
+    """隊列中的一段運動"""
+
+    def __init__(self, kind, start, end, duration, hand):
+        self.kind = kind        # 'joint' 或 'linear'
+        self.start = start      # joint: 起點關節, linear: 起點笛卡爾
+        self.end = end
+        self.duration = max(duration, 0.02)
+        self.hand = hand
+        self.elapsed = 0.0
+        self.target_joints = list(end) if kind == 'joint' else None
+
+    def sample(self):
+        """回傳目前時刻的關節角度，擺線插補使起終點速度為零"""
+        tau = min(self.elapsed / self.duration, 1.0)
+        s = tau - math.sin(2.0 * math.pi * tau) / (2.0 * math.pi)
+        point = [a + (b - a) * s for a, b in zip(self.start, self.end)]
+        if self.kind == 'joint':
+            return point
+        return inverse_kinematics(point, self.hand)
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
+
+
+class DobotSimulator:
+    """
+    Dobot 控制器模擬器
+    三個端口各自接受連線，每個連線由獨立線程處理；
+    運動線程以固定週期推進隊列中的運動，反饋線程依設定頻率推送 MyType 幀
+    """
+
+    def __init__(self, host='127.0.0.1', dash_port=29999, move_port=30003, feed_port=30004,
+                 feedback_rate=125.0, tick=0.004):
+        self.host = host
+        self.ports = {'dash': dash_port, 'move': move_port, 'feed': feed_port}
+        self.feedback_period = 1.0 / feedback_rate
+        self.tick = tick
+
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._running = False
+        self._threads = []
+        self._servers = []
+        self._clients = []
+
+        # 機械臂狀態
+        self.enabled = False
+        self.paused = False
+        self.errors = []
+        self.hand = 1
+        self.speed_factor = 100
+        self.speed_j = 100
+        self.speed_l = 100
+        self.acc_j = 100
+        self.acc_l = 100
+        self.cp = 0
+        self.lim_z = ArchParams().limit_z
+        self.user = 0
+        self.tool = 0
+        self.digital_outputs = 0
+        self.digital_inputs = 0
+
+        self.joints = [0.0, 90.0, 200.0, 0.0]
+        self.joint_speed = [0.0, 0.0, 0.0, 0.0]
+        self.pose_speed = [0.0, 0.0, 0.0, 0.0]
+        self.target_joints = list(self.joints)
+        self.queue = []
+        self.current_motion = None
+        self.jog = None
+        self.start_time = time.monotonic()
+
+        # 指令統計
+        self.command_count = 0
+
+    # ==================== 生命週期 ====================
+
+    def start(self):
+        """綁定端口並啟動所有線程"""
+        if self._running:
+            return
+        self._running = True
+        handlers = {'dash': self._handle_dashboard, 'move': self._handle_move, 'feed': self._handle_feedback}
+        for name, port in self.ports.items():
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((self.host, port))
+            server.listen(5)
+            # 端口為0時使用系統分配的端口
+            self.ports[name] = server.getsockname()[1]
+            self._servers.append(server)
+            self._spawn(self._accept_loop, server, handlers[name])
+        self._spawn(self._motion_loop)
+
+    def stop(self):
+        """關閉所有連線與線程"""
+        self._running = False
+        with self._lock:
+            self._idle.notify_all()
+        for sock in self._servers + self._clients:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._servers = []
+        self._clients = []
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def _accept_loop(self, server, handler):
+        while self._running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._clients.append(conn)
+            self._spawn(handler, conn)
+
+    # ==================== 文字協議 ====================
+
+    def _read_commands(self, conn):
+        """從連線中逐條取出指令（以最外層右括號結尾）"""
+        buffer = ''
+        while self._running:
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data.decode('utf-8', errors='replace')
+
+            depth = 0
+            start = 0
+            for i, ch in enumerate(buffer):
+                if ch == '(':
+                    depth += 1
+                elif ch == ')':
+                    depth -= 1
+                    if depth == 0:
+                        yield buffer[start:i + 1].strip(' \r\n;')
+                        start = i + 1
+            buffer = buffer[start:]
+
+    def _serve(self, conn, dispatch):
+        for command in self._read_commands(conn):
+            self.command_count += 1
+            match = COMMAND_PATTERN.match(command)
+            if not match:
+                reply = f"-10000,{{}},{command};"
+            else:
+                name, arg_text = match.group(1), match.group(2)
+                args = [parse_number(a) for a in split_args(arg_text)]
+                error_id, values = dispatch(name, args)
+                reply = f"{error_id},{{{values}}},{command};"
+            try:
+                conn.sendall(reply.encode('utf-8'))
+            except OSError:
+                return
+
+    def _handle_dashboard(self, conn):
+        self._serve(conn, self.dashboard_command)
+
+    def _handle_move(self, conn):
+        self._serve(conn, self.move_command)
+
+    # ==================== Dashboard指令 ====================
+
+    def robot_mode(self):
+        """依目前狀態計算 RobotMode"""
+        with self._lock:
+            if self.errors:
+                return 9
+            if not self.enabled:
+                return 4
+            if self.paused:
+                return 10
+            if self.jog is not None:
+                return 11
+            if self.current_motion is not None or self.queue:
+                return 7
+            return 5
+
+    def dashboard_command(self, name, args):
+        """處理 Dashboard 指令，回傳 (ErrorID, 回傳值字串)"""
+        ints = [int(a) for a in args if isinstance(a, float)]
+        with self._lock:
+            if name == 'EnableRobot':
+                self.enabled = True
+                self.target_joints = list(self.joints)
+            elif name == 'DisableRobot':
+                self.enabled = False
+                self._halt()
+            elif name == 'ClearError':
+                self.errors = []
+            elif name in ('ResetRobot', 'EmergencyStop'):
+                self._halt()
+                if name == 'EmergencyStop':
+                    self.enabled = False
+            elif name == 'RobotMode':
+                return 0, str(self.robot_mode())
+            elif name == 'GetErrorID':
+                return 0, '[' + ','.join(['[' + ','.join(str(e) for e in self.errors) + ']'] + ['[]'] * 6) + ']'
+            elif name == 'GetPose':
+                return 0, ','.join(f"{v:.6f}" for v in forward_kinematics(self.joints))
+            elif name == 'GetAngle':
+                return 0, ','.join(f"{v:.6f}" for v in self.joints)
+            elif name == 'SpeedFactor' and ints:
+                self.speed_factor = ints[0]
+            elif name == 'SpeedJ' and ints:
+                self.speed_j = ints[0]
+            elif name == 'SpeedL' and ints:
+                self.speed_l = ints[0]
+            elif name == 'AccJ' and ints:
+                self.acc_j = ints[0]
+            elif name == 'AccL' and ints:
+                self.acc_l = ints[0]
+            elif name == 'CP' and ints:
+                self.cp = ints[0]
+            elif name == 'LimZ' and ints:
+                self.lim_z = float(ints[0])
+            elif name == 'User' and ints:
+                self.user = ints[0]
+            elif name == 'Tool' and ints:
+                self.tool = ints[0]
+            elif name == 'SetArmOrientation' and ints:
+                self.hand = ints[0]
+            elif name in ('DO', 'DOExecute', 'ToolDO', 'ToolDOExecute') and len(ints) >= 2:
+                index, status = ints[0], ints[1]
+                if status:
+                    self.digital_outputs |= 1 << (index - 1)
+                else:
+                    self.digital_outputs &= ~(1 << (index - 1))
+            elif name in ('DI', 'ToolDI') and ints:
+                return 0, str((self.digital_inputs >> (ints[0] - 1)) & 1)
+            elif name == 'pause':
+                self.paused = True
+            elif name == 'continue':
+                self.paused = False
+            elif name == 'PositiveSolution' and len(ints) >= 4:
+                return 0, ','.join(f"{v:.6f}" for v in forward_kinematics([float(a) for a in args[:4]]))
+            elif name == 'InverseSolution' and len(ints) >= 4:
+                joints = inverse_kinematics([float(a) for a in args[:4]], self.hand)
+                if joints is None:
+                    return -1, ''
+                return 0, ','.join(f"{v:.6f}" for v in joints)
+            return 0, ''
+
+    # ==================== Move指令 ====================
+
+    def move_command(self, name, args):
+        """處理 Move 指令，回傳 (ErrorID, 回傳值字串)"""
+        if name in ('Sync', 'SyncAll'):
+            # 阻塞直到隊列執行完畢
+            with self._lock:
+                while self._running and (self.queue or self.current_motion is not None) and not self.errors:
+                    self._idle.wait(0.1)
+            return 0, ''
+
+        if name == 'MoveJog':
+            with self._lock:
+                axis = args[0] if args and isinstance(args[0], str) else ''
+                if axis and axis[:-1] in JOG_AXES and axis[-1] in '+-':
+                    if not self.enabled or self.errors:
+                        return -1, ''
+                    self.jog = (JOG_AXES[axis[:-1]], 1.0 if axis[-1] == '+' else -1.0)
+                else:
+                    self.jog = None
+            return 0, ''
+
+        positional = [a for a in args if isinstance(a, float)]
+        keywords = dict(a.split('=', 1) for a in args if isinstance(a, str) and '=' in a)
+
+        with self._lock:
+            if not self.enabled or self.errors:
+                return -1, ''
+            if len(positional) < 4:
+                return -10001, ''
+
+            # 以隊列最後一個目標作為起點
+            start = list(self.target_joints)
+            values = positional[:4]
+
+            if name in ('MovJ', 'MovJIO'):
+                end = inverse_kinematics(values, self.hand)
+                motion = self._joint_motion(start, end, keywords)
+            elif name == 'RelMovJ':
+                pose = [a + b for a, b in zip(forward_kinematics(start), values)]
+                motion = self._joint_motion(start, inverse_kinematics(pose, self.hand), keywords)
+            elif name == 'JointMovJ':
+                motion = self._joint_motion(start, values, keywords)
+            elif name == 'RelJointMovJ':
+                motion = self._joint_motion(start, [a + b for a, b in zip(start, values)], keywords)
+            elif name in ('MovL', 'MovLIO'):
+                motion = self._linear_motion(start, values, keywords)
+            elif name == 'RelMovL':
+                pose = [a + b for a, b in zip(forward_kinematics(start), values)]
+                motion = self._linear_motion(start, pose, keywords)
+            elif name == 'Jump':
+                return self._jump(start, values, keywords)
+            else:
+                return -10000, ''
+
+            if isinstance(motion, int):
+                self.errors.append(motion)
+                return 0, ''
+
+            self.queue.append(motion)
+            self.target_joints = list(motion.target_joints)
+            return 0, ''
+
+    def _jump(self, start, pose, keywords):
+        """門型運動: 以 LimZ 為高度上限排入上升、平移、下降三段運動（呼叫時需持有 _lock）"""
+        try:
+            lift, cross, target = plan_jump(forward_kinematics(start), pose, ArchParams(limit_z=self.lim_z))
+        except ValueError:
+            self.errors.append(ERROR_IK_LIMIT)
+            return 0, ''
+        motions = []
+        for kind, waypoint in (('linear', lift), ('joint', cross), ('linear', target)):
+            if kind == 'linear':
+                motion = self._linear_motion(start, waypoint, keywords)
+            else:
+                motion = self._joint_motion(start, inverse_kinematics(waypoint, self.hand), keywords)
+            if isinstance(motion, int):
+                self.errors.append(motion)
+                return 0, ''
+            motions.append(motion)
+            start = list(motion.target_joints)
+        self.queue.extend(motions)
+        self.target_joints = start
+        return 0, ''
+
+    def _ratio(self, keywords, speed_key, default):
+        speed = float(keywords.get(speed_key, default))
+        return max(self.speed_factor * speed / 10000.0, 0.01)
+
+    def _joint_motion(self, start, end, keywords):
+        if end is None:
+            return ERROR_IK_NO_SOLUTION
+        if not within_limits(end):
+            return ERROR_IK_LIMIT
+        ratio = self._ratio(keywords, 'SpeedJ', self.speed_j)
+        duration = 2.0 * max(abs(b - a) / v for a, b, v in zip(start, end, JOINT_MAX_SPEED)) / ratio
+        return Motion('joint', list(start), list(end), duration, self.hand)
+
+    def _linear_motion(self, start, pose, keywords):
+        start_pose = forward_kinematics(start)
+        ratio = self._ratio(keywords, 'SpeedL', self.speed_l)
+        distance = math.dist(start_pose[:3], pose[:3])
+        duration = 2.0 * max(distance / LINEAR_MAX_SPEED, abs(pose[3] - start_pose[3]) / ROTATION_MAX_SPEED) / ratio
+        motion = Motion('linear', start_pose, list(pose), duration, self.hand)
+
+        # 整批取樣直線路徑，檢查是否離開工作空間
+        s = np.linspace(0.05, 1.0, 20)[:, None]
+        samples = np.asarray(start_pose) + (np.asarray(pose) - np.asarray(start_pose)) * s
+        joints = kinematics.inverse_kinematics(samples, self.hand)
+        if np.isnan(joints[:, 0]).any():
+            return ERROR_LINEAR_WORKSPACE
+        if not kinematics.within_limits(joints).all():
+            return ERROR_IK_LIMIT
+        motion.target_joints = joints[-1].tolist()
+        return motion
+
+    def _halt(self):
+        """停止所有運動並清空隊列"""
+        self.queue = []
+        self.current_motion = None
+        self.jog = None
+        self.target_joints = list(self.joints)
+        self.joint_speed = [0.0, 0.0, 0.0, 0.0]
+        self.pose_speed = [0.0, 0.0, 0.0, 0.0]
+        self._idle.notify_all()
+
+    # ==================== 運動與反饋 ====================
+
+    def _motion_loop(self):
+        last = time.monotonic()
+        while self._running:
+            time.sleep(self.tick)
+            now = time.monotonic()
+            dt = now - last
+            last = now
+            with self._lock:
+                previous_joints = list(self.joints)
+                previous_pose = forward_kinematics(previous_joints)
+                self._advance(dt)
+                pose = forward_kinematics(self.joints)
+                if dt > 0:
+                    self.joint_speed = [(a - b) / dt for a, b in zip(self.joints, previous_joints)]
+                    self.pose_speed = [(a - b) / dt for a, b in zip(pose, previous_pose)]
+
+    def _advance(self, dt):
+        if not self.enabled or self.errors or self.paused:
+            return
+
+        if self.jog is not None:
+            (space, axis), direction = self.jog
+            ratio = self.speed_factor / 100.0 * 0.1
+            if space == 'joint':
+                joints = list(self.joints)
+                joints[axis] += direction * JOINT_MAX_SPEED[axis] * ratio * dt
+            else:
+                pose = forward_kinematics(self.joints)
+                pose[axis] += direction * (LINEAR_MAX_SPEED if axis < 3 else ROTATION_MAX_SPEED) * ratio * dt
+                joints = inverse_kinematics(pose, self.hand)
+            if joints is not None and within_limits(joints):
+                self.joints = joints
+                self.target_joints = list(joints)
+            return
+
+        if self.current_motion is None:
+            if not self.queue:
+                return
+            self.current_motion = self.queue.pop(0)
+
+        motion = self.current_motion
+        motion.elapsed += dt
+        joints = motion.sample()
+        if joints is None:
+            self.errors.append(ERROR_LINEAR_WORKSPACE)
+            self._halt()
+            return
+        self.joints = joints
+        if motion.done:
+            self.current_motion = None
+            if not self.queue:
+                self._idle.notify_all()
+
+    def build_frame(self, frame):
+        """將目前狀態寫入長度為1的 MyType 陣列"""
+        with self._lock:
+            pose = forward_kinematics(self.joints)
+            target_pose = forward_kinematics(self.target_joints)
+            mode = self.robot_mode()
+            frame['len'] = MyType.itemsize
+            frame['test_value'] = FEEDBACK_TEST_VALUE
+            frame['robot_mode'] = mode
+            frame['controller_timer'] = int((time.monotonic() - self.start_time) * 1000)
+            frame['run_time'] = frame['controller_timer']
+            frame['digital_input_bits'] = self.digital_inputs
+            frame['digital_outputs'] = self.digital_outputs
+            frame['speed_scaling'] = self.speed_factor
+            frame['q_actual'][0, :4] = self.joints
+            frame['q_target'][0, :4] = self.target_joints
+            frame['qd_actual'][0, :4] = self.joint_speed
+            frame['tool_vector_actual'][0, :4] = pose
+            frame['Tool_vector_target'][0, :4] = target_pose
+            frame['TCP_speed_actual'][0, :4] = self.pose_speed
+            frame['motor_temperatures'][0, :4] = 35.0
+            frame['handtype'][0, 0] = self.hand
+            frame['userCoordinate'] = self.user
+            frame['toolCoordinate'] = self.tool
+            frame['velocityRatio'] = min(self.speed_j, 127)
+            frame['accelerationRatio'] = min(self.acc_j, 127)
+            frame['xyzVelocityRatio'] = min(self.speed_l, 127)
+            frame['xyzAccelerationRatio'] = min(self.acc_l, 127)
+            frame['EnableStatus'] = int(self.enabled)
+            frame['RunningStatus'] = int(mode == 7)
+            frame['ErrorStatus'] = int(bool(self.errors))
+            frame['isRunQueuedCmd'] = int(mode == 7)
+            frame['isPauseCmdFlag'] = int(self.paused)
+
+    def _handle_feedback(self, conn):
+        frame = np.zeros(1, dtype=MyType)
+        next_time = time.monotonic()
+        while self._running:
+            self.build_frame(frame)
+            try:
+                conn.sendall(frame.tobytes())
+            except OSError:
+                return
+            # 以固定時間點排程，避免週期漂移
+            next_time += self.feedback_period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dobot M1 Pro 本地控制器模擬器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--dash-port', type=int, default=29999)
+    parser.add_argument('--move-port', type=int, default=30003)
+    parser.add_argument('--feed-port', type=int, default=30004)
+    parser.add_argument('--rate', type=float, default=125.0, help="反饋頻率 (Hz)")
+    options = parser.parse_args()
+
+    simulator = DobotSimulator(options.host, options.dash_port, options.move_port,
+                               options.feed_port, options.rate)
+    simulator.start()
+    print(f"模擬器已啟動: {options.host} 端口 {simulator.ports}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
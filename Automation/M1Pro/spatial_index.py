@@ -0,0 +1,218 @@
+"""
+點位空間索引
+
+以均勻網格（雜湊格子）索引點位座標，新增、修改、刪除都只更新一個格子；
+k 近鄰查詢由查詢點所在格子逐圈向外直接查表，已找到 k 個點且下一圈不可能更近時停止，
+只對候選點計算距離；附近幾圈都沒有足夠的點時（點位稀疏），
+改以 NumPy 整批計算全部已佔用格子的圈數再由內向外取點
+
+TaughtPointIndex 同時維護笛卡爾 (x, y, z) 與關節 (j1~j4) 兩個索引，以點位 id 為鍵
+
+用法:
+    index = TaughtPointIndex(saved_points)
+    for point, distance in index.nearest([x, y, z, r], k=3):
+        print(point['name'], distance)
+    index.update(point)      # 點位新增或修改後
+    index.remove(point_id)   # 點位刪除後
+"""
+import itertools
+import numpy as np
+
+SPACE_CARTESIAN = 'cartesian'
+SPACE_JOINT = 'joint'
+
+CARTESIAN_KEYS = ('x', 'y', 'z')
+JOINT_KEYS = ('j1', 'j2', 'j3', 'j4')
+
+
+class GridIndex:
+    """
+    N維均勻網格索引
+    weights: 各維度的距離權重（例如關節空間中角度與J3毫米的換算），座標乘上權重後再分格
+    """
+
+    def __init__(self, dims, cell_size=20.0, weights=None, probe_rings=2):
+        """
+        dims: 維度
+        cell_size: 網格大小（加權後的單位）
+        probe_rings: 直接查表搜尋的圈數，超過時改為掃描全部已佔用格子
+        """
+        self.dims = dims
+        self.probe_rings = probe_rings
+        self._ring_offsets = [[offset for offset in itertools.product(range(-r, r + 1), repeat=dims)
+                               if max(abs(o) for o in offset) == r] for r in range(probe_rings + 1)]
+        self.cell_size = float(cell_size)
+        self.weights = np.ones(dims) if weights is None else np.asarray(weights, dtype=np.float64)
+        self._coords = {}
+        self._cell_of = {}
+        self._cells = {}
+        self._occupied = None    # 已佔用格子的陣列快取，格子集合改變時失效
+
+    def __len__(self):
+        return len(self._coords)
+
+    def _cell(self, coords):
+        return tuple(int(c) for c in np.floor(coords / self.cell_size))
+
+    def insert(self, key, coords):
+        """新增或移動一個點"""
+        coords = np.asarray(coords, dtype=np.float64)[:self.dims] * self.weights
+        cell = self._cell(coords)
+        if self._cell_of.get(key) != cell:
+            self.remove(key)
+            self._cell_of[key] = cell
+            if cell not in self._cells:
+                self._cells[cell] = set()
+                self._occupied = None
+            self._cells[cell].add(key)
+        self._coords[key] = coords
+
+    def remove(self, key):
+        cell = self._cell_of.pop(key, None)
+        if cell is None:
+            return
+        del self._coords[key]
+        members = self._cells[cell]
+        members.discard(key)
+        if not members:
+            del self._cells[cell]
+            self._occupied = None
+
+    def clear(self):
+        self._coords.clear()
+        self._cell_of.clear()
+        self._cells.clear()
+        self._occupied = None
+
+    def _occupied_cells(self):
+        """回傳 (格子列表, 格子座標陣列)"""
+        if self._occupied is None:
+            cells = list(self._cells)
+            self._occupied = (cells, np.array(cells, dtype=np.int64).reshape(-1, self.dims))
+        return self._occupied
+
+    def _distances(self, query, keys):
+        coords = np.array([self._coords[key] for key in keys]).reshape(-1, self.dims)
+        return np.linalg.norm(coords - query, axis=1)
+
+    def nearest(self, coords, k=1):
+        """回傳最近的 k 個 [(key, 距離), ...]，依距離排序"""
+        if not self._coords or k <= 0:
+            return []
+        query = np.asarray(coords, dtype=np.float64)[:self.dims] * self.weights
+        center = self._cell(query)
+
+        # 先逐圈直接查表
+        keys = []
+        for radius, offsets in enumerate(self._ring_offsets):
+            for offset in offsets:
+                members = self._cells.get(tuple(c + o for c, o in zip(center, offset)))
+                if members:
+                    keys.extend(members)
+            found_all = len(keys) == len(self._coords)
+            if len(keys) >= k or found_all:
+                distances = self._distances(query, keys)
+                if found_all or np.partition(distances, k - 1)[k - 1] <= radius * self.cell_size:
+                    best = np.argsort(distances, kind='stable')[:k]
+                    return [(keys[i], float(distances[i])) for i in best]
+
+        cells, occupied = self._occupied_cells()
+
+        # 每個已佔用格子與查詢格子的切比雪夫距離（圈數），由內向外搜尋
+        rings = np.abs(occupied - np.array(center)).max(axis=1)
+        order = np.argsort(rings, kind='stable')
+        rings = rings[order]
+        boundaries = np.flatnonzero(np.diff(rings)) + 1
+
+        keys = []
+        start = 0
+        for end in list(boundaries) + [len(order)]:
+            for i in order[start:end]:
+                keys.extend(self._cells[cells[i]])
+            start = end
+            # 下一圈的點距離至少為 (目前圈數) 個格子
+            if len(keys) >= k and end < len(order):
+                distances = self._distances(query, keys)
+                if np.partition(distances, k - 1)[k - 1] <= rings[end - 1] * self.cell_size:
+                    break
+
+        distances = self._distances(query, keys)
+        best = np.argsort(distances, kind='stable')[:k]
+        return [(keys[i], float(distances[i])) for i in best]
+
+    def within(self, coords, radius):
+        """回傳距離不大於 radius 的 [(key, 距離), ...]，依距離排序"""
+        if not self._coords:
+            return []
+        query = np.asarray(coords, dtype=np.float64)[:self.dims] * self.weights
+        cells, occupied = self._occupied_cells()
+        low = np.array(self._cell(query - radius))
+        high = np.array(self._cell(query + radius))
+        inside_box = np.flatnonzero(((occupied >= low) & (occupied <= high)).all(axis=1))
+
+        keys = []
+        for i in inside_box:
+            keys.extend(self._cells[cells[i]])
+        if not keys:
+            return []
+        distances = self._distances(query, keys)
+        inside = np.flatnonzero(distances <= radius)
+        inside = inside[np.argsort(distances[inside], kind='stable')]
+        return [(keys[i], float(distances[i])) for i in inside]
+
+
+class TaughtPointIndex:
+    """示教點位的笛卡爾與關節空間索引，查詢結果為 (點位字典, 距離)"""
+
+    def __init__(self, points=(), cell_size=20.0, joint_weights=(1.0, 1.0, 1.0, 1.0)):
+        """
+        points: 點位字典（需有 id、cartesian、joint）
+        cell_size: 網格大小（笛卡爾為mm，關節空間為加權後的單位）
+        joint_weights: 關節距離權重 (J1, J2 度；J3 mm；J4 度)
+        """
+        self.cartesian = GridIndex(len(CARTESIAN_KEYS), cell_size)
+        self.joint = GridIndex(len(JOINT_KEYS), cell_size, joint_weights)
+        self._points = {}
+        self.rebuild(points)
+
+    def __len__(self):
+        return len(self._points)
+
+    def rebuild(self, points):
+        self.cartesian.clear()
+        self.joint.clear()
+        self._points.clear()
+        for point in points:
+            self.update(point)
+
+    def update(self, point):
+        """新增或更新一個點位"""
+        key = point['id']
+        cartesian = point.get('cartesian') or {}
+        joint = point.get('joint') or {}
+        self._points[key] = point
+        self.cartesian.insert(key, [cartesian.get(k, 0.0) for k in CARTESIAN_KEYS])
+        self.joint.insert(key, [joint.get(k, 0.0) for k in JOINT_KEYS])
+
+    def remove(self, point_id):
+        self._points.pop(point_id, None)
+        self.cartesian.remove(point_id)
+        self.joint.remove(point_id)
+
+    def _grid(self, space):
+        if space == SPACE_CARTESIAN:
+            return self.cartesian
+        if space == SPACE_JOINT:
+            return self.joint
+        raise ValueError(f"未知的查詢空間: {space}")
+
+    def nearest(self, coords, k=1, space=SPACE_CARTESIAN):
+        """
+        最近的 k 個點位
+        coords: 笛卡爾 [x, y, z(, r)] 或關節 [j1, j2, j3, j4]
+        """
+        return [(self._points[key], distance) for key, distance in self._grid(space).nearest(coords, k)]
+
+    def within(self, coords, radius, space=SPACE_CARTESIAN):
+        """距離 radius 以內的點位，依距離排序"""
+        return [(self._points[key], distance) for key, distance in self._grid(space).within(coords, radius)]
@@ -0,0 +1,5 @@
+"""M1Pro 模組為平面結構（以模組名稱直接匯入），測試時加入上層目錄"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+"""週期時間估算與參數最佳化"""
+import numpy as np
+import pytest
+from sequence_executor import SequenceStep
+from cycle_time import (profile_time, estimate_sequence, optimize_sequence, MotionSettings, OptimizerLimits)
+
+
+def _steps(speed=50, cp=0):
+    rng = np.random.default_rng(3)
+    steps = []
+    for index, (x, y) in enumerate(rng.uniform([220, -150], [350, 150], (10, 2))):
+        point = {'name': f'P{index}', 'cartesian': {'x': x, 'y': y, 'z': 100.0, 'r': 0.0}, 'joint': {}}
+        steps.append(SequenceStep(point, 'MovL' if index % 2 else 'MovJ', speed, cp))
+    return steps
+
+
+def test_trapezoid_profile():
+    total, ramp = profile_time([100.0, 1.0], 50.0, 100.0)
+    # 100mm: 加速 0.5s、等速 1.5s、減速 0.5s；1mm: 三角形曲線
+    assert total[0] == pytest.approx(2.5)
+    assert ramp[0] == pytest.approx(0.5)
+    assert total[1] == pytest.approx(2.0 * np.sqrt(1.0 / 100.0))
+
+
+def test_faster_settings_are_faster():
+    slow = estimate_sequence(_steps(speed=20), settings=MotionSettings(speed_factor=50))
+    fast = estimate_sequence(_steps(speed=80), settings=MotionSettings(speed_factor=50))
+    assert 0 < fast.total < slow.total
+    assert len(fast.durations) == 10
+
+
+def test_blending_saves_time():
+    stopped = estimate_sequence(_steps(cp=0))
+    blended = estimate_sequence(_steps(cp=100))
+    assert blended.total < stopped.total
+    assert blended.blend_savings[-1] == 0.0
+
+
+def test_optimizer_improves_and_respects_limits():
+    steps = _steps(speed=30)
+    steps[4] = steps[4]._replace(cp=0)
+    optimized, before, after = optimize_sequence(steps, limits=OptimizerLimits(max_speed=80, max_cp=60))
+    assert after.total < before.total
+    assert after.total == pytest.approx(estimate_sequence(optimized).total)
+    assert all(step.speed <= 80 and step.cp <= 60 for step in optimized)
+    # keep_stops: 原本停止的段與最後一段保持停止
+    assert optimized[4].cp == 0 and optimized[-1].cp == 0
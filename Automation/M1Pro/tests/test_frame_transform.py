@@ -0,0 +1,30 @@
+"""夾具重新定位轉換"""
+import numpy as np
+import pytest
+from kinematics import forward_kinematics
+from frame_transform import FrameTransform, fit_transform, apply_transform, preview_transform
+
+
+def test_fit_recovers_transform():
+    truth = FrameTransform(7.5, 12.0, -8.0, 3.0, 0.0)
+    old = np.array([[300, 0, 100, 0], [250, 120, 100, 0], [320, -80, 100, 0]], dtype=float)
+    new = apply_transform(old, truth)
+    fitted = fit_transform(old, new)
+    assert fitted.theta == pytest.approx(truth.theta)
+    assert (fitted.tx, fitted.ty, fitted.dz) == pytest.approx((truth.tx, truth.ty, truth.dz))
+    assert fitted.residual < 1e-9
+
+
+def test_fit_rejects_coincident_references():
+    with pytest.raises(ValueError):
+        fit_transform([[300, 0, 100], [300.1, 0, 100]], [[300, 0, 100], [300.1, 0, 100]])
+
+
+def test_preview_keeps_hand_and_reports_unreachable():
+    joints = np.array([[0.0, 60.0, 100.0, 0.0], [10.0, -60.0, 100.0, 0.0], [0.0, 5.0, 100.0, 0.0]])
+    cartesian = forward_kinematics(joints)
+    preview = preview_transform(cartesian, joints, FrameTransform(0.0, 30.0, 0.0, 0.0, 0.0))
+    assert np.sign(preview.joint[1, 1]) == -1
+    assert np.allclose(forward_kinematics(preview.joint[:2]), preview.cartesian[:2])
+    assert np.allclose(preview.displacement, 30.0)
+    assert [row for row, _ in preview.issues] == [2]
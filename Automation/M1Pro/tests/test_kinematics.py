@@ -0,0 +1,38 @@
+"""正/逆運動學"""
+import numpy as np
+from kinematics import (forward_kinematics, inverse_kinematics, within_limits, reachable, hand_of,
+                        HAND_LEFT, HAND_RIGHT, JOINT_LIMITS)
+
+
+def _random_joints(rng, count, hand):
+    joints = rng.uniform(JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1], (count, 4))
+    # 避開奇異位置（J2 接近0時兩個手系重合）
+    joints[:, 1] = np.abs(joints[:, 1]).clip(5.0, None) * (1 if hand == HAND_RIGHT else -1)
+    return joints
+
+
+def test_round_trip_both_hands():
+    rng = np.random.default_rng(0)
+    for hand in (HAND_RIGHT, HAND_LEFT):
+        joints = _random_joints(rng, 500, hand)
+        poses = forward_kinematics(joints)
+        solved = inverse_kinematics(poses, hand)
+        assert np.allclose(forward_kinematics(solved), poses, atol=1e-6)
+        assert np.allclose(solved[:, 1:3], joints[:, 1:3], atol=1e-6)
+        assert (hand_of(solved) == hand).all()
+
+
+def test_accepts_feedback_layout_and_single_point():
+    q_actual = np.array([10.0, 45.0, 100.0, 5.0, 0.0, 0.0])
+    pose = forward_kinematics(q_actual)
+    assert pose.shape == (4,)
+    assert np.allclose(inverse_kinematics(pose, HAND_RIGHT), q_actual[:4])
+
+
+def test_unreachable_is_nan():
+    poses = np.array([[500.0, 0.0, 100.0, 0.0], [300.0, 0.0, 100.0, 0.0]])
+    joints = inverse_kinematics(poses)
+    assert np.isnan(joints[0]).all()
+    assert not np.isnan(joints[1]).any()
+    assert list(within_limits(joints)) == [False, True]
+    assert list(reachable(poses)) == [False, True]
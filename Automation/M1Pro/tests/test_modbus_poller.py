@@ -0,0 +1,21 @@
+"""Modbus 讀取範圍合併與分段"""
+from modbus_poller import merge_blocks, RegisterBlock, DEFAULT_BLOCKS, MAX_READ_COUNT
+
+
+def test_adjacent_blocks_merge():
+    blocks = [RegisterBlock('B', 115, 10, 0.1), RegisterBlock('A', 100, 10, 0.1)]
+    assert merge_blocks(blocks, max_gap=16) == [(100, 25, [blocks[1], blocks[0]])]
+    assert len(merge_blocks(blocks, max_gap=4)) == 2
+
+
+def test_large_block_is_split():
+    big = RegisterBlock('BIG', 1000, 300, 0.1)
+    small = RegisterBlock('S', 1305, 5, 0.1)
+    ranges = merge_blocks([big, small])
+    assert [(address, count) for address, count, _ in ranges] == [(1000, 125), (1125, 125), (1250, 60)]
+    assert ranges[-1][2] == [big, small]
+    assert all(count <= MAX_READ_COUNT for _, count, _ in ranges)
+
+
+def test_default_map_reads_each_block():
+    assert [members for _, _, members in merge_blocks(DEFAULT_BLOCKS)] == [[block] for block in DEFAULT_BLOCKS]
@@ -0,0 +1,42 @@
+"""料盤格位產生"""
+import numpy as np
+import pytest
+from kinematics import forward_kinematics
+from pallet import generate_pallet, pallet_points, pallet_steps, slot_grid
+from preflight import validate_sequence
+
+
+@pytest.fixture
+def plan():
+    return generate_pallet([300, -50, 50, 0], [300, 50, 50, 0], [380, -50, 50, 0], rows=3, columns=3,
+                           layers=2, layer_pitch=20.0, approach=30.0)
+
+
+def test_serpentine_grid_visits_every_slot_once():
+    grid = slot_grid(3, 4, layers=2)
+    assert len({tuple(slot) for slot in grid.tolist()}) == 24
+    # 相鄰格位只移動一個間距
+    assert (np.abs(np.diff(grid, axis=0)).sum(axis=1) == 1).all()
+
+
+def test_slots_and_joints(plan):
+    assert not plan.issues
+    assert len(plan.slots) == 18
+    assert np.allclose(plan.approach[:, 2] - plan.slots[:, 2], 30.0)
+    for poses, joints in ((plan.slots, plan.joints), (plan.approach, plan.approach_joints),
+                          (plan.retreat, plan.retreat_joints)):
+        assert np.allclose(forward_kinematics(joints), poses, atol=1e-6)
+
+
+def test_joint_approach_steps_have_joints(plan):
+    steps = pallet_steps(plan, approach_type='JointMovJ', indices=[0, 1])
+    assert [step.motion_type for step in steps] == ['JointMovJ', 'MovL', 'MovL'] * 2
+    for step in steps:
+        assert set(step.point['joint']) == {'j1', 'j2', 'j3', 'j4'}
+    assert validate_sequence(steps) == []
+
+
+def test_point_names(plan):
+    names = [point['name'] for point in pallet_points(plan, 'Tray')]
+    assert len(set(names)) == len(names)
+    assert names[0] == 'Tray_L1_R1_C1'
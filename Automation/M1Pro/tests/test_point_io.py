@@ -0,0 +1,55 @@
+"""點位批量匯入/匯出"""
+import numpy as np
+from kinematics import forward_kinematics
+from point_io import (PointTable, save_table, load_table, validate_table, points_to_table, table_to_points,
+                      SEVERITY_ERROR)
+
+
+def _table():
+    joints = np.array([[0.0, 60.0, 100.0, 0.0], [20.0, 40.0, 120.0, 10.0], [-30.0, 90.0, 80.0, 0.0]])
+    return PointTable(np.array(['A', 'B', 'C']), forward_kinematics(joints), joints)
+
+
+def test_csv_and_npz_round_trip(tmp_path):
+    table = _table()
+    for name in ('points.csv', 'points.npz'):
+        path = str(tmp_path / name)
+        save_table(path, table)
+        loaded = load_table(path)
+        assert loaded.names.tolist() == ['A', 'B', 'C']
+        assert np.allclose(loaded.cartesian, table.cartesian, atol=1e-4)
+        assert np.allclose(loaded.joint, table.joint, atol=1e-4)
+        assert validate_table(loaded) == []
+
+
+def test_missing_joints_completed_by_inverse_kinematics(tmp_path):
+    table = _table()
+    table.joint[1] = np.nan
+    path = str(tmp_path / 'points.npz')
+    save_table(path, table)
+    loaded = load_table(path)
+    assert np.allclose(loaded.joint[1], _table().joint[1], atol=1e-6)
+
+
+def test_duplicate_names_after_strip(tmp_path):
+    table = _table()
+    names = np.array(['A', 'A ', ' B'])
+    path = str(tmp_path / 'points.npz')
+    save_table(path, PointTable(names, table.cartesian, table.joint))
+    loaded = load_table(path)
+    issues = validate_table(loaded, existing_names=['B'])
+    assert [(issue.row, issue.severity) for issue in issues] == [(1, SEVERITY_ERROR), (2, SEVERITY_ERROR)]
+
+
+def test_limits_and_inconsistency_reported():
+    table = _table()
+    table.joint[0, 0] = 120.0
+    table.cartesian[2, 0] += 10.0
+    rows = sorted({issue.row for issue in validate_table(table)})
+    assert rows == [0, 2]
+
+
+def test_points_dict_round_trip():
+    points = table_to_points(_table())
+    assert [point['name'] for point in points] == ['A', 'B', 'C']
+    assert np.allclose(points_to_table(points).joint, _table().joint)
@@ -0,0 +1,45 @@
+"""點位順序最佳化: 少量點位時與窮舉的最佳路線比較"""
+import itertools
+import numpy as np
+import pytest
+from point_order import optimize_order, travel_time_matrix, route_time
+
+LOW = [-120.0, -130.0, 0.0, -300.0]
+HIGH = [120.0, 130.0, 200.0, 300.0]
+
+
+def _brute_force(matrix, start, end):
+    count = len(matrix)
+    return min(route_time(order, matrix) for order in itertools.permutations(range(count))
+               if (start is None or order[0] == start) and (end is None or order[-1] == end))
+
+
+@pytest.mark.parametrize('start, end', [(None, None), (0, None), (None, 5), (0, 5)])
+def test_small_sets_close_to_optimum(start, end):
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        joints = rng.uniform(LOW, HIGH, (6, 4))
+        matrix = travel_time_matrix(joints)
+        order, seconds = optimize_order(joints, start=start, end=end)
+
+        assert sorted(order) == list(range(6))
+        assert start is None or order[0] == start
+        assert end is None or order[-1] == end
+        assert seconds == pytest.approx(route_time(order, matrix))
+        assert seconds <= _brute_force(matrix, start, end) * 1.1
+
+
+def test_fixed_end_matches_reversed_fixed_start():
+    """時間矩陣對稱: 只固定終點的路線應與以該點為起點的路線一樣好"""
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        joints = rng.uniform(LOW, HIGH, (8, 4))
+        _, with_end = optimize_order(joints, end=3)
+        _, with_start = optimize_order(joints, start=3)
+        assert with_end == pytest.approx(with_start)
+
+
+def test_start_joints_not_in_order():
+    joints = np.array([[0, 0, 50, 0], [30, 0, 50, 0], [60, 0, 50, 0]], dtype=float)
+    order, _ = optimize_order(joints, start_joints=[65, 0, 50, 0])
+    assert order == [2, 1, 0]
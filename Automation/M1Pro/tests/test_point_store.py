@@ -0,0 +1,60 @@
+"""SQLite 點位資料庫"""
+import json
+import os
+import pytest
+from point_store import PointStore, DuplicatePointName
+
+
+def _point(name, x=0.0):
+    return {'name': name, 'cartesian': {'x': x, 'y': 0.0, 'z': 100.0, 'r': 0.0}, 'joint': {}}
+
+
+def test_legacy_json_imported_once(tmp_path):
+    db = str(tmp_path / 'robot_points.db')
+    legacy = str(tmp_path / 'robot_points.json')
+    with open(legacy, 'w', encoding='utf-8') as f:
+        json.dump([_point('A'), _point('A'), _point('B')], f)
+
+    store = PointStore(db, legacy_json=legacy)
+    assert [point['name'] for point in store] == ['A', 'A_2', 'B']
+    while len(store):
+        store.delete(0)
+    store.close()
+
+    # 刪除全部點位後重新啟動，不應再次匯入
+    store = PointStore(db, legacy_json=legacy)
+    assert len(store) == 0
+    assert os.path.exists(legacy + '.migrated')
+    store.close()
+
+
+def test_delete_keeps_order_and_indices(tmp_path):
+    db = str(tmp_path / 'points.db')
+    store = PointStore(db)
+    store.add_many([_point(f'P{i}', x=i * 10.0) for i in range(6)])
+    ids = [point['id'] for point in store]
+    store.delete(1)
+    store.delete(2)
+    store.add('P6', {'x': 15.0, 'y': 0.0, 'z': 100.0, 'r': 0.0}, {})
+    names = ['P0', 'P2', 'P4', 'P5', 'P6']
+    assert [point['name'] for point in store] == names
+    assert [store.index_of(name) for name in names] == list(range(5))
+    assert store.index_of('P1') is None
+    assert store.indices_in_box(0, 25, -1, 1) == [0, 1, 4]
+    store.close()
+
+    store = PointStore(db)
+    assert [point['name'] for point in store] == names
+    assert [point['id'] for point in store][:4] == [ids[0], ids[2], ids[4], ids[5]]
+    store.reorder([4, 3, 2, 1, 0])
+    assert [point['name'] for point in store] == names[::-1]
+    store.close()
+
+
+def test_duplicate_name_rejected(tmp_path):
+    store = PointStore(str(tmp_path / 'points.db'))
+    store.add('A', {}, {})
+    with pytest.raises(DuplicatePointName):
+        store.add_many([_point('B'), _point(' A ')])
+    assert [point['name'] for point in store] == ['A']
+    store.close()
@@ -0,0 +1,39 @@
+"""運動序列預檢"""
+from sequence_executor import SequenceStep
+from kinematics import HAND_LEFT, HAND_RIGHT
+from preflight import (validate_sequence, ERROR_HAND_SWITCH, ERROR_IK_NO_SOLUTION, ERROR_LINEAR_WORKSPACE,
+                       ERROR_SINGULARITY)
+
+
+def _step(x, y, motion_type='MovL', z=100.0, joint=None):
+    point = {'name': f'{x},{y}', 'cartesian': {'x': x, 'y': y, 'z': z, 'r': 0.0}, 'joint': joint or {}}
+    return SequenceStep(point, motion_type, 50, 0)
+
+
+def test_valid_sequence_has_no_issues():
+    steps = [_step(300, -100, 'MovJ'), _step(300, 100), _step(250, 150)]
+    assert validate_sequence(steps, start_joints=[0, 60, 100, 0]) == []
+
+
+def test_unreachable_targets():
+    issues = validate_sequence([_step(500, 0, 'MovJ'), _step(500, 0)])
+    assert [(issue.step_index, issue.error_id) for issue in issues] == [
+        (0, ERROR_IK_NO_SOLUTION), (1, ERROR_LINEAR_WORKSPACE)]
+
+
+def test_singular_target():
+    issues = validate_sequence([_step(399.99, 0, 'MovJ')])
+    assert [issue.error_id for issue in issues] == [ERROR_SINGULARITY]
+
+
+def test_linear_hand_switch():
+    # 起點為左手系，控制器設定右手系
+    issues = validate_sequence([_step(300, 0)], start_joints=[30, -60, 100, 0], hand=HAND_RIGHT)
+    assert [issue.error_id for issue in issues] == [ERROR_HAND_SWITCH]
+    assert validate_sequence([_step(300, 0)], start_joints=[30, -60, 100, 0], hand=HAND_LEFT) == []
+
+
+def test_linear_path_through_base():
+    # 兩端可到達，直線穿過基座附近（工作空間內圈）
+    issues = validate_sequence([_step(150, 150, 'MovJ'), _step(-150, 150)])
+    assert [issue.step_index for issue in issues] == [1]
@@ -0,0 +1,38 @@
+"""網格空間索引: 與暴力搜尋比較"""
+import numpy as np
+import pytest
+from spatial_index import GridIndex, TaughtPointIndex, SPACE_JOINT
+
+
+@pytest.mark.parametrize('cell_size', [5.0, 20.0, 200.0])
+def test_nearest_and_within_match_brute_force(cell_size):
+    rng = np.random.default_rng(4)
+    coords = rng.uniform(-300, 300, (400, 3))
+    # 一部分點群集，一部分稀疏，兩種查詢路徑都會用到
+    coords[:200] = coords[:200] * 0.05
+    index = GridIndex(3, cell_size)
+    for key, point in enumerate(coords):
+        index.insert(key, point)
+    for key in range(0, 400, 7):
+        index.remove(key)
+    alive = np.array([key for key in range(400) if key % 7])
+
+    for query in rng.uniform(-400, 400, (30, 3)):
+        distances = np.linalg.norm(coords[alive] - query, axis=1)
+        expected = np.sort(distances)[:5]
+        assert np.allclose([distance for _, distance in index.nearest(query, 5)], expected)
+        inside = index.within(query, 50.0)
+        assert sorted(key for key, _ in inside) == sorted(alive[distances <= 50.0].tolist())
+
+
+def test_point_index_update_and_remove():
+    points = [{'id': i, 'name': f'P{i}', 'cartesian': {'x': i * 10.0, 'y': 0.0, 'z': 0.0, 'r': 0.0},
+               'joint': {'j1': i * 5.0, 'j2': 30.0, 'j3': 100.0, 'j4': 0.0}} for i in range(10)]
+    index = TaughtPointIndex(points)
+    assert index.nearest([31, 0, 0], 1)[0][0]['name'] == 'P3'
+    assert index.nearest([21, 30, 100, 0], 1, SPACE_JOINT)[0][0]['name'] == 'P4'
+
+    index.remove(3)
+    index.update(dict(points[9], cartesian={'x': 32.0, 'y': 0.0, 'z': 0.0, 'r': 0.0}))
+    assert [point['name'] for point, _ in index.nearest([31, 0, 0], 2)] == ['P9', 'P4']
+    assert len(index) == 9
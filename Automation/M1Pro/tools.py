@@ -9,7 +9,9 @@ import numpy as np
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from dobot_api import DobotApiDashboard, DobotApi, DobotApiMove, MyType
+from dobot_api import DobotApiDashboard, DobotApi, DobotApiMove, MyType, parse_reply
+from feedback import FeedbackReader
+from alarm_catalog import get_alarm_catalog
 from pymodbus.client import ModbusTcpClient
 
 # 機械臂模式定義
@@ -196,6 +198,7 @@ class RobotUI(QMainWindow):
         self.client_dash = None
         self.client_move = None
         self.client_feed = None
+        self.feedback_reader = None
         self.modbus_client = None  # PGC夾爪控制
         
         # 信號槽
@@ -765,6 +768,7 @@ class RobotUI(QMainWindow):
             self.client_dash = DobotApiDashboard(ip, dash_port)
             self.client_move = DobotApiMove(ip, move_port)
             self.client_feed = DobotApi(ip, feed_port)
+            self.feedback_reader = FeedbackReader(self.client_feed.socket_dobot, latest_only=True)
             
             # 連接Modbus TCP用於PGC夾爪控制 - 使用PyModbus 3.x語法
             self.modbus_client = ModbusTcpClient(host='127.0.0.1', port=502)
@@ -803,6 +807,7 @@ class RobotUI(QMainWindow):
                 self.client_move.close()
             if self.client_feed:
                 self.client_feed.close()
+                self.feedback_reader = None
             if self.modbus_client:
                 self.modbus_client.close()
                 
@@ -1332,37 +1337,28 @@ class RobotUI(QMainWindow):
         
     def feedback_loop(self):
         """反饋循環"""
-        hasRead = 0
         while self.global_state['connect']:
             try:
-                data = bytes()
-                while hasRead < 1440:
-                    temp = self.client_feed.socket_dobot.recv(1440 - hasRead)
-                    if len(temp) > 0:
-                        hasRead += len(temp)
-                        data += temp
-                hasRead = 0
+                # 讀取器已驗證測試值，緩衝區會被後續幀覆寫，陣列欄位需複製後再送往UI
+                a = self.feedback_reader.read_frame()
+                feedback_data = {
+                    'speed_scaling': a["speed_scaling"][0],
+                    'robot_mode': a["robot_mode"][0],
+                    'digital_input_bits': a["digital_input_bits"][0],
+                    'digital_outputs': a["digital_outputs"][0],
+                    'q_actual': a["q_actual"][0].copy(),
+                    'tool_vector_actual': a["tool_vector_actual"][0].copy()
+                }
+                self.signals.feedback_update.emit(feedback_data)
                 
-                a = np.frombuffer(data, dtype=MyType)
-                if hex((a['test_value'][0])) == '0x123456789abcdef':
-                    feedback_data = {
-                        'speed_scaling': a["speed_scaling"][0],
-                        'robot_mode': a["robot_mode"][0],
-                        'digital_input_bits': a["digital_input_bits"][0],
-                        'digital_outputs': a["digital_outputs"][0],
-                        'q_actual': a["q_actual"][0],
-                        'tool_vector_actual': a["tool_vector_actual"][0]
-                    }
-                    self.signals.feedback_update.emit(feedback_data)
-                    
-                    # 檢查錯誤
-                    if a["robot_mode"] == 9:
-                        self.handle_robot_error()
+                # 檢查錯誤
+                if a["robot_mode"] == 9:
+                    self.handle_robot_error()
                         
                 # 更新PGC夾爪狀態
                 self.update_gripper_status()
                         
-                time.sleep(0.1)  # 100ms更新間隔
+                time.sleep(0.1)  # 100ms更新間隔，下一次讀取會略過期間積壓的舊幀
                 
             except Exception as e:
                 if self.global_state['connect']:
@@ -1381,26 +1377,20 @@ class RobotUI(QMainWindow):
     def parse_and_display_error(self, error_response):
         """解析並顯示錯誤信息"""
         try:
-            # 解析錯誤回應格式
-            if "{" in error_response:
-                error_data = error_response.split("{")[1].split("}")[0]
-                error_list = json.loads("{" + error_data + "}")
+            # 解析錯誤回應格式，回傳值為 [[控制器告警], [伺服1告警], ...]
+            reply = parse_reply(error_response)
+            if reply.values:
+                error_list = reply.value
                 
-                # 錯誤代碼映射
-                error_messages = {
-                    22: "手勢切換錯誤 - 請嘗試使用關節運動(JointMovJ)或調整目標點位",
-                    23: "直線運動過程中規劃點超出工作空間 - 重新選取運動點位",
-                    24: "圓弧運動過程中規劃點超出工作空間 - 重新選取運動點位",
-                    32: "運動過程逆解算奇異 - 重新選取運動點位",
-                    33: "運動過程逆解算無解 - 重新選取運動點位",
-                    34: "運動過程逆解算限位 - 重新選取運動點位"
-                }
+                # 錯誤代碼查詢告警目錄
+                catalog = get_alarm_catalog()
                 
                 # 檢查控制器錯誤
                 if len(error_list) > 0 and error_list[0]:
                     for error_id in error_list[0]:
-                        if error_id in error_messages:
-                            self.signals.error_update.emit(f"錯誤 {error_id}: {error_messages[error_id]}")
+                        message = catalog.describe(error_id, 'controller')
+                        if message:
+                            self.signals.error_update.emit(f"錯誤 {error_id}: {message}")
                         else:
                             self.signals.error_update.emit(f"未知錯誤 {error_id}")
             else:
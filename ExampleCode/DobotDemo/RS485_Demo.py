@@ -1,5 +1,5 @@
 import time
-from dobot_api import DobotApiDashboard
+from dobot_api import DobotApiDashboard, parse_reply
 
 def connect_robot(ip="192.168.1.6"):
     print("🔌 正在連接機械臂...")
@@ -11,9 +11,12 @@ def parse_response(response):
     if not response or response.startswith("-1"):
         return None, "❌ 無回應或 Modbus 失敗"
     try:
-        data_str = response.split(",")[1].strip("{}")
-        reg_str = data_str.split(":")[1]
-        return int(reg_str), None
+        reply = parse_reply(response)
+        if not reply.ok or reply.value is None:
+            return None, f"❌ 指令失敗 (ErrorID={reply.error_id})"
+        # 回傳值可能為 {值} 或 {位址:值}
+        reg_str = str(reply.value).split(":")[-1]
+        return int(float(reg_str)), None
     except Exception as e:
         return None, f"⚠️ 回應格式解析錯誤: {e}"
 
@@ -102,12 +102,103 @@ def alarmAlarmJsonFile():
     return dataController, dataServo
 
 
+class DobotReply:
+    """
+    Parsed command reply
+    Format: ErrorID,{values},Cmd(params);
+    """
+
+    def __init__(self, error_id, values, command, raw):
+        self.error_id = error_id
+        self.values = values
+        self.command = command
+        self.raw = raw
+
+    @property
+    def ok(self):
+        return self.error_id == 0
+
+    @property
+    def name(self):
+        return self.command.split('(', 1)[0].strip()
+
+    @property
+    def value(self):
+        return self.values[0] if self.values else None
+
+    def __repr__(self):
+        return f"DobotReply(error_id={self.error_id}, values={self.values}, command={self.command!r})"
+
+
+def _parse_reply_values(text):
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        return json.loads("[" + text + "]")
+    except ValueError:
+        pass
+
+    values = []
+    for token in text.split(","):
+        token = token.strip()
+        try:
+            values.append(int(token))
+        except ValueError:
+            try:
+                values.append(float(token))
+            except ValueError:
+                values.append(token)
+    return values
+
+
+def parse_reply(reply):
+    """
+    Parse a reply string such as "0,{5},RobotMode();" into a DobotReply
+    Raises ValueError for empty or malformed replies
+    """
+    raw = reply
+    reply = reply.strip().rstrip(";").strip()
+    if not reply:
+        raise ValueError("Empty reply")
+
+    error_text, _, rest = reply.partition(",")
+    try:
+        error_id = int(error_text)
+    except ValueError:
+        raise ValueError(f"Malformed reply: {raw}")
+
+    start = rest.find("{")
+    end = rest.rfind("}")
+    if start == -1 or end < start:
+        return DobotReply(error_id, [], rest.strip(), raw)
+
+    values = _parse_reply_values(rest[start + 1:end])
+    command = rest[end + 1:].lstrip(",").strip()
+    return DobotReply(error_id, values, command, raw)
+
+
+def _command_name(command):
+    """Command name of a request string, e.g. SpeedJ(50) -> SpeedJ"""
+    return command.split('(', 1)[0].strip()
+
+
+def _reply_name(data):
+    """Command name echoed in a reply, None when it cannot be parsed (no matching)"""
+    try:
+        name = parse_reply(str(data, encoding="utf-8")).name
+    except ValueError:
+        return None
+    return name or None
+
+
 class DobotApi:
     def __init__(self, ip, port, *args):
         self.ip = ip
         self.port = port
         self.socket_dobot = 0
         self.__globalLock = threading.Lock()
+        self._recv_buffer = bytearray()
         self.text_log: Text = None
         if args:
             self.text_log = args[0]
@@ -138,13 +229,38 @@ class DobotApi:
         except Exception as e:
             print(e)
 
-    def wait_reply(self):
+    def _read_reply(self):
+        """
+    Take one complete ';'-terminated reply from the buffer, receiving more if needed
+    """
+        while True:
+            end = self._recv_buffer.find(b";")
+            if end != -1:
+                data = bytes(self._recv_buffer[:end + 1])
+                del self._recv_buffer[:end + 1]
+                return data
+            chunk = self.socket_dobot.recv(1024)
+            if len(chunk) == 0:
+                raise ConnectionError(f"Port {self.port} connection closed")
+            self._recv_buffer += chunk
+
+    def wait_reply(self, command=None):
         """
     Read the return value
+    Replies are split on the ';' terminator and leftover bytes are kept for the next call.
+    When command is given, only a reply echoing the same command name is accepted;
+    replies for other commands arrived after an earlier timeout and are discarded.
     """
+        expected = _command_name(command) if command else None
         data = ""
         try:
-            data = self.socket_dobot.recv(1024)
+            while True:
+                data = self._read_reply()
+                name = _reply_name(data)
+                if expected is None or name is None or name == expected:
+                    break
+                self.log(f"Discard stale reply {self.ip}:{self.port}: {str(data, encoding='utf-8')}")
+                data = ""
         except Exception as e:
             print(e)
 
@@ -169,9 +285,15 @@ class DobotApi:
     """
         with self.__globalLock:
             self.send_data(string)
-            recvData = self.wait_reply()
+            recvData = self.wait_reply(string)
             return recvData
 
+    def sendRecvReply(self, string):
+        """
+    send-recv Sync, returns a parsed DobotReply
+    """
+        return parse_reply(self.sendRecvMsg(string))
+
     def __del__(self):
         self.close()
 